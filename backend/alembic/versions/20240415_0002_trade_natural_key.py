@@ -0,0 +1,35 @@
+"""trade natural key unique constraint"""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20240415_0002"
+down_revision = "20240401_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        DELETE FROM trades AS t
+        USING trades AS d
+        WHERE t.account_id = d.account_id
+          AND t.order_id IS NOT DISTINCT FROM d.order_id
+          AND t.trade_ts = d.trade_ts
+          AND t.price = d.price
+          AND t.qty = d.qty
+          AND t.id > d.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_trade_natural_key",
+        "trades",
+        ["account_id", "order_id", "trade_ts", "price", "qty"],
+        postgresql_nulls_not_distinct=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_trade_natural_key", "trades", type_="unique")
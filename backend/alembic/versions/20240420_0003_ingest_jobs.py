@@ -0,0 +1,49 @@
+"""ingest jobs"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20240420_0003"
+down_revision = "20240415_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingest_jobs",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("account_id", sa.BigInteger(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "broker",
+            postgresql.ENUM("shioaji", "ibkr", "email_csv", name="broker_enum", create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            sa.Enum("queued", "running", "succeeded", "failed", name="ingest_job_status_enum"),
+            nullable=False,
+            server_default="queued",
+        ),
+        sa.Column("start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("progress", sa.Float(), server_default="0"),
+        sa.Column("imported", sa.Integer(), server_default="0"),
+        sa.Column("duplicates", sa.Integer(), server_default="0"),
+        sa.Column("error", sa.String(length=1024)),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("finished_at", sa.DateTime(timezone=True)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_ingest_jobs_status", "ingest_jobs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ingest_jobs_status", table_name="ingest_jobs")
+    op.drop_table("ingest_jobs")
+    op.execute("DROP TYPE IF EXISTS ingest_job_status_enum")
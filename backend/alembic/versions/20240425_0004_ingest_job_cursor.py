@@ -0,0 +1,19 @@
+"""ingest job resume cursor"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20240425_0004"
+down_revision = "20240420_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("ingest_jobs", sa.Column("cursor", sa.String(length=255)))
+
+
+def downgrade() -> None:
+    op.drop_column("ingest_jobs", "cursor")
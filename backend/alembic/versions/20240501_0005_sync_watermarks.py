@@ -0,0 +1,36 @@
+"""per-account broker sync watermarks"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20240501_0005"
+down_revision = "20240425_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_watermarks",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("account_id", sa.BigInteger(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "broker",
+            postgresql.ENUM("shioaji", "ibkr", "email_csv", name="broker_enum", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("synced_from", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("synced_through", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_trade_ts", sa.DateTime(timezone=True)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_unique_constraint("uq_sync_watermark", "sync_watermarks", ["account_id", "broker"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_sync_watermark", "sync_watermarks", type_="unique")
+    op.drop_table("sync_watermarks")
@@ -0,0 +1,74 @@
+"""open lots, closed trades and lot matching state"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20240510_0006"
+down_revision = "20240501_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    direction = sa.Enum("LONG", "SHORT", name="lot_direction_enum")
+    direction.create(op.get_bind(), checkfirst=True)
+    direction_column = postgresql.ENUM("LONG", "SHORT", name="lot_direction_enum", create_type=False)
+    op.create_table(
+        "open_lots",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("account_id", sa.BigInteger(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("symbol_id", sa.BigInteger(), nullable=False),
+        sa.Column("trade_id", sa.BigInteger(), nullable=False),
+        sa.Column("direction", direction_column, nullable=False),
+        sa.Column("qty", sa.Float(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("cost", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("opened_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_open_lots_account_symbol", "open_lots", ["account_id", "symbol_id"])
+    op.create_table(
+        "closed_trades",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("account_id", sa.BigInteger(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("symbol_id", sa.BigInteger(), nullable=False),
+        sa.Column("open_trade_id", sa.BigInteger(), nullable=False),
+        sa.Column("close_trade_id", sa.BigInteger(), nullable=False),
+        sa.Column("direction", direction_column, nullable=False),
+        sa.Column("qty", sa.Numeric(18, 4), nullable=False),
+        sa.Column("open_price", sa.Numeric(18, 4), nullable=False),
+        sa.Column("close_price", sa.Numeric(18, 4), nullable=False),
+        sa.Column("opened_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("closed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("realized_pnl", sa.Numeric(18, 4), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_closed_trades_account_closed_at", "closed_trades", ["account_id", "closed_at"])
+    op.create_table(
+        "lot_match_state",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("account_id", sa.BigInteger(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("method", sa.Enum("fifo", "lifo", "average", name="lot_method_enum"), nullable=False),
+        sa.Column("last_trade_ts", sa.DateTime(timezone=True)),
+        sa.Column("last_trade_id", sa.BigInteger()),
+        sa.Column("max_trade_id", sa.BigInteger()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_unique_constraint("uq_lot_match_state_account", "lot_match_state", ["account_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_lot_match_state_account", "lot_match_state", type_="unique")
+    op.drop_table("lot_match_state")
+    op.drop_index("ix_closed_trades_account_closed_at", table_name="closed_trades")
+    op.drop_table("closed_trades")
+    op.drop_index("ix_open_lots_account_symbol", table_name="open_lots")
+    op.drop_table("open_lots")
+    op.execute("DROP TYPE IF EXISTS lot_method_enum")
+    op.execute("DROP TYPE IF EXISTS lot_direction_enum")
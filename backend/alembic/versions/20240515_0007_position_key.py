@@ -0,0 +1,21 @@
+"""one position row per account and symbol"""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20240515_0007"
+down_revision = "20240510_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nothing wrote positions before the position book; drop any stale rows. The table stays
+    # empty until scripts/rebuild_positions.py runs (see "Database Migrations" in the README).
+    op.execute("DELETE FROM positions")
+    op.create_unique_constraint("uq_position_account_symbol", "positions", ["account_id", "symbol_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_position_account_symbol", "positions", type_="unique")
@@ -0,0 +1,59 @@
+"""broker position reconciliation status and breaks"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20240520_0008"
+down_revision = "20240515_0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reconciliation_status",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("account_id", sa.BigInteger(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "broker",
+            postgresql.ENUM("shioaji", "ibkr", "email_csv", name="broker_enum", create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            sa.Enum("in_sync", "out_of_sync", "failed", "timed_out", name="reconciliation_status_enum"),
+            nullable=False,
+        ),
+        sa.Column("breaks", sa.Integer(), server_default="0"),
+        sa.Column("error", sa.String(length=1024)),
+        sa.Column("checked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_unique_constraint("uq_reconciliation_status_account", "reconciliation_status", ["account_id"])
+    op.create_table(
+        "position_breaks",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("account_id", sa.BigInteger(), sa.ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("symbol", sa.String(length=64), nullable=False),
+        sa.Column("broker_qty", sa.Numeric(18, 4), nullable=False),
+        sa.Column("journal_qty", sa.Numeric(18, 4), nullable=False),
+        sa.Column("qty_diff", sa.Numeric(18, 4), nullable=False),
+        sa.Column("broker_avg_price", sa.Numeric(18, 4)),
+        sa.Column("journal_avg_price", sa.Numeric(18, 4)),
+        sa.Column("detected_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_position_breaks_account", "position_breaks", ["account_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_position_breaks_account", table_name="position_breaks")
+    op.drop_table("position_breaks")
+    op.drop_constraint("uq_reconciliation_status_account", "reconciliation_status", type_="unique")
+    op.drop_table("reconciliation_status")
+    op.execute("DROP TYPE IF EXISTS reconciliation_status_enum")
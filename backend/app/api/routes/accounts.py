@@ -2,8 +2,8 @@
 from __future__ import annotations
 
 from datetime import datetime
-from io import BytesIO
-from typing import List
+from io import BytesIO, TextIOWrapper
+from typing import List, Literal
 
 import pandas as pd
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
@@ -12,20 +12,31 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.api.deps.auth import get_current_user, get_db
-from app.ingestors.email_csv_ingestor import parse_generic_tw_csv
+from app.core.settings import settings
+from app.ingestors.email_csv_ingestor import iter_csv_batches
 from app.models.models import Account, KPI, Strategy, Trade
 from app.schemas.account import (
     AccountResponse,
     CSVIngestResult,
     KPIQuery,
     KPIResponse,
+    PositionResponse,
     StrategyCreate,
     StrategyResponse,
     TagTradeRequest,
     TradeQuery,
     TradeResponse,
 )
-from app.services.trades import assign_strategy, compute_kpis, record_equity_curve, upsert_trades
+from app.services.positions import list_positions
+from app.services.rollups import rollup_monthly_kpis
+from app.services.trade_loader import load_trade_frame
+from app.services.trades import (
+    UpsertResult,
+    assign_strategy,
+    finish_import,
+    get_account_kpis,
+    upsert_trades,
+)
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
@@ -95,6 +106,29 @@ def list_trades(
     return response
 
 
+@router.get("/{account_id}/positions", response_model=list[PositionResponse])
+def account_positions(
+    account_id: int,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> list[PositionResponse]:
+    """Return the open positions maintained from ingested trades."""
+
+    account = db.get(Account, account_id)
+    if account is None or account.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
+    return [
+        PositionResponse(
+            symbol_id=position.symbol_id,
+            symbol=ticker,
+            qty=float(position.qty),
+            avg_price=float(position.avg_price),
+            updated_at=position.updated_at,
+        )
+        for position, ticker in list_positions(db, account_id)
+    ]
+
+
 @router.post("/{account_id}/strategies", response_model=StrategyResponse)
 def create_strategy(
     account_id: int,
@@ -111,7 +145,7 @@ def create_strategy(
     db.add(strategy)
     db.commit()
     db.refresh(strategy)
-    return StrategyResponse.model_validate(strategy)
+    return StrategyResponse(id=strategy.id, name=strategy.name, rules_json=strategy.rules_json)
 
 
 @router.post("/trades/{trade_id}/tags")
@@ -145,12 +179,19 @@ def upload_csv(
     account = db.get(Account, account_id)
     if account is None or account.user_id != user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
-    content = file.file.read()
-    trades = parse_generic_tw_csv(account_id, content.decode("utf-8"))
-    imported = upsert_trades(db, trades)
-    account_trades = db.scalars(select(Trade).where(Trade.account_id == account_id)).all()
-    record_equity_curve(db, account, account_trades)
-    return CSVIngestResult(account_id=account_id, imported_trades=imported, ignored_rows=0)
+    result = UpsertResult()
+    ignored = 0
+    stream = TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        for batch in iter_csv_batches(account_id, stream, settings.ingest.csv_batch_size):
+            result = result.merge(upsert_trades(db, batch.trades, match_lots=False))
+            ignored += batch.ignored_rows
+    finally:
+        stream.detach()
+    finish_import(db, account_id, result)
+    if result.earliest_trade_ts is not None:
+        rollup_monthly_kpis(db, account_ids=[account_id])
+    return CSVIngestResult(account_id=account_id, imported_trades=result.imported, ignored_rows=ignored)
 
 
 @router.get("/{account_id}/kpis", response_model=KPIResponse)
@@ -158,6 +199,7 @@ def account_kpis(
     account_id: int,
     start: datetime,
     end: datetime,
+    engine: Literal["numpy", "sql"] | None = None,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ) -> KPIResponse:
@@ -166,14 +208,7 @@ def account_kpis(
     account = db.get(Account, account_id)
     if account is None or account.user_id != user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
-    trades = db.scalars(
-        select(Trade).where(
-            Trade.account_id == account_id,
-            Trade.trade_ts >= start,
-            Trade.trade_ts <= end,
-        )
-    ).all()
-    metrics = compute_kpis(trades)
+    metrics = get_account_kpis(db, account_id, start, end, engine=engine)
     return KPIResponse(
         scope="account",
         scope_ref_id=account_id,
@@ -196,28 +231,20 @@ def export_excel(
     account = db.get(Account, account_id)
     if account is None or account.user_id != user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
-    trades = db.scalars(
-        select(Trade).where(
-            Trade.account_id == account_id,
-            Trade.trade_ts >= start,
-            Trade.trade_ts <= end,
-        )
-    ).all()
-    data = [
+    trades = load_trade_frame(db, account_id, start, end)
+    sell = trades["side"] == "SELL"
+    notional = trades["qty"] * trades["price"]
+    df = pd.DataFrame(
         {
-            "日期": trade.trade_ts.strftime("%Y-%m-%d"),
-            "代碼": trade.symbol.ticker,
-            "股數": float(trade.qty),
-            "均價": float(trade.price),
-            "賣出價": float(trade.price) if trade.side == "SELL" else 0,
-            "投入成本": float(trade.qty) * float(trade.price) if trade.side == "BUY" else 0,
-            "損益": float(trade.price) * float(trade.qty) * (1 if trade.side == "SELL" else -1)
-            - float(trade.fee or 0)
-            - float(trade.tax or 0),
+            "日期": trades["trade_day"].astype(str),
+            "代碼": trades["ticker"],
+            "股數": trades["qty"],
+            "均價": trades["price"],
+            "賣出價": trades["price"].where(sell, 0),
+            "投入成本": notional.where(~sell, 0),
+            "損益": notional.where(sell, -notional) - trades["fee"] - trades["tax"],
         }
-        for trade in trades
-    ]
-    df = pd.DataFrame(data)
+    )
     output = BytesIO()
     with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
         df.to_excel(writer, index=False, sheet_name="Trades")
@@ -1,55 +1,348 @@
 """Analytics endpoints for KPIs and equity."""
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import pandas as pd
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from pydantic import ValidationError
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.api.deps.auth import get_current_user, get_db
-from app.models.models import Account, EquityDaily, KPI, Trade
-from app.schemas.account import EquityPoint, KPIResponse
-from app.services.trades import compute_kpis
+from app.core.settings import settings
+from app.models.models import Account, EquityDaily, KPI, Strategy
+from app.schemas.account import (
+    BootstrapResponse,
+    DrawdownResponse,
+    EquityPoint,
+    KPICacheStats,
+    KPIResponse,
+    MonthlyRollupResult,
+    PortfolioKPIs,
+    PortfolioResponse,
+    PriceBarsResponse,
+    RollingKPIResponse,
+    RollingKPISeries,
+    SimulatedDistribution,
+)
+from app.schemas.backtest import (
+    BacktestFill,
+    BacktestKPIs,
+    BacktestResponse,
+    BacktestSymbolResult,
+    StrategyRules,
+)
+from app.services.backtest import run_backtest
+from app.services.drawdown_index import account_drawdown_index
+from app.services.kpi_cache import cache_stats
+from app.services.kpi_engine import EMPTY_KPIS
+from app.services.portfolio import portfolio_equity, portfolio_kpis
+from app.services.price_store import PRICE_COLUMNS, bars_from_frame, get_price_store, timestamp_unit
+from app.services.rolling import RollingMode, rolling_kpis
+from app.services.rollups import MONTHLY_SCOPES, rollup_monthly_kpis
+from app.services.simulation import bootstrap_pnl, load_trade_pnl
+from app.services.trade_loader import load_trade_columns
+from app.services.trades import get_account_kpis, get_strategy_kpis, strategy_kpi_table
 
 router = APIRouter(tags=["analytics"])
 
 
+def _ensure_owned(db: Session, user, scope: str, scope_ref_id: int) -> None:
+    """Raise 404 unless the account or strategy belongs to ``user``."""
+
+    model = Account if scope == "account" else Strategy
+    owner = db.scalar(select(model.user_id).where(model.id == scope_ref_id))
+    if owner is None or owner != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{scope.capitalize()} not found")
+
+
 @router.get("/kpis/summary", response_model=KPIResponse)
 def kpi_summary(
     scope: str,
     account_id: int | None = None,
+    strategy_id: int | None = None,
     start: datetime | None = None,
     end: datetime | None = None,
+    engine: Literal["numpy", "sql"] | None = None,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ) -> KPIResponse:
-    """Return KPI summary for given scope."""
+    """Return KPI summary for an account or a strategy."""
 
-    if scope != "account":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only account scope supported in MVP")
-    if account_id is None or start is None or end is None:
+    if scope not in ("account", "strategy"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Scope must be account or strategy")
+    scope_ref_id = account_id if scope == "account" else strategy_id
+    if scope_ref_id is None or start is None or end is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing parameters")
-    account = db.get(Account, account_id)
-    if account is None or account.user_id != user.id:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
-    trades = db.scalars(
-        select(Trade).where(
-            Trade.account_id == account_id,
-            Trade.trade_ts >= start,
-            Trade.trade_ts <= end,
-        )
-    ).all()
-    metrics = compute_kpis(trades)
+    _ensure_owned(db, user, scope, scope_ref_id)
+    if scope == "account":
+        metrics = get_account_kpis(db, scope_ref_id, start, end, engine=engine)
+    else:
+        metrics = get_strategy_kpis(db, scope_ref_id, start, end)
     return KPIResponse(
-        scope="account",
-        scope_ref_id=account_id,
+        scope=scope,
+        scope_ref_id=scope_ref_id,
         period_start=start,
         period_end=end,
         **metrics,
     )
 
 
+@router.get("/kpis/strategies", response_model=list[KPIResponse])
+def strategy_kpis(
+    start: datetime,
+    end: datetime,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> list[KPIResponse]:
+    """Return KPIs for every strategy of the user, computed in one grouped pass."""
+
+    strategy_ids = db.scalars(
+        select(Strategy.id).where(Strategy.user_id == user.id).order_by(Strategy.id)
+    ).all()
+    table = strategy_kpi_table(db, strategy_ids, start, end)
+    return [
+        KPIResponse(
+            scope="strategy",
+            scope_ref_id=strategy_id,
+            period_start=start,
+            period_end=end,
+            **metrics,
+        )
+        for strategy_id, metrics in table.items()
+    ]
+
+
+@router.get("/kpis/rolling", response_model=RollingKPIResponse)
+def rolling_kpi_series(
+    account_id: int,
+    windows: list[int] = Query(default=[20, 60, 120]),
+    mode: RollingMode = "trades",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> RollingKPIResponse:
+    """Return rolling win rate, expectancy and drawdown for several window sizes.
+
+    Windows count trades in ``trades`` mode and calendar days in ``days`` mode;
+    each series is returned as parallel arrays.
+    """
+
+    windows = sorted(set(windows))
+    if not windows or windows[0] < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Windows must be positive")
+    if len(windows) > settings.analytics.rolling_max_windows:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Too many windows")
+    _ensure_owned(db, user, "account", account_id)
+    columns = load_trade_columns(db, account_id, start, end, ordered=mode == "trades")
+    series = [
+        RollingKPISeries(
+            window=result.window,
+            dates=result.dates.tolist(),
+            trades=result.trades.tolist(),
+            win_rate=result.win_rate.tolist(),
+            expectancy=result.expectancy.tolist(),
+            net_pnl=result.net_pnl.tolist(),
+            drawdown=result.drawdown.tolist(),
+        )
+        for result in rolling_kpis(columns, windows, mode)
+    ]
+    return RollingKPIResponse(account_id=account_id, mode=mode, series=series)
+
+
+@router.get("/simulations/bootstrap", response_model=BootstrapResponse)
+def bootstrap_simulation(
+    scope: Literal["account", "strategy"],
+    scope_ref_id: int,
+    paths: int = Query(default=10_000, ge=1),
+    horizon: int | None = Query(default=None, ge=1),
+    seed: int | None = Query(default=None, ge=0),
+    capital: float | None = Query(default=None, gt=0),
+    ruin_fraction: float = Query(default=1.0, gt=0, le=1),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> BootstrapResponse:
+    """Bootstrap the per-trade net PnL into distributions of final equity and max drawdown.
+
+    ``horizon`` is the number of trades per path and defaults to the number of
+    trades in the window, capped at ``simulation.max_horizon``. Risk of ruin is
+    the share of paths whose equity falls to ``-capital * ruin_fraction`` and is
+    only reported when ``capital`` is given. Repeat a run by passing back ``seed``.
+    """
+
+    if paths > settings.simulation.max_paths:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Too many paths")
+    if horizon is not None and horizon > settings.simulation.max_horizon:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Horizon too long")
+    _ensure_owned(db, user, scope, scope_ref_id)
+    pnl = load_trade_pnl(db, scope, scope_ref_id, start, end)
+    if not len(pnl):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No trades to resample")
+    result = bootstrap_pnl(
+        pnl,
+        paths,
+        horizon or min(len(pnl), settings.simulation.max_horizon),
+        seed=seed,
+        capital=capital,
+        ruin_fraction=ruin_fraction,
+    )
+    return BootstrapResponse(
+        scope=scope,
+        scope_ref_id=scope_ref_id,
+        trades=result.trades,
+        paths=result.paths,
+        horizon=result.horizon,
+        seed=result.seed,
+        final_equity=SimulatedDistribution(**vars(result.final_equity)),
+        max_drawdown=SimulatedDistribution(**vars(result.max_drawdown)),
+        prob_loss=result.prob_loss,
+        capital=capital,
+        risk_of_ruin=result.risk_of_ruin,
+    )
+
+
+@router.post("/strategies/{strategy_id}/backtest", response_model=BacktestResponse)
+def backtest_strategy(
+    strategy_id: int,
+    symbols: list[str] = Query(default=[]),
+    timeframe: str = "1d",
+    start: date | None = None,
+    end: date | None = None,
+    file: UploadFile | None = File(default=None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> BacktestResponse:
+    """Backtest the strategy's ``rules_json`` on bars from the price store.
+
+    Bars for ``symbols`` are read from the store for ``timeframe``; an uploaded
+    CSV with ``symbol, date, open, high, low, close`` columns is used instead
+    when given. Simulated fills are scored by the same KPI engine as real
+    trades, overall and per symbol; nothing is written to the journal.
+    """
+
+    _ensure_owned(db, user, "strategy", strategy_id)
+    strategy = db.get(Strategy, strategy_id)
+    try:
+        rules = StrategyRules.model_validate(strategy.rules_json or {})
+    except ValidationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=exc.errors(include_url=False, include_context=False),
+        ) from exc
+    try:
+        if file is not None:
+            frame = pd.read_csv(file.file)
+            if "date" in frame and (start is not None or end is not None):
+                days = pd.to_datetime(frame["date"]).dt.date
+                frame = frame[(days >= (start or date.min)) & (days <= (end or date.max))]
+            bars = bars_from_frame(frame, timestamp_unit(timeframe))
+        elif symbols:
+            store = get_price_store()
+            bars = [store.read(symbol, timeframe, start, end) for symbol in dict.fromkeys(symbols)]
+        else:
+            raise ValueError("pass symbols or upload a CSV")
+    except KeyError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No bars for {exc.args[0]}") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid bars: {exc}") from exc
+    result = run_backtest(bars, rules)
+    symbol_kpis = result.symbol_kpis()
+    columns = result.columns
+    return BacktestResponse(
+        strategy_id=strategy_id,
+        bars=sum(result.bars.values()),
+        kpis=BacktestKPIs(**result.kpis()),
+        symbols=[
+            BacktestSymbolResult(symbol=symbol, bars=count, kpis=BacktestKPIs(**symbol_kpis.get(symbol, EMPTY_KPIS)))
+            for symbol, count in result.bars.items()
+        ],
+        trades=[
+            BacktestFill(
+                symbol=symbol, side=side, trade_date=day, qty=qty, price=price, fee=fee, tax=tax, reason=reason
+            )
+            for symbol, side, day, qty, price, fee, tax, reason in zip(
+                result.symbols.tolist(),
+                columns.side.tolist(),
+                columns.trade_day.tolist(),
+                columns.qty.tolist(),
+                columns.price.tolist(),
+                columns.fee.tolist(),
+                columns.tax.tolist(),
+                result.reasons.tolist(),
+            )
+        ],
+    )
+
+
+@router.get("/kpis/monthly", response_model=list[KPIResponse])
+def monthly_kpis(
+    scope: Literal["account", "strategy"],
+    scope_ref_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    refresh: bool = False,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> list[KPIResponse]:
+    """Return the precomputed monthly KPI series for an account or strategy."""
+
+    _ensure_owned(db, user, scope, scope_ref_id)
+    if refresh:
+        if scope == "account":
+            rollup_monthly_kpis(db, account_ids=[scope_ref_id], strategy_ids=[])
+        else:
+            rollup_monthly_kpis(db, account_ids=[], strategy_ids=[scope_ref_id])
+    query = select(KPI).where(KPI.scope == MONTHLY_SCOPES[scope], KPI.scope_ref_id == scope_ref_id)
+    if start is not None:
+        query = query.where(KPI.period_end >= start)
+    if end is not None:
+        query = query.where(KPI.period_start <= end)
+    rows = db.scalars(query.order_by(KPI.period_start)).all()
+    return [
+        KPIResponse(
+            scope=row.scope,
+            scope_ref_id=row.scope_ref_id,
+            period_start=row.period_start,
+            period_end=row.period_end,
+            win_rate=row.win_rate,
+            avg_win=row.avg_win,
+            avg_loss=row.avg_loss,
+            profit_factor=row.profit_factor,
+            expectancy=row.expectancy,
+            mdd=row.mdd,
+            total_trades=row.total_trades,
+        )
+        for row in rows
+    ]
+
+
+@router.post("/kpis/monthly/rollup", response_model=MonthlyRollupResult)
+def run_monthly_rollup(
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> MonthlyRollupResult:
+    """Recompute monthly KPIs for all of the user's accounts and strategies."""
+
+    written = rollup_monthly_kpis(
+        db,
+        account_ids=db.scalars(select(Account.id).where(Account.user_id == user.id)).all(),
+        strategy_ids=db.scalars(select(Strategy.id).where(Strategy.user_id == user.id)).all(),
+    )
+    return MonthlyRollupResult(**written)
+
+
+@router.get("/kpis/cache/stats", response_model=KPICacheStats)
+def kpi_cache_stats(user=Depends(get_current_user)) -> KPICacheStats:
+    """Return KPI cache hit, miss and invalidation counters for this process."""
+
+    return KPICacheStats(**cache_stats())
+
+
 @router.get("/equity/daily", response_model=list[EquityPoint])
 def equity_daily(
     account_id: int,
@@ -71,3 +364,80 @@ def equity_daily(
         ).order_by(EquityDaily.date)
     ).all()
     return [EquityPoint(date=row.date, equity=float(row.equity), net_pnl_day=float(row.net_pnl_day)) for row in rows]
+
+
+@router.get("/equity/portfolio", response_model=PortfolioResponse)
+def equity_portfolio(
+    start: date | None = None,
+    end: date | None = None,
+    currency: str | None = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> PortfolioResponse:
+    """Return the summed equity of the user's accounts with its KPIs.
+
+    Curves are aligned on a common calendar and forward-filled; no currency
+    conversion is applied, so pass ``currency`` to combine like accounts only.
+    """
+
+    portfolio = portfolio_equity(db, user.id, currency)
+    curve = portfolio.curve.loc[start:end]
+    return PortfolioResponse(
+        account_ids=portfolio.account_ids,
+        currencies=portfolio.currencies,
+        points=[
+            EquityPoint(date=day, equity=equity, net_pnl_day=net)
+            for day, equity, net in zip(
+                curve.index.tolist(), curve["equity"].tolist(), curve["net_pnl_day"].tolist()
+            )
+        ],
+        kpis=PortfolioKPIs(**portfolio_kpis(curve)),
+    )
+
+
+@router.get("/prices/{symbol}", response_model=PriceBarsResponse)
+def price_bars(
+    symbol: str,
+    timeframe: str = "1d",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    user=Depends(get_current_user),
+) -> PriceBarsResponse:
+    """Return stored bars of a symbol within ``[start, end]`` as parallel arrays."""
+
+    try:
+        bars = get_price_store().read(symbol, timeframe, start, end)
+    except KeyError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No bars stored for symbol") from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return PriceBarsResponse(
+        symbol=symbol,
+        timeframe=timeframe,
+        ts=bars.ts.astype("datetime64[s]").tolist(),
+        **{name: getattr(bars, name).tolist() for name in PRICE_COLUMNS},
+    )
+
+
+@router.get("/equity/drawdown", response_model=DrawdownResponse)
+def equity_drawdown(
+    account_id: int,
+    start: date | None = None,
+    end: date | None = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> DrawdownResponse:
+    """Return maximum drawdown, peak and trough of the stored equity curve within a date range."""
+
+    _ensure_owned(db, user, "account", account_id)
+    result = account_drawdown_index(db, account_id).query(start, end)
+    return DrawdownResponse(
+        account_id=account_id,
+        start=start,
+        end=end,
+        mdd=result.mdd,
+        peak_date=result.peak_date,
+        trough_date=result.trough_date,
+        peak_equity=result.peak_equity,
+        trough_equity=result.trough_equity,
+    )
@@ -4,17 +4,37 @@ from __future__ import annotations
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.api.deps.auth import get_current_user, get_db
-from app.ingestors import ibkr_ingestor, shioaji_ingestor
-from app.models.models import Account
-from app.services.trades import record_equity_curve, upsert_trades
+from app.models.models import Account, IngestJob, PositionBreak, ReconciliationStatus
+from app.schemas.ingest import IngestJobResponse, PositionBreakResponse, ReconciliationReport
+from app.services.ingest_jobs import enqueue_ingest_job
+from app.services.sync import BROKER_CONNECTORS
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
 
-@router.post("/broker/{broker}")
+def _job_response(job: IngestJob) -> IngestJobResponse:
+    return IngestJobResponse(
+        id=job.id,
+        account_id=job.account_id,
+        broker=job.broker,
+        status=job.status,
+        start=job.start,
+        end=job.end,
+        progress=job.progress or 0.0,
+        imported=job.imported or 0,
+        duplicates=job.duplicates or 0,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+@router.post("/broker/{broker}", response_model=IngestJobResponse, status_code=status.HTTP_202_ACCEPTED)
 def ingest_broker(
     broker: str,
     account_id: int,
@@ -22,19 +42,76 @@ def ingest_broker(
     end: datetime,
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
-) -> dict[str, int]:
-    """Fetch trades from connected brokers."""
+) -> IngestJobResponse:
+    """Queue a job to fetch trades from a connected broker."""
 
     account = db.get(Account, account_id)
     if account is None or account.user_id != user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
-    if broker == "shioaji":
-        trades = shioaji_ingestor.fetch_trades(account, start, end)
-    elif broker == "ibkr":
-        trades = ibkr_ingestor.fetch_trades(account, start, end)
-    else:
+    if broker not in BROKER_CONNECTORS:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported broker")
-    imported = upsert_trades(db, trades)
-    account_trades = account.trades
-    record_equity_curve(db, account, account_trades)
-    return {"imported": imported}
+    job = enqueue_ingest_job(db, user.id, account_id, broker, start, end)
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobResponse)
+def get_ingest_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> IngestJobResponse:
+    """Return status and progress of an ingestion job."""
+
+    job = db.get(IngestJob, job_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return _job_response(job)
+
+
+@router.get("/reconciliation", response_model=list[ReconciliationReport])
+def reconciliation_report(
+    include_in_sync: bool = False,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+) -> list[ReconciliationReport]:
+    """List the user's accounts whose broker positions disagree with the journal, with the breaks."""
+
+    query = (
+        select(ReconciliationStatus)
+        .join(Account, Account.id == ReconciliationStatus.account_id)
+        .where(Account.user_id == user.id)
+        .order_by(ReconciliationStatus.account_id)
+    )
+    if not include_in_sync:
+        query = query.where(ReconciliationStatus.status != "in_sync")
+    statuses = db.scalars(query).all()
+    breaks: dict[int, list[PositionBreakResponse]] = {row.account_id: [] for row in statuses}
+    if breaks:
+        rows = db.scalars(
+            select(PositionBreak)
+            .where(PositionBreak.account_id.in_(list(breaks)))
+            .order_by(PositionBreak.account_id, PositionBreak.symbol)
+        ).all()
+        for row in rows:
+            breaks[row.account_id].append(
+                PositionBreakResponse(
+                    symbol=row.symbol,
+                    broker_qty=float(row.broker_qty),
+                    journal_qty=float(row.journal_qty),
+                    qty_diff=float(row.qty_diff),
+                    broker_avg_price=None if row.broker_avg_price is None else float(row.broker_avg_price),
+                    journal_avg_price=None if row.journal_avg_price is None else float(row.journal_avg_price),
+                    detected_at=row.detected_at,
+                )
+            )
+    return [
+        ReconciliationReport(
+            account_id=row.account_id,
+            broker=row.broker,
+            status=row.status,
+            checked_at=row.checked_at,
+            error=row.error,
+            breaks=breaks[row.account_id],
+        )
+        for row in statuses
+    ]
@@ -2,9 +2,9 @@
 from __future__ import annotations
 
 from functools import lru_cache
-from typing import Any, List
+from typing import Any, List, Literal
 
-from pydantic import AnyHttpUrl, BaseModel, Field
+from pydantic import AnyHttpUrl, BaseModel, Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -34,6 +34,70 @@ class BrokerFeatureFlags(BaseModel):
     enable_email_csv: bool = True
 
 
+class IngestSettings(BaseModel):
+    """Trade ingestion tuning."""
+
+    csv_batch_size: int = 5000
+    broker_page_size: int = 500
+    job_concurrency: int = 2
+    stale_job_minutes: int = 30
+    job_max_attempts: int = 3
+
+
+class SyncSettings(BaseModel):
+    """Scheduled broker sync settings."""
+
+    max_workers: int = 8
+    broker_concurrency: dict[str, int] = Field(default_factory=lambda: {"shioaji": 4, "ibkr": 4})
+    initial_lookback_days: int = 1
+    catchup_chunk_days: int = 7
+
+
+class ReconcileSettings(BaseModel):
+    """Broker position reconciliation."""
+
+    enabled: bool = True
+    max_workers: int = 32
+    deadline_seconds: float = 300.0
+    qty_tolerance: float = 1e-6
+
+
+class LotSettings(BaseModel):
+    """Realized PnL lot matching."""
+
+    method: Literal["fifo", "lifo", "average"] = "fifo"
+    match_on_ingest: bool = True
+
+
+class AnalyticsSettings(BaseModel):
+    """Analytics query tuning."""
+
+    stream_trades: bool = True
+    trade_fetch_size: int = 50_000
+    kpi_engine: Literal["numpy", "sql"] = "numpy"
+    kpi_cache: bool = True
+    kpi_cache_rows_per_ref: int = 32
+    rolling_max_windows: int = 8
+    portfolio_cache_size: int = 64
+    drawdown_cache_size: int = 256
+
+
+class SimulationSettings(BaseModel):
+    """Bootstrap simulation limits and parallelism."""
+
+    max_paths: int = 100_000
+    max_horizon: int = 5_000
+    max_workers: int = 4
+    parallel_min_steps: int = 50_000_000
+
+
+class PriceSettings(BaseModel):
+    """Local OHLCV bar store."""
+
+    root: str = "data/prices"
+    timeframes: list[str] = Field(default_factory=lambda: ["1m", "5m", "15m", "30m", "60m", "1d"])
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
@@ -45,10 +109,24 @@ class Settings(BaseSettings):
     security: SecuritySettings = Field(default_factory=SecuritySettings)
     database: DatabaseSettings = Field(default_factory=DatabaseSettings)
     broker_flags: BrokerFeatureFlags = Field(default_factory=BrokerFeatureFlags)
+    ingest: IngestSettings = Field(default_factory=IngestSettings)
+    sync: SyncSettings = Field(default_factory=SyncSettings)
+    analytics: AnalyticsSettings = Field(default_factory=AnalyticsSettings)
+    lots: LotSettings = Field(default_factory=LotSettings)
+    reconcile: ReconcileSettings = Field(default_factory=ReconcileSettings)
+    simulation: SimulationSettings = Field(default_factory=SimulationSettings)
+    prices: PriceSettings = Field(default_factory=PriceSettings)
 
     encryption_key: str = Field(default="0123456789abcdef0123456789abcdef")
     timezone: str = Field(default="Asia/Taipei")
 
+    @model_validator(mode="after")
+    def _positions_are_maintained(self) -> "Settings":
+        # The position book is written by the lot matcher; without it reconciliation compares stale rows.
+        if self.reconcile.enabled and not self.lots.match_on_ingest:
+            raise ValueError("reconcile.enabled requires lots.match_on_ingest; disable reconciliation too")
+        return self
+
 
 @lru_cache
 def get_settings() -> Settings:
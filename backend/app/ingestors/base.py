@@ -0,0 +1,40 @@
+"""Common interface for paged broker connectors."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Protocol
+
+from app.models.models import Account
+from app.services.trades import TradeDTO
+
+
+@dataclass
+class TradePage:
+    """One page of broker fills.
+
+    ``cursor`` is an opaque token that resumes the fetch after this page; it is
+    ``None`` on the last page.
+    """
+
+    trades: List[TradeDTO]
+    cursor: str | None
+
+
+class BrokerConnector(Protocol):
+    """Broker integration that yields trades page by page."""
+
+    def iter_trades(
+        self,
+        account: Account,
+        start: datetime,
+        end: datetime,
+        cursor: str | None = None,
+        page_size: int = 500,
+    ) -> Iterator[TradePage]:
+        """Yield pages of trades in ``[start, end]``, resuming after ``cursor`` if given."""
+        ...
+
+    def fetch_positions(self, account: Account) -> list[dict]:
+        """Return current broker positions."""
+        ...
@@ -2,12 +2,16 @@
 from __future__ import annotations
 
 import csv
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
 from io import StringIO
-from typing import Callable, Dict, Iterable, List
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, TextIO
 
-from app.services.trades import TradeDTO
+import numpy as np
+import pandas as pd
+
+from app.core.settings import settings
+from app.services.trades import TradeBatch, TradeDTO
 
 
 @dataclass
@@ -22,46 +26,190 @@ class CSVRowMapping:
     fee: str
     tax: str
     order_id: str
+    venue: str | None = None
+    date_format: str = "%Y-%m-%d"
+
+
+@dataclass
+class RejectedRow:
+    """A CSV data row that could not be parsed; ``row`` is 1-based, header excluded."""
+
+    row: int
+    reason: str
+
+
+@dataclass
+class CSVBatch:
+    """Trades parsed from one slice of a CSV statement."""
+
+    trades: TradeBatch
+    rejected: List[RejectedRow] = field(default_factory=list)
+
+    @property
+    def ignored_rows(self) -> int:
+        return len(self.rejected)
+
+
+DIALECTS: Dict[str, CSVRowMapping] = {
+    "generic_tw": CSVRowMapping(
+        date="date",
+        symbol="symbol",
+        side="side",
+        qty="qty",
+        price="price",
+        fee="fee",
+        tax="tax",
+        order_id="order_id",
+        venue="venue",
+    ),
+}
+
+
+def _text_column(frame: pd.DataFrame, name: str | None) -> pd.Series:
+    """Return a string column, or empty strings when the column is absent."""
+
+    if name is None or name not in frame:
+        return pd.Series("", index=frame.index, dtype=object)
+    return frame[name].fillna("")
+
 
+def _optional_number(column: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Parse a numeric column where blanks mean zero; return values and an invalid mask."""
 
-Parser = Callable[[int, Iterable[dict[str, str]]], List[TradeDTO]]
+    blank = column == ""
+    values = pd.to_numeric(column.where(~blank, "0"), errors="coerce")
+    return values.fillna(0.0), values.isna()
+
+
+def _raw_records(frame: pd.DataFrame) -> list[dict[str, str]]:
+    """Rebuild the original row dicts, avoiding ``DataFrame.to_dict`` per-cell boxing."""
+
+    columns = [str(name) for name in frame.columns]
+    values = zip(*(frame[name].fillna("").tolist() for name in frame.columns))
+    return [dict(zip(columns, row)) for row in values]
+
+
+def parse_csv_frame(account_id: int, frame: pd.DataFrame, mapping: CSVRowMapping) -> CSVBatch:
+    """Parse a frame of raw CSV strings column by column.
+
+    ``frame.index`` is expected to hold zero-based data row numbers, as produced
+    by ``pd.read_csv``; rejections report them 1-based.
+    """
+
+    missing = [
+        name
+        for name in (mapping.date, mapping.symbol, mapping.side, mapping.qty, mapping.price)
+        if name not in frame
+    ]
+    symbol = _text_column(frame, mapping.symbol)
+    side = _text_column(frame, mapping.side).str.upper()
+    trade_ts = pd.to_datetime(_text_column(frame, mapping.date), format=mapping.date_format, errors="coerce")
+    qty = pd.to_numeric(_text_column(frame, mapping.qty), errors="coerce")
+    price = pd.to_numeric(_text_column(frame, mapping.price), errors="coerce")
+    fee, bad_fee = _optional_number(_text_column(frame, mapping.fee))
+    tax, bad_tax = _optional_number(_text_column(frame, mapping.tax))
+
+    checks = [
+        (pd.Series(bool(missing), index=frame.index), f"missing column: {', '.join(missing)}"),
+        (trade_ts.isna(), "invalid date"),
+        (symbol == "", "missing symbol"),
+        (~side.isin(["BUY", "SELL"]), "invalid side"),
+        (qty.isna(), "invalid qty"),
+        (price.isna(), "invalid price"),
+        (bad_fee, "invalid fee"),
+        (bad_tax, "invalid tax"),
+    ]
+    reasons = np.select([mask.to_numpy() for mask, _ in checks], [reason for _, reason in checks], default="")
+    ok = reasons == ""
+    rejected = [
+        RejectedRow(row=int(row) + 1, reason=str(reason))
+        for row, reason in zip(frame.index[~ok], reasons[~ok])
+    ]
+
+    order_id = _text_column(frame, mapping.order_id)[ok]
+    venue = _text_column(frame, mapping.venue)[ok]
+    batch = TradeBatch(
+        account_id=account_id,
+        symbol=symbol[ok].to_numpy(dtype=object),
+        side=side[ok].to_numpy(dtype=object),
+        qty=qty[ok].to_numpy(dtype=float),
+        price=price[ok].to_numpy(dtype=float),
+        trade_ts=trade_ts[ok].to_numpy(dtype="datetime64[us]"),
+        order_id=order_id.where(order_id != "", None).to_numpy(dtype=object),
+        fee=fee[ok].to_numpy(dtype=float),
+        tax=tax[ok].to_numpy(dtype=float),
+        venue=venue.where(venue != "", None).to_numpy(dtype=object),
+        raw=_raw_records(frame[ok]),
+    )
+    return CSVBatch(trades=batch, rejected=rejected)
+
+
+def _fit_row(row: list[str], width: int) -> list[str] | None:
+    """Pad a short row, drop empty trailing fields (trailing delimiters); ``None`` if it is too long."""
+
+    if len(row) > width:
+        if any(row[width:]):
+            return None
+        return row[:width]
+    return row + [""] * (width - len(row))
+
+
+def iter_csv_batches(
+    account_id: int,
+    stream: TextIO,
+    batch_size: int,
+    dialect: str = "generic_tw",
+) -> Iterator[CSVBatch]:
+    """Parse a CSV stream incrementally, yielding at most ``batch_size`` rows at a time.
+
+    Rows are split by ``csv.reader`` and handed to ``parse_csv_frame`` as string
+    columns. Trailing delimiters are tolerated, short rows are padded with blanks,
+    and rows with extra non-empty fields are rejected. (``pd.read_csv`` either
+    shifts trailing-delimiter rows into the index or, with ``index_col=False``,
+    silently truncates over-long rows, so it cannot report them.)
+    """
+
+    mapping = DIALECTS[dialect]
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if not header:
+        return
+    while header and header[-1] == "":
+        header.pop()
+    width = len(header)
+    data_rows = (row for row in reader if row)
+    row_number = 0
+    while True:
+        chunk = list(islice(data_rows, batch_size))
+        if not chunk:
+            return
+        kept: list[list[str]] = []
+        index: list[int] = []
+        too_long: list[RejectedRow] = []
+        for number, row in enumerate(chunk, start=row_number):
+            fitted = _fit_row(row, width)
+            if fitted is None:
+                too_long.append(RejectedRow(row=number + 1, reason="too many fields"))
+            else:
+                kept.append(fitted)
+                index.append(number)
+        row_number += len(chunk)
+        frame = pd.DataFrame(kept, columns=header, index=index, dtype=str)
+        batch = parse_csv_frame(account_id, frame, mapping)
+        if too_long:
+            batch.rejected = sorted(batch.rejected + too_long, key=lambda rejected: rejected.row)
+        yield batch
 
 
 def parse_generic_tw_rows(account_id: int, rows: Iterable[dict[str, str]]) -> List[TradeDTO]:
     """Parse rows for generic Taiwan CSV layout."""
 
-    trades: List[TradeDTO] = []
-    for row in rows:
-        try:
-            trade_dt = datetime.strptime(row["date"], "%Y-%m-%d")
-            trades.append(
-                TradeDTO(
-                    account_id=account_id,
-                    symbol=row["symbol"],
-                    side=row["side"].upper(),
-                    qty=float(row["qty"]),
-                    price=float(row["price"]),
-                    trade_ts=trade_dt,
-                    order_id=row.get("order_id"),
-                    fee=float(row.get("fee", 0) or 0),
-                    tax=float(row.get("tax", 0) or 0),
-                    venue=row.get("venue"),
-                    raw=row,
-                )
-            )
-        except (KeyError, ValueError):
-            continue
-    return trades
-
-
-DIALECTS: Dict[str, Parser] = {
-    "generic_tw": parse_generic_tw_rows,
-}
+    frame = pd.DataFrame.from_records(list(rows), dtype=str)
+    return parse_csv_frame(account_id, frame, DIALECTS["generic_tw"]).trades.to_dtos()
 
 
 def parse_generic_tw_csv(account_id: int, content: str) -> List[TradeDTO]:
     """Parse CSV content according to the generic Taiwan layout."""
 
-    buffer = StringIO(content)
-    reader = csv.DictReader(buffer)
-    return parse_generic_tw_rows(account_id, reader)
+    batches = iter_csv_batches(account_id, StringIO(content), settings.ingest.csv_batch_size)
+    return [dto for batch in batches for dto in batch.trades.to_dtos()]
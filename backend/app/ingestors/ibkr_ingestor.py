@@ -2,35 +2,49 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
-from typing import List
+from typing import Iterator, List
 
+from app.ingestors.base import TradePage
 from app.models.models import Account
 from app.services.trades import TradeDTO
 
 
-def fetch_trades(account: Account, start: datetime, end: datetime) -> List[TradeDTO]:
-    """Return simulated IBKR trades."""
+def iter_trades(
+    account: Account,
+    start: datetime,
+    end: datetime,
+    cursor: str | None = None,
+    page_size: int = 500,
+) -> Iterator[TradePage]:
+    """Yield simulated IBKR trades in pages; the cursor is the next timestamp to fetch."""
 
-    trades: List[TradeDTO] = []
-    ts = start
+    ts = datetime.fromisoformat(cursor) if cursor else start
     while ts <= end:
-        trades.append(
-            TradeDTO(
-                account_id=account.id,
-                symbol="AAPL",
-                side="BUY" if ts.day % 2 == 0 else "SELL",
-                qty=10,
-                price=170.0,
-                trade_ts=ts,
-                order_id=f"IBKR-{ts.timestamp()}",
-                fee=1.5,
-                tax=0.0,
-                venue="NASDAQ",
-                raw={"source": "mock"},
+        trades: List[TradeDTO] = []
+        while ts <= end and len(trades) < page_size:
+            trades.append(
+                TradeDTO(
+                    account_id=account.id,
+                    symbol="AAPL",
+                    side="BUY" if ts.day % 2 == 0 else "SELL",
+                    qty=10,
+                    price=170.0,
+                    trade_ts=ts,
+                    order_id=f"IBKR-{ts.timestamp()}",
+                    fee=1.5,
+                    tax=0.0,
+                    venue="NASDAQ",
+                    raw={"source": "mock"},
+                )
             )
-        )
-        ts += timedelta(days=1)
-    return trades
+            ts += timedelta(days=1)
+        yield TradePage(trades=trades, cursor=ts.isoformat() if ts <= end else None)
+
+
+def fetch_trades(account: Account, start: datetime, end: datetime) -> List[TradeDTO]:
+    """Return simulated IBKR trades."""
+
+    return [trade for page in iter_trades(account, start, end) for trade in page.trades]
 
 
 def fetch_positions(account: Account) -> list[dict]:
@@ -3,35 +3,49 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from random import random
-from typing import List
+from typing import Iterator, List
 
+from app.ingestors.base import TradePage
 from app.models.models import Account
 from app.services.trades import TradeDTO
 
 
-def fetch_trades(account: Account, start: datetime, end: datetime) -> List[TradeDTO]:
-    """Return mock trades for Shioaji connection."""
+def iter_trades(
+    account: Account,
+    start: datetime,
+    end: datetime,
+    cursor: str | None = None,
+    page_size: int = 500,
+) -> Iterator[TradePage]:
+    """Yield mock Shioaji trades in pages; the cursor is the next timestamp to fetch."""
 
-    trades: List[TradeDTO] = []
-    ts = start
+    ts = datetime.fromisoformat(cursor) if cursor else start
     while ts <= end:
-        trades.append(
-            TradeDTO(
-                account_id=account.id,
-                symbol="2330.TW",
-                side="BUY" if random() > 0.5 else "SELL",
-                qty=1,
-                price=600 + random() * 5,
-                trade_ts=ts,
-                order_id=f"SJ-{ts.timestamp()}",
-                fee=5,
-                tax=2,
-                venue="TWSE",
-                raw={"source": "mock"},
+        trades: List[TradeDTO] = []
+        while ts <= end and len(trades) < page_size:
+            trades.append(
+                TradeDTO(
+                    account_id=account.id,
+                    symbol="2330.TW",
+                    side="BUY" if random() > 0.5 else "SELL",
+                    qty=1,
+                    price=600 + random() * 5,
+                    trade_ts=ts,
+                    order_id=f"SJ-{ts.timestamp()}",
+                    fee=5,
+                    tax=2,
+                    venue="TWSE",
+                    raw={"source": "mock"},
+                )
             )
-        )
-        ts += timedelta(days=1)
-    return trades
+            ts += timedelta(days=1)
+        yield TradePage(trades=trades, cursor=ts.isoformat() if ts <= end else None)
+
+
+def fetch_trades(account: Account, start: datetime, end: datetime) -> List[TradeDTO]:
+    """Return mock trades for Shioaji connection."""
+
+    return [trade for page in iter_trades(account, start, end) for trade in page.trades]
 
 
 def fetch_positions(account: Account) -> list[dict]:
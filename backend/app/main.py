@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import analytics, auth, accounts, ingest
 from app.core.logging import configure_logging
 from app.core.settings import settings
+from app.services.ingest_jobs import resume_queued_jobs, shutdown_executor
 
 configure_logging()
 
@@ -26,6 +27,20 @@ app.include_router(ingest.router, prefix=settings.api_v1_prefix)
 app.include_router(analytics.router, prefix=settings.api_v1_prefix)
 
 
+@app.on_event("startup")
+def start_ingest_jobs() -> None:
+    """Pick up jobs queued before the last shutdown."""
+
+    resume_queued_jobs()
+
+
+@app.on_event("shutdown")
+def stop_ingest_jobs() -> None:
+    """Stop the ingestion job executor."""
+
+    shutdown_executor()
+
+
 @app.get("/health")
 def health() -> dict[str, str]:
     """Return service health."""
@@ -1,7 +1,7 @@
 """Database models."""
 from __future__ import annotations
 
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import Optional
 
 from sqlalchemy import (
@@ -63,6 +63,7 @@ class Account(TimestampMixin, Base):
     account_code: Mapped[str] = mapped_column(String(64), nullable=False)
     currency: Mapped[str] = mapped_column(String(16), default="TWD")
     nickname: Mapped[str | None] = mapped_column(String(64))
+    equity_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
 
     user: Mapped[User] = relationship(back_populates="accounts")
     broker_connection: Mapped[BrokerConnection | None] = relationship(back_populates="accounts")
@@ -112,6 +113,18 @@ class Trade(TimestampMixin, Base):
         secondary="trade_tags", back_populates="trades", lazy="selectin"
     )
 
+    __table_args__ = (
+        UniqueConstraint(
+            "account_id",
+            "order_id",
+            "trade_ts",
+            "price",
+            "qty",
+            name="uq_trade_natural_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
 
 class Position(TimestampMixin, Base):
     __tablename__ = "positions"
@@ -125,6 +138,59 @@ class Position(TimestampMixin, Base):
     account: Mapped[Account] = relationship(back_populates="positions")
     symbol: Mapped[Symbol] = relationship()
 
+    __table_args__ = (UniqueConstraint("account_id", "symbol_id", name="uq_position_account_symbol"),)
+
+
+class OpenLot(TimestampMixin, Base):
+    __tablename__ = "open_lots"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    # Derived from ``trades`` and rebuilt wholesale, so only the account is a foreign key.
+    symbol_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    trade_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    direction: Mapped[str] = mapped_column(Enum("LONG", "SHORT", name="lot_direction_enum"), nullable=False)
+    # Matching state is stored as doubles so resumed matching equals a full replay.
+    qty: Mapped[float] = mapped_column(Float, nullable=False)
+    price: Mapped[float] = mapped_column(Float, nullable=False)
+    cost: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    opened_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class ClosedTrade(TimestampMixin, Base):
+    __tablename__ = "closed_trades"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    symbol_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    open_trade_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    close_trade_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    direction: Mapped[str] = mapped_column(Enum("LONG", "SHORT", name="lot_direction_enum"), nullable=False)
+    qty: Mapped[float] = mapped_column(Numeric(18, 4), nullable=False)
+    open_price: Mapped[float] = mapped_column(Numeric(18, 4), nullable=False)
+    close_price: Mapped[float] = mapped_column(Numeric(18, 4), nullable=False)
+    opened_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    closed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    realized_pnl: Mapped[float] = mapped_column(Numeric(18, 4), nullable=False)
+
+    @property
+    def holding_period(self) -> timedelta:
+        return self.closed_at - self.opened_at
+
+
+class LotMatchState(TimestampMixin, Base):
+    __tablename__ = "lot_match_state"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    method: Mapped[str] = mapped_column(Enum("fifo", "lifo", "average", name="lot_method_enum"), nullable=False)
+    # Position of the last matched trade in (trade_ts, id) order, and the highest id matched.
+    last_trade_ts: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_trade_id: Mapped[int | None] = mapped_column(BigInteger)
+    max_trade_id: Mapped[int | None] = mapped_column(BigInteger)
+
+    __table_args__ = (UniqueConstraint("account_id", name="uq_lot_match_state_account"),)
+
 
 class CashActivity(TimestampMixin, Base):
     __tablename__ = "cash_activities"
@@ -204,3 +270,71 @@ class KPI(TimestampMixin, Base):
             "scope", "scope_ref_id", "period_start", "period_end", name="uq_kpi_period"
         ),
     )
+
+
+class IngestJob(TimestampMixin, Base):
+    __tablename__ = "ingest_jobs"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    broker: Mapped[str] = mapped_column(Enum("shioaji", "ibkr", "email_csv", name="broker_enum"), nullable=False)
+    status: Mapped[str] = mapped_column(
+        Enum("queued", "running", "succeeded", "failed", name="ingest_job_status_enum"),
+        nullable=False,
+        default="queued",
+    )
+    start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    end: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    progress: Mapped[float] = mapped_column(Float, default=0)
+    imported: Mapped[int] = mapped_column(Integer, default=0)
+    duplicates: Mapped[int] = mapped_column(Integer, default=0)
+    cursor: Mapped[str | None] = mapped_column(String(255))
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(String(1024))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+
+class SyncWatermark(TimestampMixin, Base):
+    __tablename__ = "sync_watermarks"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    broker: Mapped[str] = mapped_column(Enum("shioaji", "ibkr", "email_csv", name="broker_enum"), nullable=False)
+    synced_from: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    synced_through: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_trade_ts: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (UniqueConstraint("account_id", "broker", name="uq_sync_watermark"),)
+
+
+class ReconciliationStatus(TimestampMixin, Base):
+    __tablename__ = "reconciliation_status"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    broker: Mapped[str] = mapped_column(Enum("shioaji", "ibkr", "email_csv", name="broker_enum"), nullable=False)
+    status: Mapped[str] = mapped_column(
+        Enum("in_sync", "out_of_sync", "failed", "timed_out", name="reconciliation_status_enum"),
+        nullable=False,
+    )
+    breaks: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(String(1024))
+    checked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (UniqueConstraint("account_id", name="uq_reconciliation_status_account"),)
+
+
+class PositionBreak(TimestampMixin, Base):
+    __tablename__ = "position_breaks"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    symbol: Mapped[str] = mapped_column(String(64), nullable=False)
+    broker_qty: Mapped[float] = mapped_column(Numeric(18, 4), nullable=False)
+    journal_qty: Mapped[float] = mapped_column(Numeric(18, 4), nullable=False)
+    qty_diff: Mapped[float] = mapped_column(Numeric(18, 4), nullable=False)
+    broker_avg_price: Mapped[float | None] = mapped_column(Numeric(18, 4))
+    journal_avg_price: Mapped[float | None] = mapped_column(Numeric(18, 4))
+    detected_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -47,12 +47,101 @@ class TradeQuery(BaseModel):
     page_size: int = 50
 
 
+class PositionResponse(BaseModel):
+    symbol_id: int
+    symbol: str
+    qty: float
+    avg_price: float
+    updated_at: datetime | None
+
+
 class EquityPoint(BaseModel):
     date: date
     equity: float
     net_pnl_day: float
 
 
+class PortfolioKPIs(BaseModel):
+    start_equity: float | None
+    end_equity: float | None
+    net_pnl: float
+    mdd: float
+    peak_date: date | None
+    trough_date: date | None
+    positive_days: float | None
+    best_day: float | None
+    worst_day: float | None
+
+
+class PortfolioResponse(BaseModel):
+    account_ids: list[int]
+    currencies: list[str]
+    points: list[EquityPoint]
+    kpis: PortfolioKPIs
+
+
+class DrawdownResponse(BaseModel):
+    account_id: int
+    start: date | None
+    end: date | None
+    mdd: float
+    peak_date: date | None
+    trough_date: date | None
+    peak_equity: float | None
+    trough_equity: float | None
+
+
+class PriceBarsResponse(BaseModel):
+    symbol: str
+    timeframe: str
+    ts: list[datetime]
+    open: list[float]
+    high: list[float]
+    low: list[float]
+    close: list[float]
+    volume: list[float]
+
+
+class RollingKPISeries(BaseModel):
+    window: int
+    dates: list[date]
+    trades: list[int]
+    win_rate: list[float]
+    expectancy: list[float]
+    net_pnl: list[float]
+    drawdown: list[float]
+
+
+class RollingKPIResponse(BaseModel):
+    account_id: int
+    mode: str
+    series: list[RollingKPISeries]
+
+
+class SimulatedDistribution(BaseModel):
+    mean: float
+    std: float
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+
+
+class BootstrapResponse(BaseModel):
+    scope: str
+    scope_ref_id: int
+    trades: int
+    paths: int
+    horizon: int
+    seed: int
+    final_equity: SimulatedDistribution
+    max_drawdown: SimulatedDistribution
+    prob_loss: float
+    capital: float | None
+    risk_of_ruin: float | None
+
+
 class KPIResponse(BaseModel):
     scope: str
     scope_ref_id: int
@@ -67,6 +156,19 @@ class KPIResponse(BaseModel):
     total_trades: int
 
 
+class KPICacheStats(BaseModel):
+    hits: int
+    misses: int
+    bypassed: int
+    invalidated: int
+    evicted: int
+
+
+class MonthlyRollupResult(BaseModel):
+    account_month: int
+    strategy_month: int
+
+
 class KPIQuery(BaseModel):
     scope: str
     scope_ref_id: int
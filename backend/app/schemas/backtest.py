@@ -0,0 +1,95 @@
+"""Backtest rule and result schemas."""
+from __future__ import annotations
+
+from datetime import date
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+
+class RuleCondition(BaseModel):
+    """An indicator threshold, e.g. ``{"indicator": "zscore", "window": 20, "below": -2}``."""
+
+    indicator: Literal["close", "sma_ratio", "momentum", "zscore", "rsi"]
+    window: int = Field(default=20, ge=1)
+    above: float | None = None
+    below: float | None = None
+
+    @model_validator(mode="after")
+    def _has_threshold(self) -> "RuleCondition":
+        if self.above is None and self.below is None:
+            raise ValueError("Condition needs 'above' or 'below'")
+        return self
+
+
+class PositionSizing(BaseModel):
+    """Either a fixed quantity or a notional per entry, rounded down to ``lot_size``."""
+
+    qty: float | None = Field(default=None, gt=0)
+    notional: float | None = Field(default=None, gt=0)
+    lot_size: float = Field(default=1.0, gt=0)
+
+    @model_validator(mode="after")
+    def _one_method(self) -> "PositionSizing":
+        if (self.qty is None) == (self.notional is None):
+            raise ValueError("Sizing needs exactly one of 'qty' or 'notional'")
+        return self
+
+
+class StrategyRules(BaseModel):
+    """The backtestable form of ``Strategy.rules_json``.
+
+    Entry and exit conditions are evaluated on each bar's close and must all
+    hold; orders fill at the next bar's open. Stop-loss and take-profit are
+    fractions of the entry price checked against each bar's range.
+    """
+
+    side: Literal["long", "short"] = "long"
+    entry: list[RuleCondition] = Field(min_length=1)
+    exit: list[RuleCondition] = Field(default_factory=list)
+    stop_loss: float | None = Field(default=None, gt=0, lt=1)
+    take_profit: float | None = Field(default=None, gt=0)
+    max_holding_bars: int | None = Field(default=None, ge=1)
+    sizing: PositionSizing = Field(default_factory=lambda: PositionSizing(qty=1))
+    fee_rate: float = Field(default=0.0, ge=0)
+    tax_rate: float = Field(default=0.0, ge=0)
+
+    @field_validator("entry", "exit", mode="before")
+    @classmethod
+    def _as_list(cls, value):
+        return [value] if isinstance(value, dict) else value
+
+
+class BacktestKPIs(BaseModel):
+    win_rate: float | None
+    avg_win: float | None
+    avg_loss: float | None
+    profit_factor: float | None
+    expectancy: float | None
+    mdd: float | None
+    total_trades: int
+
+
+class BacktestSymbolResult(BaseModel):
+    symbol: str
+    bars: int
+    kpis: BacktestKPIs
+
+
+class BacktestFill(BaseModel):
+    symbol: str
+    side: str
+    trade_date: date
+    qty: float
+    price: float
+    fee: float
+    tax: float
+    reason: str
+
+
+class BacktestResponse(BaseModel):
+    strategy_id: int
+    bars: int
+    kpis: BacktestKPIs
+    symbols: list[BacktestSymbolResult]
+    trades: list[BacktestFill]
@@ -0,0 +1,47 @@
+"""Ingestion job and reconciliation schemas."""
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class IngestJobResponse(BaseModel):
+    """State of a broker ingestion job."""
+
+    id: int
+    account_id: int
+    broker: str
+    status: str
+    start: datetime
+    end: datetime
+    progress: float
+    imported: int
+    duplicates: int
+    error: str | None
+    created_at: datetime | None
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+class PositionBreakResponse(BaseModel):
+    """A symbol whose broker and journal quantities differ."""
+
+    symbol: str
+    broker_qty: float
+    journal_qty: float
+    qty_diff: float
+    broker_avg_price: float | None
+    journal_avg_price: float | None
+    detected_at: datetime
+
+
+class ReconciliationReport(BaseModel):
+    """Latest reconciliation outcome for one account."""
+
+    account_id: int
+    broker: str
+    status: str
+    checked_at: datetime
+    error: str | None
+    breaks: list[PositionBreakResponse]
@@ -0,0 +1,193 @@
+"""Vectorized backtests of ``Strategy.rules_json`` over price bars.
+
+Indicators and entry/exit signals are computed for a whole symbol as arrays,
+and "next signal at or after bar i" lookups are precomputed with a reverse
+running minimum. The position loop then only steps from trade to trade: each
+holding period is scanned once for stop-loss and take-profit hits, so a symbol
+costs O(bars) array work plus O(trades) Python. Simulated fills are returned as
+``TradeColumns`` so they go through the same KPI engine as real trades.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.schemas.backtest import RuleCondition, StrategyRules
+from app.services.kpi_engine import TradeColumns, compute_trade_kpis, grouped_trade_kpis, kpi_records
+from app.services.price_store import Bars
+
+
+def _rolling(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    """Apply ``reducer`` over trailing windows; the first ``window - 1`` bars are NaN."""
+
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1 :] = reducer(sliding_window_view(values, window), axis=1)
+    return result
+
+
+def indicator(bars: Bars, name: str, window: int) -> np.ndarray:
+    """Evaluate an indicator on closes; NaN where the window is not yet filled.
+
+    ``rsi`` uses simple averages of gains and losses (Cutler's RSI).
+    """
+
+    close = bars.close
+    if name == "close":
+        return close
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if name == "sma_ratio":
+            return close / _rolling(close, window, np.mean) - 1.0
+        if name == "momentum":
+            result = np.full(len(close), np.nan)
+            result[window:] = close[window:] / close[:-window] - 1.0
+            return result
+        if name == "zscore":
+            return (close - _rolling(close, window, np.mean)) / _rolling(close, window, np.std)
+        if name == "rsi":
+            change = np.diff(close, prepend=np.nan)
+            gain = _rolling(np.clip(change, 0.0, None), window, np.mean)
+            loss = _rolling(np.clip(-change, 0.0, None), window, np.mean)
+            rsi = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+            rsi[np.isnan(loss)] = np.nan
+            return rsi
+    raise ValueError(f"Unknown indicator {name!r}")
+
+
+def signal(bars: Bars, conditions: Sequence[RuleCondition], cache: dict) -> np.ndarray:
+    """Bars where every condition holds on the close; NaN indicator values never signal."""
+
+    mask = np.ones(len(bars), dtype=bool) if conditions else np.zeros(len(bars), dtype=bool)
+    for condition in conditions:
+        key = (condition.indicator, condition.window)
+        if key not in cache:
+            cache[key] = indicator(bars, *key)
+        values = cache[key]
+        if condition.above is not None:
+            mask &= values > condition.above
+        if condition.below is not None:
+            mask &= values < condition.below
+    return mask
+
+
+def next_true(mask: np.ndarray) -> np.ndarray:
+    """For each bar, the first index at or after it where ``mask`` is set (``len(mask)`` if none)."""
+
+    n = len(mask)
+    positions = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(positions[::-1])[::-1]
+
+
+def _first_hit(hits: np.ndarray) -> int | None:
+    return int(hits.argmax()) if hits.any() else None
+
+
+def _size(rules: StrategyRules, price: float) -> float:
+    sizing = rules.sizing
+    if sizing.qty is not None:
+        return sizing.qty
+    return np.floor(sizing.notional / price / sizing.lot_size) * sizing.lot_size
+
+
+def backtest_symbol(bars: Bars, rules: StrategyRules) -> list[tuple]:
+    """Simulate one symbol; returns ``(side, qty, price, fee, tax, day, reason)`` fills.
+
+    Entries and signal or ``max_holding_bars`` exits fill at the open of the bar
+    after the signal. A stop or target inside a bar fills at its level, or at the
+    open if the bar gaps through it; when both are hit in one bar the stop wins.
+    A position still open on the last bar is closed at its close.
+    """
+
+    n = len(bars)
+    cache: dict = {}
+    next_entry = next_true(signal(bars, rules.entry, cache))
+    next_exit = next_true(signal(bars, rules.exit, cache))
+    long = rules.side == "long"
+    open_side, close_side = ("BUY", "SELL") if long else ("SELL", "BUY")
+    adverse, favourable = (bars.low, bars.high) if long else (bars.high, bars.low)
+    direction = 1.0 if long else -1.0
+
+    def fill(side: str, qty: float, price: float, index: int, reason: str) -> tuple:
+        notional = qty * price
+        tax = notional * rules.tax_rate if side == "SELL" else 0.0
+        return (side, qty, price, notional * rules.fee_rate, tax, bars.ts[index].astype(object), reason)
+
+    fills: list[tuple] = []
+    bar = 0
+    while bar < n:
+        entry = int(next_entry[bar]) + 1
+        if entry >= n:
+            break
+        price = float(bars.open[entry])
+        qty = _size(rules, price)
+        if qty <= 0:
+            bar = entry
+            continue
+        exit_bar, exit_price, reason = n - 1, float(bars.close[-1]), "end"
+        if next_exit[entry] + 1 < n:
+            exit_bar = int(next_exit[entry]) + 1
+            exit_price, reason = float(bars.open[exit_bar]), "signal"
+        if rules.max_holding_bars is not None and entry + rules.max_holding_bars < exit_bar:
+            exit_bar = entry + rules.max_holding_bars
+            exit_price, reason = float(bars.open[exit_bar]), "time"
+        # Stops can trigger from the entry bar up to the bar before a planned open exit.
+        scan = slice(entry, exit_bar + 1 if reason == "end" else exit_bar)
+        stop = take = None
+        if rules.stop_loss is not None:
+            level = price * (1.0 - direction * rules.stop_loss)
+            stop = _first_hit(direction * (adverse[scan] - level) <= 0)
+        if rules.take_profit is not None:
+            target = price * (1.0 + direction * rules.take_profit)
+            take = _first_hit(direction * (favourable[scan] - target) >= 0)
+        if stop is not None and (take is None or stop <= take):
+            exit_bar = entry + stop
+            gap = float(bars.open[exit_bar])
+            exit_price, reason = (min(gap, level) if long else max(gap, level)), "stop_loss"
+        elif take is not None:
+            exit_bar = entry + take
+            gap = float(bars.open[exit_bar])
+            exit_price, reason = (max(gap, target) if long else min(gap, target)), "take_profit"
+        fills.append(fill(open_side, qty, price, entry, "entry"))
+        fills.append(fill(close_side, qty, exit_price, exit_bar, reason))
+        bar = exit_bar
+    return fills
+
+
+@dataclass
+class BacktestResult:
+    """Simulated fills of every symbol, with ``symbols`` and ``reasons`` aligned to ``columns``."""
+
+    columns: TradeColumns
+    symbols: np.ndarray
+    reasons: np.ndarray
+    bars: dict[str, int]
+
+    def kpis(self) -> dict[str, float | None]:
+        return compute_trade_kpis(self.columns)
+
+    def symbol_kpis(self) -> dict[str, dict[str, float | None]]:
+        """KPIs per symbol from one grouped pass over the fills."""
+
+        return dict(kpi_records(grouped_trade_kpis(self.columns, {"symbol": self.symbols})))
+
+
+def run_backtest(bars: Iterable[Bars], rules: StrategyRules) -> BacktestResult:
+    """Backtest every symbol independently and collect the fills in symbol, then execution, order."""
+
+    rows: list[tuple] = []
+    symbols: list[str] = []
+    counts: dict[str, int] = {}
+    for series in bars:
+        fills = backtest_symbol(series, rules)
+        rows.extend(fills)
+        symbols.extend([series.symbol] * len(fills))
+        counts[series.symbol] = len(series)
+    return BacktestResult(
+        columns=TradeColumns.from_rows(row[:6] for row in rows),
+        symbols=np.array(symbols, dtype=object),
+        reasons=np.array([row[6] for row in rows], dtype=object),
+        bars=counts,
+    )
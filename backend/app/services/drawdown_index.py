@@ -0,0 +1,252 @@
+"""Segment-tree index over daily equity for range drawdown queries.
+
+Each node covers a run of days and stores the highest and lowest equity in it
+and the worst peak-to-trough decline inside it, with positions. Two adjacent
+nodes combine in O(1), so the maximum drawdown, peak and trough of any
+``[start, end]`` window are answered in O(log n), and appending or rewriting
+the tail of the curve only touches the affected leaf-to-root paths.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from threading import Lock
+from typing import Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.models import Account, EquityDaily
+
+# (max, max_pos, min, min_pos, mdd, peak_pos, trough_pos); ``None`` is the empty node.
+Node = tuple[float, int, float, int, float, int, int]
+
+_STORED_SCALE = Decimal("0.0001")
+
+
+def _stored_units(value: float | Decimal) -> int:
+    """Equity in 1e-4 units as ``Numeric(18, 4)`` stores it.
+
+    Floats are bound by their ``repr`` and rounded half away from zero, matching
+    how PostgreSQL converts the literal.
+    """
+
+    if not isinstance(value, Decimal):
+        value = Decimal(repr(float(value)))
+    return int(value.quantize(_STORED_SCALE, rounding=ROUND_HALF_UP).scaleb(4))
+
+
+def _leaf(value: float, position: int) -> Node:
+    return (value, position, value, position, 0.0, position, position)
+
+
+def _combine(left: Node | None, right: Node | None) -> Node | None:
+    """Merge two adjacent nodes, ``left`` covering the earlier days; ties favour earlier days."""
+
+    if left is None:
+        return right
+    if right is None:
+        return left
+    l_max, l_max_pos, l_min, l_min_pos, l_mdd, l_peak, l_trough = left
+    r_max, r_max_pos, r_min, r_min_pos, r_mdd, r_peak, r_trough = right
+    mdd, peak, trough = l_mdd, l_peak, l_trough
+    cross = r_min - l_max
+    if cross < mdd:
+        mdd, peak, trough = cross, l_max_pos, r_min_pos
+    if r_mdd < mdd:
+        mdd, peak, trough = r_mdd, r_peak, r_trough
+    return (
+        l_max if l_max >= r_max else r_max,
+        l_max_pos if l_max >= r_max else r_max_pos,
+        l_min if l_min <= r_min else r_min,
+        l_min_pos if l_min <= r_min else r_min_pos,
+        mdd,
+        peak,
+        trough,
+    )
+
+
+@dataclass
+class RangeDrawdown:
+    """Maximum drawdown within a window; dates are ``None`` for an empty window."""
+
+    mdd: float
+    peak_date: date | None
+    trough_date: date | None
+    peak_equity: float | None
+    trough_equity: float | None
+
+
+class DrawdownIndex:
+    """Segment tree over an equity curve ordered by date."""
+
+    def __init__(self, dates: Sequence[date] = (), values: Sequence[float | Decimal] = ()) -> None:
+        self.dates: list[date] = []
+        self.values: list[float] = []
+        self._size = 1
+        self._tree: list[Node | None] = [None, None]
+        self.extend(dates, values)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def copy(self) -> "DrawdownIndex":
+        """An independent index over the same curve; nodes are immutable tuples, so lists are copied shallowly."""
+
+        clone = DrawdownIndex.__new__(DrawdownIndex)
+        clone.dates = list(self.dates)
+        clone.values = list(self.values)
+        clone._size = self._size
+        clone._tree = list(self._tree)
+        return clone
+
+    def _grow(self, needed: int) -> None:
+        size = self._size
+        while size < needed:
+            size *= 2
+        if size == self._size:
+            return
+        self._size = size
+        self._tree = [None] * (2 * size)
+        for position, value in enumerate(self.values):
+            self._tree[size + position] = _leaf(value, position)
+        for node in range(size - 1, 0, -1):
+            self._tree[node] = _combine(self._tree[2 * node], self._tree[2 * node + 1])
+
+    def _set(self, position: int, node: Node | None) -> None:
+        index = self._size + position
+        self._tree[index] = node
+        index //= 2
+        while index:
+            self._tree[index] = _combine(self._tree[2 * index], self._tree[2 * index + 1])
+            index //= 2
+
+    def extend(self, dates: Sequence[date], values: Sequence[float | Decimal]) -> None:
+        """Append days that come after the last indexed day."""
+
+        if not len(dates):
+            return
+        if self.dates and dates[0] <= self.dates[-1]:
+            raise ValueError("Appended equity must start after the last indexed day")
+        start = len(self.dates)
+        self.dates.extend(dates)
+        self.values.extend(_stored_units(value) / 10_000 for value in values)
+        if len(self.dates) > self._size:
+            self._grow(len(self.dates))
+            return
+        for position in range(start, len(self.dates)):
+            self._set(position, _leaf(self.values[position], position))
+
+    def truncate(self, since: date) -> None:
+        """Drop every day on or after ``since``."""
+
+        keep = bisect_left(self.dates, since)
+        for position in range(keep, len(self.dates)):
+            self._set(position, None)
+        del self.dates[keep:]
+        del self.values[keep:]
+
+    def replace_from(self, since: date, dates: Sequence[date], values: Sequence[float | Decimal]) -> None:
+        """Rewrite the curve from ``since`` onwards, as ``rebuild_equity_curve`` does."""
+
+        self.truncate(since)
+        self.extend(dates, values)
+
+    def query(self, start: date | None = None, end: date | None = None) -> RangeDrawdown:
+        """Return the maximum drawdown of the days within ``[start, end]``."""
+
+        lo = 0 if start is None else bisect_left(self.dates, start)
+        hi = len(self.dates) if end is None else bisect_right(self.dates, end)
+        left: Node | None = None
+        right: Node | None = None
+        lo += self._size
+        hi += self._size
+        while lo < hi:
+            if lo & 1:
+                left = _combine(left, self._tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right = _combine(self._tree[hi], right)
+            lo //= 2
+            hi //= 2
+        node = _combine(left, right)
+        if node is None:
+            return RangeDrawdown(0.0, None, None, None, None)
+        _, _, _, _, mdd, peak, trough = node
+        return RangeDrawdown(
+            mdd=mdd,
+            peak_date=self.dates[peak],
+            trough_date=self.dates[trough],
+            peak_equity=self.values[peak],
+            trough_equity=self.values[trough],
+        )
+
+_indexes: OrderedDict[int, tuple[int, DrawdownIndex]] = OrderedDict()
+_indexes_lock = Lock()
+
+
+def _store(account_id: int, version: int, index: DrawdownIndex) -> None:
+    """Cache an index under the equity version it reflects; the caller holds the lock."""
+
+    _indexes[account_id] = (version, index)
+    _indexes.move_to_end(account_id)
+    while len(_indexes) > settings.analytics.drawdown_cache_size:
+        _indexes.popitem(last=False)
+
+
+def account_drawdown_index(db: Session, account_id: int) -> DrawdownIndex:
+    """Return the account's index, reloading it when ``Account.equity_version`` has moved.
+
+    The returned index is not changed by later writes, so it can be queried
+    without holding the cache lock.
+
+    The version is bumped in the same transaction as every equity write, so one
+    primary-key lookup detects writes made by other processes.
+    """
+
+    version = db.scalar(select(Account.equity_version).where(Account.id == account_id)) or 0
+    with _indexes_lock:
+        cached = _indexes.get(account_id)
+        if cached is not None and cached[0] == version:
+            _indexes.move_to_end(account_id)
+            return cached[1]
+    rows = db.execute(
+        select(EquityDaily.date, EquityDaily.equity)
+        .where(EquityDaily.account_id == account_id)
+        .order_by(EquityDaily.date)
+    ).all()
+    index = DrawdownIndex([row.date for row in rows], [row.equity for row in rows])
+    with _indexes_lock:
+        _store(account_id, version, index)
+    return index
+
+
+def apply_equity_write(
+    account_id: int, version: int, since: date | None, dates: Sequence[date], values: Sequence[float]
+) -> None:
+    """Mirror a committed equity write into a cached index, if one is loaded.
+
+    ``version`` is the account's equity version after the write and ``since`` the
+    first day that was rewritten (``None`` for a full rebuild). A cached index
+    that missed an earlier write is dropped instead. Indexes already handed out
+    are never modified: the write goes into a copy that replaces the cached one.
+    """
+
+    with _indexes_lock:
+        cached = _indexes.get(account_id)
+        if cached is None:
+            return
+        cached_version, index = cached
+        if since is None:
+            _store(account_id, version, DrawdownIndex(dates, values))
+        elif cached_version != version - 1 or (dates and dates[0] < since):
+            _indexes.pop(account_id)
+        else:
+            updated = index.copy()
+            updated.replace_from(since, dates, values)
+            _store(account_id, version, updated)
@@ -0,0 +1,167 @@
+"""Background execution of broker ingestion jobs."""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.models.models import Account, IngestJob
+from app.ingestors.base import TradePage
+from app.services.rollups import rollup_monthly_kpis
+from app.services.sync import sync_account_window
+
+logger = get_logger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.ingest.job_concurrency, thread_name_prefix="ingest-job"
+)
+
+
+def enqueue_ingest_job(
+    db: Session, user_id: int, account_id: int, broker: str, start: datetime, end: datetime
+) -> IngestJob:
+    """Persist a queued job and hand it to the executor."""
+
+    job = IngestJob(
+        user_id=user_id,
+        account_id=account_id,
+        broker=broker,
+        status="queued",
+        start=start,
+        end=end,
+        progress=0.0,
+        imported=0,
+        duplicates=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _executor.submit(run_ingest_job, job.id)
+    return job
+
+
+def requeue_stale_jobs(session: Session, now: datetime | None = None) -> int:
+    """Put running jobs without a heartbeat for ``ingest.stale_job_minutes`` back in the queue.
+
+    A job's ``updated_at`` is bumped when it is claimed and after every page it
+    writes, so a job that has been silent that long was left behind by a process
+    that died mid-run. It resumes from its recorded cursor; a job that has
+    already used ``ingest.job_max_attempts`` is marked failed instead.
+    """
+
+    now = now or datetime.now(timezone.utc)
+    stale = (
+        IngestJob.status == "running",
+        IngestJob.updated_at < now - timedelta(minutes=settings.ingest.stale_job_minutes),
+    )
+    session.execute(
+        update(IngestJob)
+        .where(*stale, IngestJob.attempts >= settings.ingest.job_max_attempts)
+        .values(status="failed", error="Interrupted after the last attempt", finished_at=now)
+    )
+    requeued = session.execute(update(IngestJob).where(*stale).values(status="queued"))
+    session.commit()
+    return requeued.rowcount
+
+
+def resume_queued_jobs() -> int:
+    """Resubmit queued and stale running jobs from a previous process, e.g. after a restart."""
+
+    with SessionLocal() as session:
+        stale = requeue_stale_jobs(session)
+        if stale:
+            logger.warning("ingest_jobs_requeued", count=stale)
+        job_ids = session.scalars(select(IngestJob.id).where(IngestJob.status == "queued")).all()
+    for job_id in job_ids:
+        _executor.submit(run_ingest_job, job_id)
+    return len(job_ids)
+
+
+def shutdown_executor() -> None:
+    """Stop accepting jobs; running jobs finish in the background."""
+
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _claim(session: Session, job_id: int) -> bool:
+    """Atomically move a job from queued to running and count the attempt; False if another runner owns it.
+
+    Claiming (like every later update) bumps ``updated_at``, the job's heartbeat.
+    """
+
+    claimed = session.execute(
+        update(IngestJob)
+        .where(IngestJob.id == job_id, IngestJob.status == "queued")
+        .values(status="running", started_at=datetime.now(timezone.utc), attempts=IngestJob.attempts + 1)
+    )
+    session.commit()
+    return claimed.rowcount == 1
+
+
+def _record_page(job_id: int, page: TradePage, progress: float) -> None:
+    """Persist progress and the resume cursor after a page has been written."""
+
+    with SessionLocal() as session:
+        session.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job_id)
+            .values(progress=progress, cursor=page.cursor)
+        )
+        session.commit()
+
+
+def run_ingest_job(job_id: int) -> None:
+    """Run a single job in its own session, recording the outcome on the job row.
+
+    The job starts from its recorded cursor, so a retry skips the pages an
+    earlier attempt already wrote. Failures other than ``ValueError`` (a bad
+    account or broker) are retried until ``ingest.job_max_attempts``.
+    """
+
+    with SessionLocal() as session:
+        if not _claim(session, job_id):
+            return
+        job = session.get(IngestJob, job_id)
+        assert job is not None
+        retry = False
+        try:
+            account = session.get(Account, job.account_id)
+            if account is None:
+                raise ValueError("Account not found")
+            result = sync_account_window(
+                session,
+                account,
+                job.broker,
+                job.start,
+                job.end,
+                chunk=timedelta(days=settings.sync.catchup_chunk_days),
+                cursor=job.cursor,
+                on_page=lambda page, progress: _record_page(job_id, page, progress),
+            )
+            if result.imported:
+                rollup_monthly_kpis(session, account_ids=[account.id])
+        except Exception as exc:
+            session.rollback()
+            retry = not isinstance(exc, ValueError) and job.attempts < settings.ingest.job_max_attempts
+            logger.exception("ingest_job_failed", job_id=job_id, attempt=job.attempts, retry=retry)
+            values = dict(status="queued" if retry else "failed", error=str(exc)[:1024])
+        else:
+            values = dict(
+                status="succeeded",
+                progress=1.0,
+                imported=result.imported,
+                duplicates=result.duplicates,
+                error=None,
+            )
+            logger.info("ingest_job_succeeded", job_id=job_id, imported=result.imported)
+        if not retry:
+            values["finished_at"] = datetime.now(timezone.utc)
+        session.execute(update(IngestJob).where(IngestJob.id == job_id).values(**values))
+        session.commit()
+    if retry:
+        _executor.submit(run_ingest_job, job_id)
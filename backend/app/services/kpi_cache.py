@@ -0,0 +1,187 @@
+"""Read-through KPI cache backed by the ``kpis`` table.
+
+Rows are keyed by (scope, scope_ref_id, period_start, period_end). Writers that
+change trades or their strategy tags delete the rows whose period overlaps the
+change, so the next read recomputes them.
+
+A reader can compute from trades that an import is about to change; callers
+that pass a ``version`` query (such as ``Account.equity_version``) only store the
+result if the version is unchanged, read under a share lock so the import's
+version bump and the invalidation that follows it cannot slip in between.
+
+Only windows on whole UTC days are cached, so ad-hoc timestamps (e.g. "until
+now") do not each leave a row behind, and each scope and ref keeps at most
+``analytics.kpi_cache_rows_per_ref`` rows, evicting the oldest written.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import datetime, time, timezone
+from threading import Lock
+from typing import Callable, Iterable
+
+from sqlalchemy import Select, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.models import KPI
+from app.services.kpi_engine import KPI_COLUMNS
+
+
+@dataclass
+class KPICacheStats:
+    """Process-wide cache counters."""
+
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    invalidated: int = 0
+    evicted: int = 0
+
+
+_stats = KPICacheStats()
+_stats_lock = Lock()
+
+_DAY_END = time(23, 59, 59, 999999)
+
+
+def _count(field: str, amount: int = 1) -> None:
+    with _stats_lock:
+        setattr(_stats, field, getattr(_stats, field) + amount)
+
+
+def cache_stats() -> dict[str, int]:
+    """Return a snapshot of the hit/miss/invalidation counters."""
+
+    with _stats_lock:
+        return asdict(_stats)
+
+
+def reset_cache_stats() -> None:
+    """Zero the counters."""
+
+    global _stats
+    with _stats_lock:
+        _stats = KPICacheStats()
+
+
+def store_kpis(
+    db: Session,
+    scope: str,
+    scope_ref_id: int,
+    period_start: datetime,
+    period_end: datetime,
+    metrics: dict[str, float | None],
+) -> None:
+    """Insert or replace the KPI row for one scope and period."""
+
+    stmt = insert(KPI).values(
+        scope=scope,
+        scope_ref_id=scope_ref_id,
+        period_start=period_start,
+        period_end=period_end,
+        **{name: metrics[name] for name in KPI_COLUMNS},
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[KPI.scope, KPI.scope_ref_id, KPI.period_start, KPI.period_end],
+        set_=dict(
+            **{name: stmt.excluded[name] for name in KPI_COLUMNS},
+            updated_at=func.now(),
+        ),
+    )
+    db.execute(stmt)
+    db.commit()
+
+
+def _utc_time(value: datetime) -> time:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.time()
+
+
+def cacheable_window(period_start: datetime, period_end: datetime) -> bool:
+    """Whether the window starts at a UTC midnight and ends at one or at the last instant of a day."""
+
+    return _utc_time(period_start) == time.min and _utc_time(period_end) in (time.min, _DAY_END)
+
+
+def _evict(db: Session, scope: str, scope_ref_id: int) -> None:
+    """Keep only the most recently written ``analytics.kpi_cache_rows_per_ref`` rows of one ref."""
+
+    stale = (
+        select(KPI.id)
+        .where(KPI.scope == scope, KPI.scope_ref_id == scope_ref_id)
+        .order_by(KPI.updated_at.desc(), KPI.id.desc())
+        .offset(settings.analytics.kpi_cache_rows_per_ref)
+    )
+    removed = db.execute(delete(KPI).where(KPI.id.in_(stale))).rowcount or 0
+    if removed:
+        db.commit()
+        _count("evicted", removed)
+
+
+def cached_kpis(
+    db: Session,
+    scope: str,
+    scope_ref_id: int,
+    period_start: datetime,
+    period_end: datetime,
+    compute: Callable[[], dict[str, float | None]],
+    version: Select | None = None,
+) -> dict[str, float | None]:
+    """Return stored KPIs for the period, computing and storing them on a miss.
+
+    Windows that are not whole days are computed without touching the cache.
+    A stored row serves every caller of the window regardless of how ``compute``
+    would have produced it, so it must not depend on anything but the trades.
+    ``version`` selects a counter that writers bump before invalidating; a miss
+    is only stored if the counter did not move while computing.
+    """
+
+    if not settings.analytics.kpi_cache or not cacheable_window(period_start, period_end):
+        _count("bypassed")
+        return compute()
+    row = db.execute(
+        select(*(getattr(KPI, name) for name in KPI_COLUMNS)).where(
+            KPI.scope == scope,
+            KPI.scope_ref_id == scope_ref_id,
+            KPI.period_start == period_start,
+            KPI.period_end == period_end,
+        )
+    ).first()
+    if row is not None:
+        _count("hits")
+        return dict(row._mapping)
+    _count("misses")
+    seen = db.scalar(version) if version is not None else None
+    metrics = compute()
+    if version is not None and db.scalar(version.with_for_update(read=True)) != seen:
+        db.commit()
+        return metrics
+    store_kpis(db, scope, scope_ref_id, period_start, period_end, metrics)
+    _evict(db, scope, scope_ref_id)
+    return metrics
+
+
+def invalidate_kpis(
+    db: Session,
+    scopes: Iterable[str],
+    scope_ref_ids: Iterable[int],
+    earliest: datetime | None = None,
+    latest: datetime | None = None,
+) -> int:
+    """Delete cached KPI rows whose period overlaps ``[earliest, latest]``.
+
+    Runs in the caller's transaction and returns the number of rows removed.
+    """
+
+    stmt = delete(KPI).where(KPI.scope.in_(list(scopes)), KPI.scope_ref_id.in_(list(scope_ref_ids)))
+    if latest is not None:
+        stmt = stmt.where(KPI.period_start <= latest)
+    if earliest is not None:
+        stmt = stmt.where(KPI.period_end >= earliest)
+    removed = db.execute(stmt).rowcount or 0
+    if removed:
+        _count("invalidated", removed)
+    return removed
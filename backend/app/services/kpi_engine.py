@@ -0,0 +1,246 @@
+"""Vectorized KPI calculations over columnar trade data."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _float_array(values: Iterable) -> np.ndarray:
+    """Convert numbers (including ``Decimal``) to float64; much faster than ``np.array``."""
+
+    return np.fromiter(map(float, values), dtype=float)
+
+
+def _day_array(days: Iterable[date]) -> np.ndarray:
+    """Convert dates to ``datetime64[D]`` through ordinals, avoiding per-object parsing."""
+
+    ordinals = np.fromiter((day.toordinal() for day in days), dtype=np.int64)
+    return (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+@dataclass
+class TradeColumns:
+    """Trades as parallel NumPy arrays; ``trade_day`` is ``datetime64[D]``."""
+
+    side: np.ndarray
+    qty: np.ndarray
+    price: np.ndarray
+    fee: np.ndarray
+    tax: np.ndarray
+    trade_day: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.side)
+
+    @classmethod
+    def empty(cls) -> "TradeColumns":
+        return cls(
+            side=np.empty(0, dtype=object),
+            qty=np.empty(0, dtype=float),
+            price=np.empty(0, dtype=float),
+            fee=np.empty(0, dtype=float),
+            tax=np.empty(0, dtype=float),
+            trade_day=np.empty(0, dtype="datetime64[D]"),
+        )
+
+    @classmethod
+    def concat(cls, parts: Iterable["TradeColumns"]) -> "TradeColumns":
+        """Join column batches end to end."""
+
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(
+            side=np.concatenate([part.side for part in parts]),
+            qty=np.concatenate([part.qty for part in parts]),
+            price=np.concatenate([part.price for part in parts]),
+            fee=np.concatenate([part.fee for part in parts]),
+            tax=np.concatenate([part.tax for part in parts]),
+            trade_day=np.concatenate([part.trade_day for part in parts]),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "TradeColumns":
+        """Build columns from ``(side, qty, price, fee, tax, trade_day)`` tuples."""
+
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        return cls(
+            side=np.array([row[0] for row in rows], dtype=object),
+            qty=_float_array(row[1] for row in rows),
+            price=_float_array(row[2] for row in rows),
+            fee=_float_array(row[3] or 0 for row in rows),
+            tax=_float_array(row[4] or 0 for row in rows),
+            trade_day=_day_array(row[5] for row in rows),
+        )
+
+    @classmethod
+    def from_trades(cls, trades: Iterable) -> "TradeColumns":
+        """Extract columns from ORM trades or any objects with the same attributes."""
+
+        return cls.from_rows(
+            (trade.side, trade.qty, trade.price, trade.fee, trade.tax, trade.trade_ts.date())
+            for trade in trades
+        )
+
+    def net_pnl(self) -> np.ndarray:
+        """Signed cash flow per trade after fees and taxes."""
+
+        gross = self.price * self.qty
+        return np.where(self.side == "SELL", gross, -gross) - self.fee - self.tax
+
+
+def profit_factor(win_sum: float, loss_sum: float) -> float | None:
+    """Compute profit factor safely."""
+
+    if loss_sum >= 0:
+        return None
+    if win_sum == 0:
+        return 0.0
+    return win_sum / abs(loss_sum)
+
+
+def daily_equity(trade_day: np.ndarray, pnl: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return sorted unique days and the cumulative net PnL at the end of each."""
+
+    days, inverse = np.unique(trade_day, return_inverse=True)
+    return days, np.cumsum(np.bincount(inverse, weights=pnl, minlength=len(days)))
+
+
+def equity_drawdown(equity: np.ndarray) -> float:
+    """Largest peak-to-trough decline of an equity array (zero or negative)."""
+
+    if not len(equity):
+        return 0.0
+    return float((equity - np.maximum.accumulate(equity)).min())
+
+
+EMPTY_KPIS: dict[str, float | None] = {
+    "win_rate": None,
+    "avg_win": None,
+    "avg_loss": None,
+    "profit_factor": None,
+    "expectancy": None,
+    "mdd": None,
+    "total_trades": 0,
+}
+
+
+def kpis_from_aggregates(
+    total: int,
+    wins: int,
+    win_sum: float,
+    loss_sum: float,
+    net_sum: float,
+    equity: np.ndarray,
+) -> dict[str, float | None]:
+    """Assemble the KPI dict from trade counts, PnL sums and the daily equity curve."""
+
+    if not total:
+        return dict(EMPTY_KPIS)
+    losses = total - wins
+    return {
+        "win_rate": wins / total,
+        "avg_win": win_sum / wins if wins else None,
+        "avg_loss": loss_sum / losses if losses else None,
+        "profit_factor": profit_factor(win_sum, loss_sum),
+        "expectancy": net_sum / total,
+        "mdd": equity_drawdown(equity),
+        "total_trades": total,
+    }
+
+
+def compute_trade_kpis(columns: TradeColumns) -> dict[str, float | None]:
+    """Compute win rate, averages, profit factor, expectancy and MDD."""
+
+    if not len(columns):
+        return dict(EMPTY_KPIS)
+    pnl = columns.net_pnl()
+    won = pnl > 0
+    _, equity = daily_equity(columns.trade_day, pnl)
+    return kpis_from_aggregates(
+        total=len(columns),
+        wins=int(np.count_nonzero(won)),
+        win_sum=float(pnl[won].sum()),
+        loss_sum=float(pnl[~won].sum()),
+        net_sum=float(pnl.sum()),
+        equity=equity,
+    )
+
+
+KPI_COLUMNS = ("win_rate", "avg_win", "avg_loss", "profit_factor", "expectancy", "mdd", "total_trades")
+
+
+def grouped_trade_kpis(columns: TradeColumns, keys: dict[str, np.ndarray]) -> pd.DataFrame:
+    """Compute KPIs for every group of trades in one vectorized pass.
+
+    ``keys`` maps index names to arrays aligned with ``columns``. The result is
+    indexed by those keys, has one column per KPI, and uses NaN where
+    ``compute_trade_kpis`` would return ``None``. Drawdown is measured on each
+    group's own daily equity curve, starting from zero.
+    """
+
+    names = list(keys)
+    if not len(columns):
+        if len(names) == 1:
+            index = pd.Index([], name=names[0])
+        else:
+            index = pd.MultiIndex.from_arrays([[] for _ in names], names=names)
+        return pd.DataFrame(columns=list(KPI_COLUMNS), index=index, dtype=float)
+    pnl = columns.net_pnl()
+    frame = pd.DataFrame({**keys, "day": columns.trade_day, "pnl": pnl})
+    won = pnl > 0
+    frame["win_pnl"] = np.where(won, pnl, 0.0)
+    frame["loss_pnl"] = np.where(won, 0.0, pnl)
+    frame["won"] = won
+    totals = frame.groupby(names, sort=True).agg(
+        total_trades=("pnl", "size"),
+        wins=("won", "sum"),
+        win_sum=("win_pnl", "sum"),
+        loss_sum=("loss_pnl", "sum"),
+        net_sum=("pnl", "sum"),
+    )
+    daily = frame.groupby([*names, "day"], sort=True)["pnl"].sum()
+    equity = daily.groupby(level=names).cumsum()
+    drawdown = (equity - equity.groupby(level=names).cummax()).groupby(level=names).min()
+
+    total = totals["total_trades"].to_numpy(dtype=float)
+    wins = totals["wins"].to_numpy(dtype=float)
+    losses = total - wins
+    win_sum = totals["win_sum"].to_numpy()
+    loss_sum = totals["loss_sum"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = pd.DataFrame(
+            {
+                "win_rate": wins / total,
+                "avg_win": np.where(wins > 0, win_sum / wins, np.nan),
+                "avg_loss": np.where(losses > 0, loss_sum / losses, np.nan),
+                "profit_factor": np.where(loss_sum < 0, win_sum / np.abs(loss_sum), np.nan),
+                "expectancy": totals["net_sum"].to_numpy() / total,
+                "mdd": drawdown.reindex(totals.index).to_numpy(),
+                "total_trades": totals["total_trades"].to_numpy(),
+            },
+            index=totals.index,
+        )
+    return result
+
+
+def kpi_records(table: pd.DataFrame) -> Iterator[tuple[Any, dict[str, float | None]]]:
+    """Yield ``(group key, KPI dict)`` pairs from ``grouped_trade_kpis``, NaN as ``None``."""
+
+    for key, values in zip(table.index, table.itertuples(index=False, name=None)):
+        metrics = {
+            name: None if value != value else float(value) for name, value in zip(KPI_COLUMNS, values)
+        }
+        metrics["total_trades"] = int(metrics["total_trades"] or 0)
+        yield key, metrics
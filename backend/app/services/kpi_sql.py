@@ -0,0 +1,65 @@
+"""KPI aggregation pushed down into the database.
+
+Per-trade PnL, win/loss counts and sums, and the daily equity curve are computed
+with aggregate and window functions, so only one summary row and one row per
+trading day reach the application.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import Float, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Trade
+from app.services.kpi_engine import kpis_from_aggregates
+from app.services.trade_loader import trade_window
+
+
+def compute_kpis_sql(
+    db: Session,
+    account_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> dict[str, float | None]:
+    """Compute account KPIs for ``[start, end]`` inside the database."""
+
+    gross = Trade.price * Trade.qty
+    per_trade = (
+        select(
+            (
+                case((Trade.side == "SELL", gross), else_=-gross)
+                - func.coalesce(Trade.fee, 0)
+                - func.coalesce(Trade.tax, 0)
+            ).label("pnl"),
+            func.date(Trade.trade_ts).label("day"),
+        )
+        .where(*trade_window(account_id, start, end))
+        .cte("per_trade")
+    )
+    pnl = per_trade.c.pnl
+    summary = db.execute(
+        select(
+            func.count(),
+            func.count().filter(pnl > 0),
+            cast(func.coalesce(func.sum(pnl).filter(pnl > 0), 0), Float),
+            cast(func.coalesce(func.sum(pnl).filter(pnl <= 0), 0), Float),
+            cast(func.coalesce(func.sum(pnl), 0), Float),
+        )
+    ).one()
+    total, wins, win_sum, loss_sum, net_sum = summary
+    if not total:
+        return kpis_from_aggregates(0, 0, 0.0, 0.0, 0.0, np.empty(0))
+    daily_equity = cast(func.sum(func.sum(pnl)).over(order_by=per_trade.c.day), Float)
+    equity = db.execute(
+        select(daily_equity).group_by(per_trade.c.day).order_by(per_trade.c.day)
+    ).scalars().all()
+    return kpis_from_aggregates(
+        total=total,
+        wins=wins,
+        win_sum=win_sum,
+        loss_sum=loss_sum,
+        net_sum=net_sum,
+        equity=np.asarray(equity, dtype=float),
+    )
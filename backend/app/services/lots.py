@@ -0,0 +1,299 @@
+"""Incremental lot matching for realized PnL.
+
+Fills are matched per (account, symbol) against open lots in the opposite
+direction: ``fifo`` closes the oldest lot first, ``lifo`` the newest, and
+``average`` keeps a single lot per symbol at the weighted average price. Open
+lots and a per-account watermark (the last matched trade) are persisted, so
+each ingest only matches the new fills. A fill that sorts before the watermark
+(for example a backfill of older history) triggers a full replay of the
+account instead.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Literal, Sequence
+
+from sqlalchemy import String, cast, delete, insert, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.models.models import ClosedTrade, LotMatchState, OpenLot, Trade
+from app.services.positions import write_positions
+
+logger = get_logger(__name__)
+
+LotMethod = Literal["fifo", "lifo", "average"]
+
+_EPSILON = 1e-9
+
+
+@dataclass
+class Fill:
+    """One trade as seen by the matcher."""
+
+    trade_id: int
+    symbol_id: int
+    side: str
+    qty: float
+    price: float
+    cost: float
+    ts: datetime
+
+
+@dataclass
+class Lot:
+    """An open position slice; ``cost`` is the fees and taxes still attached to ``qty``."""
+
+    trade_id: int
+    symbol_id: int
+    direction: str
+    qty: float
+    price: float
+    cost: float
+    opened_at: datetime
+
+
+@dataclass
+class ClosedLot:
+    """A matched open/close pair."""
+
+    symbol_id: int
+    open_trade_id: int
+    close_trade_id: int
+    direction: str
+    qty: float
+    open_price: float
+    close_price: float
+    opened_at: datetime
+    closed_at: datetime
+    realized_pnl: float
+
+
+@dataclass
+class LotBook:
+    """Open lots per symbol, all in the same direction, oldest first."""
+
+    method: LotMethod = "fifo"
+    lots: dict[int, deque[Lot]] = field(default_factory=dict)
+
+    def apply(self, fill: Fill) -> list[ClosedLot]:
+        """Match one fill, returning the lots it closed; any remainder opens a new lot."""
+
+        direction = "LONG" if fill.side == "BUY" else "SHORT"
+        book = self.lots.setdefault(fill.symbol_id, deque())
+        remaining = fill.qty
+        closed: list[ClosedLot] = []
+        while remaining > _EPSILON and book and book[0].direction != direction:
+            lot = book[-1] if self.method == "lifo" else book[0]
+            qty = min(remaining, lot.qty)
+            open_cost = lot.cost * qty / lot.qty
+            close_cost = fill.cost * qty / fill.qty
+            sign = 1.0 if lot.direction == "LONG" else -1.0
+            closed.append(
+                ClosedLot(
+                    symbol_id=fill.symbol_id,
+                    open_trade_id=lot.trade_id,
+                    close_trade_id=fill.trade_id,
+                    direction=lot.direction,
+                    qty=qty,
+                    open_price=lot.price,
+                    close_price=fill.price,
+                    opened_at=lot.opened_at,
+                    closed_at=fill.ts,
+                    realized_pnl=sign * (fill.price - lot.price) * qty - open_cost - close_cost,
+                )
+            )
+            lot.cost -= open_cost
+            lot.qty -= qty
+            remaining -= qty
+            if lot.qty <= _EPSILON:
+                book.pop() if self.method == "lifo" else book.popleft()
+        if remaining > _EPSILON:
+            cost = fill.cost * remaining / fill.qty
+            if self.method == "average" and book:
+                lot = book[0]
+                total = lot.qty + remaining
+                lot.price = (lot.price * lot.qty + fill.price * remaining) / total
+                lot.qty = total
+                lot.cost += cost
+            else:
+                book.append(Lot(fill.trade_id, fill.symbol_id, direction, remaining, fill.price, cost, fill.ts))
+        return closed
+
+    def open_lots(self, symbol_ids: Iterable[int]) -> list[Lot]:
+        return [lot for symbol_id in symbol_ids for lot in self.lots.get(symbol_id, ())]
+
+
+def match_fills(
+    fills: Iterable[Fill], method: LotMethod = "fifo", book: LotBook | None = None
+) -> tuple[LotBook, list[ClosedLot]]:
+    """Run fills (in execution order) through a book, starting empty unless ``book`` is given."""
+
+    book = book or LotBook(method)
+    closed = [pair for fill in fills for pair in book.apply(fill)]
+    return book, closed
+
+
+_FILL_COLUMNS = (
+    Trade.id,
+    Trade.symbol_id,
+    cast(Trade.side, String),
+    Trade.qty,
+    Trade.price,
+    Trade.fee,
+    Trade.tax,
+    Trade.trade_ts,
+)
+
+
+def _fills(db: Session, *clauses) -> list[Fill]:
+    rows = db.execute(select(*_FILL_COLUMNS).where(*clauses).order_by(Trade.trade_ts, Trade.id)).all()
+    return [
+        Fill(trade_id, symbol_id, side, float(qty), float(price), float(fee or 0) + float(tax or 0), ts)
+        for trade_id, symbol_id, side, qty, price, fee, tax, ts in rows
+    ]
+
+
+def _load_book(db: Session, account_id: int, method: LotMethod, symbol_ids: set[int]) -> LotBook:
+    rows = db.scalars(
+        select(OpenLot)
+        .where(OpenLot.account_id == account_id, OpenLot.symbol_id.in_(symbol_ids))
+        .order_by(OpenLot.opened_at, OpenLot.id)
+    ).all()
+    book = LotBook(method)
+    for row in rows:
+        book.lots.setdefault(row.symbol_id, deque()).append(
+            Lot(row.trade_id, row.symbol_id, row.direction, row.qty, row.price, row.cost, row.opened_at)
+        )
+    return book
+
+
+def _save(
+    db: Session, account_id: int, book: LotBook, symbol_ids: set[int] | None, closed: Sequence[ClosedLot]
+) -> None:
+    """Replace the open lots and positions of the touched symbols (all if ``None``) and append the closed pairs."""
+
+    stmt = delete(OpenLot).where(OpenLot.account_id == account_id)
+    if symbol_ids is not None:
+        stmt = stmt.where(OpenLot.symbol_id.in_(symbol_ids))
+    db.execute(stmt)
+    lots = book.open_lots(sorted(symbol_ids if symbol_ids is not None else book.lots))
+    write_positions(db, account_id, symbol_ids, lots)
+    if lots:
+        db.execute(
+            insert(OpenLot),
+            [
+                dict(
+                    account_id=account_id,
+                    symbol_id=lot.symbol_id,
+                    trade_id=lot.trade_id,
+                    direction=lot.direction,
+                    qty=lot.qty,
+                    price=lot.price,
+                    cost=lot.cost,
+                    opened_at=lot.opened_at,
+                )
+                for lot in lots
+            ],
+        )
+    if closed:
+        db.execute(
+            insert(ClosedTrade),
+            [
+                dict(
+                    account_id=account_id,
+                    symbol_id=pair.symbol_id,
+                    open_trade_id=pair.open_trade_id,
+                    close_trade_id=pair.close_trade_id,
+                    direction=pair.direction,
+                    qty=pair.qty,
+                    open_price=pair.open_price,
+                    close_price=pair.close_price,
+                    opened_at=pair.opened_at,
+                    closed_at=pair.closed_at,
+                    realized_pnl=pair.realized_pnl,
+                )
+                for pair in closed
+            ],
+        )
+
+
+def _advance(db: Session, state: LotMatchState | None, account_id: int, method: LotMethod, fills: list[Fill]) -> None:
+    """Move the account's watermark past ``fills``; an empty list after a rebuild resets it."""
+
+    if state is None:
+        state = LotMatchState(account_id=account_id, method=method)
+        db.add(state)
+    state.method = method
+    if fills:
+        state.last_trade_ts = fills[-1].ts
+        state.last_trade_id = fills[-1].trade_id
+        state.max_trade_id = max(state.max_trade_id or 0, max(fill.trade_id for fill in fills))
+    else:
+        state.last_trade_ts = state.last_trade_id = state.max_trade_id = None
+    db.flush()
+
+
+def rebuild_lots(db: Session, account_id: int, method: LotMethod | None = None) -> int:
+    """Discard matched state and positions for an account and replay all of its trades.
+
+    Runs in the caller's transaction; returns the number of closed pairs.
+    """
+
+    method = method or settings.lots.method
+    db.execute(delete(ClosedTrade).where(ClosedTrade.account_id == account_id))
+    fills = _fills(db, Trade.account_id == account_id)
+    book, closed = match_fills(fills, method)
+    _save(db, account_id, book, None, closed)
+    state = db.scalar(select(LotMatchState).where(LotMatchState.account_id == account_id))
+    if state is not None:
+        state.max_trade_id = None
+    _advance(db, state, account_id, method, fills)
+    logger.info("lots_rebuilt", account_id=account_id, method=method, trades=len(fills), closed=len(closed))
+    return len(closed)
+
+
+def match_new_trades(db: Session, account_id: int, method: LotMethod | None = None) -> int:
+    """Match the account's trades added since the last run; returns new closed pairs.
+
+    New trades are those after the watermark in (trade_ts, id) order or with an
+    id above any matched so far. Falls back to ``rebuild_lots`` when nothing has
+    been matched yet, the method changed, or a new trade sorts before the
+    watermark. The state row is locked so concurrent ingests of one account
+    match in turn. Runs in the caller's transaction.
+    """
+
+    method = method or settings.lots.method
+    state = db.scalar(
+        select(LotMatchState).where(LotMatchState.account_id == account_id).with_for_update()
+    )
+    if state is None or state.method != method or state.last_trade_id is None:
+        return rebuild_lots(db, account_id, method)
+    watermark = (state.last_trade_ts, state.last_trade_id)
+    fills = _fills(
+        db,
+        Trade.account_id == account_id,
+        or_(Trade.id > state.max_trade_id, tuple_(Trade.trade_ts, Trade.id) > tuple_(*watermark)),
+    )
+    if not fills:
+        return 0
+    if (fills[0].ts, fills[0].trade_id) < watermark:
+        return rebuild_lots(db, account_id, method)
+    symbol_ids = {fill.symbol_id for fill in fills}
+    book = _load_book(db, account_id, method, symbol_ids)
+    book, closed = match_fills(fills, method, book)
+    _save(db, account_id, book, symbol_ids, closed)
+    _advance(db, state, account_id, method, fills)
+    return len(closed)
+
+
+def match_account_lots(db: Session, account_ids: Iterable[int]) -> None:
+    """Ingest hook: bring lot matching up to date for each account, if enabled."""
+
+    if not settings.lots.match_on_ingest:
+        return
+    for account_id in account_ids:
+        match_new_trades(db, account_id)
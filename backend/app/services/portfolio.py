@@ -0,0 +1,138 @@
+"""Combined equity curve across all of a user's accounts."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.models import Account, EquityDaily
+from app.services.trades import max_drawdown
+
+# (account id, equity version) per account, ordered by id.
+Fingerprint = tuple[tuple[int, int], ...]
+
+
+@dataclass
+class PortfolioEquity:
+    """Summed equity of several accounts on their union calendar."""
+
+    account_ids: list[int]
+    currencies: list[str]
+    curve: pd.DataFrame  # indexed by date; ``equity`` and ``net_pnl_day`` columns
+
+
+_cache: OrderedDict[tuple, PortfolioEquity] = OrderedDict()
+_cache_lock = Lock()
+
+
+def _accounts_filter(user_id: int, currency: str | None) -> list:
+    clauses = [Account.user_id == user_id]
+    if currency is not None:
+        clauses.append(Account.currency == currency)
+    return clauses
+
+
+def portfolio_fingerprint(db: Session, user_id: int, currency: str | None = None) -> Fingerprint:
+    """``Account.equity_version`` per account; every equity write bumps it in the same transaction."""
+
+    rows = db.execute(
+        select(Account.id, Account.equity_version).where(*_accounts_filter(user_id, currency)).order_by(Account.id)
+    ).all()
+    return tuple((row[0], row[1] or 0) for row in rows)
+
+
+def merge_equity_curves(frame: pd.DataFrame) -> pd.DataFrame:
+    """Align per-account curves on a shared calendar and sum them.
+
+    ``frame`` has ``account_id``, ``date`` and ``equity`` columns. Each account's
+    equity is carried forward over days it has no row for, and counts as zero
+    before its first day.
+    """
+
+    if frame.empty:
+        return pd.DataFrame({"equity": [], "net_pnl_day": []}, index=pd.Index([], name="date"), dtype=float)
+    wide = frame.pivot(index="date", columns="account_id", values="equity").sort_index()
+    equity = wide.ffill().fillna(0.0).sum(axis=1)
+    net = equity.diff()
+    net.iloc[0] = equity.iloc[0]
+    return pd.DataFrame({"equity": equity, "net_pnl_day": net}).rename_axis("date")
+
+
+def load_portfolio_equity(db: Session, user_id: int, currency: str | None = None) -> PortfolioEquity:
+    """Load every account's stored equity in one query and merge it."""
+
+    rows = db.execute(
+        select(EquityDaily.account_id, EquityDaily.date, EquityDaily.equity, Account.currency)
+        .join(Account, Account.id == EquityDaily.account_id)
+        .where(*_accounts_filter(user_id, currency))
+    ).all()
+    frame = pd.DataFrame(
+        {
+            "account_id": np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            "date": [row[1] for row in rows],
+            "equity": np.fromiter((float(row[2]) for row in rows), dtype=float, count=len(rows)),
+        }
+    )
+    return PortfolioEquity(
+        account_ids=sorted(set(frame["account_id"].tolist())),
+        currencies=sorted({row[3] for row in rows}),
+        curve=merge_equity_curves(frame),
+    )
+
+
+def portfolio_equity(db: Session, user_id: int, currency: str | None = None) -> PortfolioEquity:
+    """Return the user's combined curve, reusing a cached merge while no account's equity changed."""
+
+    key = (user_id, currency, portfolio_fingerprint(db, user_id, currency))
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    result = load_portfolio_equity(db, user_id, currency)
+    with _cache_lock:
+        stale = [other for other in _cache if other[:2] == key[:2]]
+        for other in stale:
+            del _cache[other]
+        _cache[key] = result
+        while len(_cache) > settings.analytics.portfolio_cache_size:
+            _cache.popitem(last=False)
+    return result
+
+
+def portfolio_kpis(curve: pd.DataFrame) -> dict[str, float | date | None]:
+    """Summarise a (possibly sliced) combined curve."""
+
+    if curve.empty:
+        return dict(
+            start_equity=None,
+            end_equity=None,
+            net_pnl=0.0,
+            mdd=0.0,
+            peak_date=None,
+            trough_date=None,
+            positive_days=None,
+            best_day=None,
+            worst_day=None,
+        )
+    equity = curve["equity"]
+    net = curve["net_pnl_day"]
+    mdd, peak_date, trough_date = max_drawdown(equity.set_axis(pd.to_datetime(equity.index)))
+    return dict(
+        start_equity=float(equity.iloc[0]),
+        end_equity=float(equity.iloc[-1]),
+        net_pnl=float(net.sum()),
+        mdd=mdd,
+        peak_date=peak_date,
+        trough_date=trough_date,
+        positive_days=float((net > 0).mean()),
+        best_day=float(net.max()),
+        worst_day=float(net.min()),
+    )
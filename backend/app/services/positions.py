@@ -0,0 +1,60 @@
+"""Position book maintained from the lot matcher's open lots.
+
+Each (account, symbol) row holds the signed open quantity (negative when short)
+and the average price of the open lots under the configured lot method, which
+is the average cost when ``lots.method`` is ``average``. Rows are rewritten
+only for the symbols a batch touched, so maintenance is proportional to the
+batch; reads are a lookup on ``uq_position_account_symbol``.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Position, Symbol
+
+if TYPE_CHECKING:
+    from app.services.lots import Lot
+
+
+def aggregate_lots(lots: Iterable["Lot"]) -> dict[int, tuple[float, float]]:
+    """Signed quantity and quantity-weighted open price per symbol."""
+
+    totals: dict[int, list[float]] = {}
+    for lot in lots:
+        entry = totals.setdefault(lot.symbol_id, [0.0, 0.0, 0.0])
+        entry[0] += lot.qty if lot.direction == "LONG" else -lot.qty
+        entry[1] += lot.qty
+        entry[2] += lot.qty * lot.price
+    return {symbol_id: (signed, notional / qty) for symbol_id, (signed, qty, notional) in totals.items() if qty}
+
+
+def write_positions(db: Session, account_id: int, symbol_ids: Iterable[int] | None, lots: Iterable["Lot"]) -> None:
+    """Replace the positions of ``symbol_ids`` (every symbol if ``None``) from their open lots.
+
+    Flat symbols are removed. Runs in the caller's transaction.
+    """
+
+    stmt = delete(Position).where(Position.account_id == account_id)
+    if symbol_ids is not None:
+        stmt = stmt.where(Position.symbol_id.in_(list(symbol_ids)))
+    db.execute(stmt)
+    rows = [
+        dict(account_id=account_id, symbol_id=symbol_id, qty=qty, avg_price=avg_price)
+        for symbol_id, (qty, avg_price) in sorted(aggregate_lots(lots).items())
+    ]
+    if rows:
+        db.execute(insert(Position), rows)
+
+
+def list_positions(db: Session, account_id: int) -> list[tuple[Position, str]]:
+    """Return the account's open positions with their tickers."""
+
+    return db.execute(
+        select(Position, Symbol.ticker)
+        .join(Symbol, Symbol.id == Position.symbol_id)
+        .where(Position.account_id == account_id)
+        .order_by(Symbol.ticker)
+    ).all()
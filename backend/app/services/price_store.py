@@ -0,0 +1,227 @@
+"""Memory-mapped, append-only OHLCV bar store.
+
+Each symbol and timeframe has a directory under ``settings.prices.root`` with
+one raw little-endian column file per field (``ts`` as int64, prices and
+volume as float64) and a ``meta.json`` holding the committed row count. Reads
+memory-map the columns and slice them, so callers get zero-copy read-only views
+without going through PostgreSQL. Timestamps are kept sorted, so a date range
+resolves to a row range with two binary searches over the mapped ``ts`` column.
+
+Appends only accept bars after the last stored one (earlier ones are skipped,
+so reloading an overlapping CSV is idempotent). Column files are written first
+and ``meta.json`` is replaced last; a write interrupted in between is discarded
+by truncating the columns back to the committed row count on the next append.
+Only the timeframes in ``settings.prices.timeframes`` are read or written.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+from typing import IO, Iterable, Iterator
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from app.core.settings import settings
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+_TIMEFRAME = re.compile(r"^[1-9][0-9]*[mhd]$")
+_TS_DTYPE = np.dtype("<i8")
+_VALUE_DTYPE = np.dtype("<f8")
+
+
+def timestamp_unit(timeframe: str) -> str:
+    """``datetime64`` unit of a timeframe: days for ``1d``-style bars, seconds for intraday."""
+
+    if not _TIMEFRAME.match(timeframe):
+        raise ValueError(f"Invalid timeframe {timeframe!r}; use e.g. 1d, 60m or 1h")
+    return "D" if timeframe.endswith("d") else "s"
+
+
+@dataclass
+class Bars:
+    """One symbol's bars as parallel arrays in time order; ``ts`` is ``datetime64[D]`` or ``[s]``."""
+
+    symbol: str
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+def bars_from_frame(frame: pd.DataFrame, unit: str = "D") -> list[Bars]:
+    """Split a ``symbol, date, open, high, low, close[, volume]`` frame into per-symbol bars.
+
+    ``date`` is truncated to ``unit`` (timezone-aware values are converted to
+    UTC); rows are sorted and a repeated timestamp keeps its last row.
+    """
+
+    missing = {"symbol", "date", "open", "high", "low", "close"} - set(frame.columns)
+    if missing:
+        raise ValueError(f"Bars are missing columns: {', '.join(sorted(missing))}")
+    stamps = pd.to_datetime(frame["date"])
+    if stamps.dt.tz is not None:
+        stamps = stamps.dt.tz_convert("UTC").dt.tz_localize(None)
+    frame = frame.assign(
+        symbol=frame["symbol"].astype(str).str.strip(),
+        date=stamps.to_numpy(dtype=f"datetime64[{unit}]"),
+        volume=frame["volume"] if "volume" in frame else 0.0,
+    )
+    frame = frame.sort_values(["symbol", "date"], kind="stable").drop_duplicates(["symbol", "date"], keep="last")
+    return [
+        Bars(
+            symbol=symbol,
+            ts=group["date"].to_numpy(dtype=f"datetime64[{unit}]"),
+            **{name: group[name].to_numpy(dtype=float) for name in PRICE_COLUMNS},
+        )
+        for symbol, group in frame.groupby("symbol", sort=True)
+    ]
+
+
+def _bound(value: date | datetime, unit: str) -> np.int64:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = pd.Timestamp(value).tz_convert("UTC").tz_localize(None).to_pydatetime()
+    return np.datetime64(value, unit).astype(np.int64)
+
+
+class PriceStore:
+    """Per-symbol columnar bar files under ``root``."""
+
+    def __init__(self, root: str | os.PathLike, timeframes: Iterable[str] | None = None) -> None:
+        self.root = Path(root)
+        self.timeframes = frozenset(settings.prices.timeframes if timeframes is None else timeframes)
+        self._lock = Lock()
+
+    def _timeframe_root(self, timeframe: str) -> Path:
+        timestamp_unit(timeframe)
+        if timeframe not in self.timeframes:
+            raise ValueError(f"Timeframe {timeframe!r} is not configured; use one of {', '.join(sorted(self.timeframes))}")
+        return self.root / timeframe
+
+    def _directory(self, symbol: str, timeframe: str) -> Path:
+        # ``quote`` leaves dots alone, so "." and ".." would resolve outside the timeframe directory.
+        name = quote(symbol, safe="")
+        if name in ("", ".", ".."):
+            raise ValueError(f"Invalid symbol {symbol!r}")
+        return self._timeframe_root(timeframe) / name
+
+    @staticmethod
+    def _rows(directory: Path) -> int:
+        try:
+            return json.loads((directory / "meta.json").read_text())["rows"]
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _column(directory: Path, name: str, rows: int) -> np.memmap:
+        dtype = _TS_DTYPE if name == "ts" else _VALUE_DTYPE
+        return np.memmap(directory / f"{name}.bin", dtype=dtype, mode="r", shape=(rows,))
+
+    @contextmanager
+    def _writing(self, directory: Path) -> Iterator[None]:
+        """Serialize writers of one directory across threads and processes."""
+
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(directory / ".lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def append(self, bars: Bars, timeframe: str) -> int:
+        """Append bars later than the last stored one; returns the number written."""
+
+        unit = timestamp_unit(timeframe)
+        ts = bars.ts.astype(f"datetime64[{unit}]").view(np.int64)
+        if np.any(np.diff(ts) <= 0):
+            raise ValueError("Bars must be in strictly increasing time order")
+        directory = self._directory(bars.symbol, timeframe)
+        with self._writing(directory):
+            rows = self._rows(directory)
+            keep = slice(None)
+            if rows:
+                last = self._column(directory, "ts", rows)[-1]
+                keep = slice(int(np.searchsorted(ts, last, side="right")), None)
+            columns = {"ts": ts[keep], **{name: getattr(bars, name)[keep] for name in PRICE_COLUMNS}}
+            added = len(columns["ts"])
+            if not added:
+                return 0
+            for name, values in columns.items():
+                dtype = _TS_DTYPE if name == "ts" else _VALUE_DTYPE
+                with open(directory / f"{name}.bin", "ab") as handle:
+                    handle.truncate(rows * dtype.itemsize)
+                    handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            staged = directory / "meta.json.tmp"
+            staged.write_text(json.dumps({"rows": rows + added, "unit": unit}))
+            os.replace(staged, directory / "meta.json")
+        return added
+
+    def read(
+        self,
+        symbol: str,
+        timeframe: str,
+        start: date | datetime | None = None,
+        end: date | datetime | None = None,
+    ) -> Bars:
+        """Return zero-copy views of the bars within ``[start, end]``.
+
+        Raises ``KeyError`` if nothing is stored for the symbol and timeframe.
+        """
+
+        unit = timestamp_unit(timeframe)
+        directory = self._directory(symbol, timeframe)
+        rows = self._rows(directory)
+        if not rows:
+            raise KeyError(symbol)
+        ts = self._column(directory, "ts", rows)
+        lo = 0 if start is None else int(np.searchsorted(ts, _bound(start, unit), side="left"))
+        hi = rows if end is None else int(np.searchsorted(ts, _bound(end, unit), side="right"))
+        return Bars(
+            symbol=symbol,
+            ts=ts[lo:hi].view(f"datetime64[{unit}]"),
+            **{name: self._column(directory, name, rows)[lo:hi] for name in PRICE_COLUMNS},
+        )
+
+    def symbols(self, timeframe: str) -> list[str]:
+        """Symbols with stored bars for ``timeframe``."""
+
+        base = self._timeframe_root(timeframe)
+        if not base.is_dir():
+            return []
+        return sorted(unquote(path.name) for path in base.iterdir() if self._rows(path))
+
+    def load_frame(self, frame: pd.DataFrame, timeframe: str) -> dict[str, int]:
+        """Append every symbol in a bar frame; returns bars written per symbol."""
+
+        return {
+            bars.symbol: self.append(bars, timeframe)
+            for bars in bars_from_frame(frame, timestamp_unit(timeframe))
+        }
+
+    def load_csv(self, source: str | os.PathLike | IO, timeframe: str) -> dict[str, int]:
+        """Bulk-load a ``symbol, date, open, high, low, close[, volume]`` CSV."""
+
+        return self.load_frame(pd.read_csv(source), timeframe)
+
+
+@lru_cache
+def get_price_store() -> PriceStore:
+    """Return the store at ``settings.prices.root``."""
+
+    return PriceStore(settings.prices.root, settings.prices.timeframes)
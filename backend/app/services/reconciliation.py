@@ -0,0 +1,228 @@
+"""Reconcile broker-reported positions with the journal's position book.
+
+Broker positions are fetched for every connected account on one thread pool
+per broker, sized by its concurrency limit, with one deadline for the whole
+batch, so a run takes bounded time however many accounts exist; fetches still
+pending at the deadline are recorded as ``timed_out``. The fetched positions are compared
+with ``positions`` in a single outer join, and the differences replace each
+reconciled account's rows in ``position_breaks``.
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.models.models import Account, BrokerConnection, Position, PositionBreak, ReconciliationStatus, Symbol
+from app.services.sync import BROKER_CONNECTORS, broker_pools
+
+logger = get_logger(__name__)
+
+POSITION_FRAME_COLUMNS = ["account_id", "symbol", "qty", "avg_price"]
+
+
+@dataclass
+class PositionFetch:
+    """Outcome of fetching one account's broker positions."""
+
+    account_id: int
+    broker: str
+    positions: list[dict] = field(default_factory=list)
+    status: str = "ok"
+    error: str | None = None
+
+
+@dataclass
+class ReconciliationSummary:
+    """Counts per status for one run."""
+
+    accounts: int = 0
+    in_sync: int = 0
+    out_of_sync: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    breaks: int = 0
+    seconds: float = 0.0
+
+
+def _fetch(account: Account, broker: str) -> PositionFetch:
+    try:
+        positions = BROKER_CONNECTORS[broker].fetch_positions(account)
+    except Exception as exc:
+        logger.warning("position_fetch_failed", account_id=account.id, broker=broker, error=str(exc))
+        return PositionFetch(account.id, broker, status="failed", error=str(exc)[:1024])
+    return PositionFetch(account.id, broker, positions=list(positions))
+
+
+def fetch_broker_positions(targets: Sequence[tuple[Account, str]], deadline: float) -> list[PositionFetch]:
+    """Fetch positions for every (account, broker) concurrently.
+
+    Fetches not finished ``deadline`` seconds after the start are reported as
+    ``timed_out`` instead of being waited for.
+    """
+
+    if not targets:
+        return []
+    pools = broker_pools((broker for _, broker in targets), settings.reconcile.max_workers, "reconcile")
+    futures = {pools[broker].submit(_fetch, account, broker): (account.id, broker) for account, broker in targets}
+    done, pending = wait(futures, timeout=deadline)
+    # Do not wait for calls stuck past the deadline; queued ones are cancelled.
+    for pool in pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    results = [future.result() for future in done]
+    results.extend(
+        PositionFetch(*futures[future], status="timed_out", error=f"no response within {deadline:g}s")
+        for future in pending
+    )
+    return results
+
+
+def broker_position_frame(fetches: Sequence[PositionFetch]) -> pd.DataFrame:
+    """Flatten successful fetches into one frame; repeated symbols in an account are summed."""
+
+    records = [
+        (fetch.account_id, str(item["symbol"]), float(item["qty"]), item.get("avg_price"))
+        for fetch in fetches
+        if fetch.status == "ok"
+        for item in fetch.positions
+    ]
+    frame = pd.DataFrame.from_records(records, columns=POSITION_FRAME_COLUMNS)
+    frame = frame.astype({"account_id": np.int64, "qty": float})
+    frame["avg_price"] = pd.to_numeric(frame["avg_price"], errors="coerce")
+    frame["size"] = frame["qty"].abs()
+    frame["notional"] = frame["size"] * frame["avg_price"]
+    grouped = frame.groupby(["account_id", "symbol"], as_index=False)[["qty", "size", "notional"]].sum(min_count=1)
+    grouped["avg_price"] = grouped["notional"] / grouped["size"].where(grouped["size"] > 0)
+    return grouped[POSITION_FRAME_COLUMNS]
+
+
+def journal_position_frame(db: Session, account_ids: Sequence[int]) -> pd.DataFrame:
+    """Load the position book of the given accounts with tickers in one query."""
+
+    rows = db.execute(
+        select(Position.account_id, Symbol.ticker, Position.qty, Position.avg_price)
+        .join(Symbol, Symbol.id == Position.symbol_id)
+        .where(Position.account_id.in_(account_ids))
+    ).all()
+    frame = pd.DataFrame.from_records(rows, columns=POSITION_FRAME_COLUMNS)
+    return frame.astype({"account_id": np.int64, "qty": float, "avg_price": float})
+
+
+def compare_positions(broker: pd.DataFrame, journal: pd.DataFrame, tolerance: float) -> pd.DataFrame:
+    """Outer-join broker and journal positions and keep rows whose quantities differ.
+
+    A symbol missing on one side counts as a zero quantity there.
+    """
+
+    merged = broker.merge(journal, on=["account_id", "symbol"], how="outer", suffixes=("_broker", "_journal"))
+    merged[["qty_broker", "qty_journal"]] = merged[["qty_broker", "qty_journal"]].fillna(0.0)
+    merged["qty_diff"] = merged["qty_broker"] - merged["qty_journal"]
+    breaks = merged[merged["qty_diff"].abs() > tolerance]
+    return breaks.sort_values(["account_id", "symbol"]).reset_index(drop=True)
+
+
+def _none_if_nan(value: float) -> float | None:
+    return None if value != value else float(value)
+
+
+_BREAK_COLUMNS = [
+    "account_id",
+    "symbol",
+    "qty_broker",
+    "qty_journal",
+    "qty_diff",
+    "avg_price_broker",
+    "avg_price_journal",
+]
+
+
+def account_statuses(fetches: Sequence[PositionFetch], breaks: pd.DataFrame) -> list[dict]:
+    """One ``reconciliation_status`` row per fetched account."""
+
+    counts = breaks["account_id"].value_counts().to_dict() if len(breaks) else {}
+    rows = []
+    for fetch in fetches:
+        found = int(counts.get(fetch.account_id, 0))
+        if fetch.status != "ok":
+            status = fetch.status
+        else:
+            status = "out_of_sync" if found else "in_sync"
+        rows.append(
+            dict(account_id=fetch.account_id, broker=fetch.broker, status=status, breaks=found, error=fetch.error)
+        )
+    return rows
+
+
+def _persist(
+    db: Session, fetches: Sequence[PositionFetch], breaks: pd.DataFrame, statuses: list[dict], checked_at: datetime
+) -> None:
+    """Replace breaks of the compared accounts and upsert every account's status, then commit."""
+
+    compared = [fetch.account_id for fetch in fetches if fetch.status == "ok"]
+    if compared:
+        db.execute(delete(PositionBreak).where(PositionBreak.account_id.in_(compared)))
+    if len(breaks):
+        db.execute(
+            insert(PositionBreak),
+            [
+                dict(
+                    account_id=int(account_id),
+                    symbol=symbol,
+                    broker_qty=broker_qty,
+                    journal_qty=journal_qty,
+                    qty_diff=qty_diff,
+                    broker_avg_price=_none_if_nan(broker_price),
+                    journal_avg_price=_none_if_nan(journal_price),
+                    detected_at=checked_at,
+                )
+                for account_id, symbol, broker_qty, journal_qty, qty_diff, broker_price, journal_price in breaks[
+                    _BREAK_COLUMNS
+                ].itertuples(index=False, name=None)
+            ],
+        )
+    if statuses:
+        stmt = pg_insert(ReconciliationStatus).values([dict(row, checked_at=checked_at) for row in statuses])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ReconciliationStatus.account_id],
+            set_={name: stmt.excluded[name] for name in ("broker", "status", "breaks", "error", "checked_at")},
+        )
+        db.execute(stmt)
+    db.commit()
+
+
+def reconcile_positions(db: Session, account_ids: Sequence[int] | None = None) -> ReconciliationSummary:
+    """Reconcile every broker-connected account (or just ``account_ids``) and persist the breaks."""
+
+    started = time.perf_counter()
+    query = (
+        select(Account, BrokerConnection.broker)
+        .join(Account.broker_connection)
+        .where(BrokerConnection.broker.in_(BROKER_CONNECTORS))
+    )
+    if account_ids is not None:
+        query = query.where(Account.id.in_(account_ids))
+    targets = [(account, broker) for account, broker in db.execute(query).all()]
+    fetches = fetch_broker_positions(targets, settings.reconcile.deadline_seconds)
+    breaks = compare_positions(
+        broker_position_frame(fetches),
+        journal_position_frame(db, [fetch.account_id for fetch in fetches if fetch.status == "ok"]),
+        settings.reconcile.qty_tolerance,
+    )
+    statuses = account_statuses(fetches, breaks)
+    _persist(db, fetches, breaks, statuses, datetime.now(timezone.utc))
+
+    summary = ReconciliationSummary(accounts=len(statuses), breaks=len(breaks))
+    for row in statuses:
+        setattr(summary, row["status"], getattr(summary, row["status"]) + 1)
+    summary.seconds = time.perf_counter() - started
+    return summary
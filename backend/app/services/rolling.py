@@ -0,0 +1,126 @@
+"""Rolling-window KPI series in linear time.
+
+Windows are either the last ``N`` trades (``trades`` mode, one point per trade)
+or the last ``N`` calendar days (``days`` mode, one point per trading day).
+Counts and sums come from prefix sums, and the rolling equity peak from a
+monotonic deque, so every window size costs O(n) regardless of its width.
+Points are only emitted once a full window of history is available.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Literal, Sequence
+
+import numpy as np
+
+from app.services.kpi_engine import TradeColumns
+
+RollingMode = Literal["trades", "days"]
+
+
+@dataclass
+class RollingSeries:
+    """One rolling KPI series; arrays are aligned with ``dates``.
+
+    ``drawdown`` is how far the latest equity sits below the highest equity
+    reached within the window (zero or negative).
+    """
+
+    window: int
+    dates: np.ndarray
+    trades: np.ndarray
+    win_rate: np.ndarray
+    expectancy: np.ndarray
+    net_pnl: np.ndarray
+    drawdown: np.ndarray
+
+
+def rolling_max(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Return ``values[starts[i]:i + 1].max()`` for every ``i``; ``starts`` must not decrease."""
+
+    items = values.tolist()
+    lows = starts.tolist()
+    peaks = np.empty(len(items))
+    window: deque[int] = deque()
+    for position, value in enumerate(items):
+        while window and items[window[-1]] <= value:
+            window.pop()
+        window.append(position)
+        while window[0] < lows[position]:
+            window.popleft()
+        peaks[position] = items[window[0]]
+    return peaks
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0.0], np.cumsum(values, dtype=float)))
+
+
+def _series(
+    window: int,
+    dates: np.ndarray,
+    pnl: np.ndarray,
+    trades: np.ndarray,
+    wins: np.ndarray,
+    starts: np.ndarray,
+    emit: np.ndarray,
+) -> RollingSeries:
+    """Build a series from per-point PnL/trade/win counts and each point's window start."""
+
+    pnl_sum, trade_sum, win_sum = _prefix(pnl), _prefix(trades), _prefix(wins)
+    equity = pnl_sum[1:]
+    peak = rolling_max(equity, starts)
+    ends = np.flatnonzero(emit)
+    first = starts[ends]
+    count = trade_sum[ends + 1] - trade_sum[first]
+    net = pnl_sum[ends + 1] - pnl_sum[first]
+    return RollingSeries(
+        window=window,
+        dates=dates[ends],
+        trades=count.astype(np.int64),
+        win_rate=(win_sum[ends + 1] - win_sum[first]) / count,
+        expectancy=net / count,
+        net_pnl=net,
+        drawdown=equity[ends] - peak[ends],
+    )
+
+
+def rolling_trade_kpis(columns: TradeColumns, window: int) -> RollingSeries:
+    """Rolling KPIs over the last ``window`` trades; ``columns`` must be in execution order."""
+
+    pnl = columns.net_pnl()
+    positions = np.arange(len(pnl))
+    return _series(
+        window,
+        columns.trade_day,
+        pnl,
+        np.ones(len(pnl)),
+        (pnl > 0).astype(float),
+        np.maximum(positions - window + 1, 0),
+        positions >= window - 1,
+    )
+
+
+def rolling_day_kpis(columns: TradeColumns, days: int) -> RollingSeries:
+    """Rolling KPIs over the last ``days`` calendar days, evaluated on each trading day."""
+
+    pnl = columns.net_pnl()
+    trading_days, inverse = np.unique(columns.trade_day, return_inverse=True)
+    ordinals = trading_days.astype(np.int64)
+    return _series(
+        days,
+        trading_days,
+        np.bincount(inverse, weights=pnl, minlength=len(trading_days)),
+        np.bincount(inverse, minlength=len(trading_days)).astype(float),
+        np.bincount(inverse, weights=pnl > 0, minlength=len(trading_days)),
+        np.searchsorted(ordinals, ordinals - days + 1, side="left"),
+        ordinals >= (ordinals[0] + days - 1 if len(ordinals) else 0),
+    )
+
+
+def rolling_kpis(columns: TradeColumns, windows: Sequence[int], mode: RollingMode = "trades") -> list[RollingSeries]:
+    """Compute one rolling series per window size."""
+
+    build = rolling_trade_kpis if mode == "trades" else rolling_day_kpis
+    return [build(columns, window) for window in windows]
@@ -0,0 +1,97 @@
+"""Monthly KPI rollups for the ``account_month`` and ``strategy_month`` scopes."""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Sequence
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.models.models import KPI, Account, Trade, TradeTag
+from app.services.kpi_engine import TradeColumns, grouped_trade_kpis, kpi_records
+from app.services.trade_loader import load_keyed_trade_columns
+
+logger = get_logger(__name__)
+
+MONTHLY_SCOPES = {"account": "account_month", "strategy": "strategy_month"}
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    """Return the first and last instant (UTC) of the calendar month containing ``month``."""
+
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    following = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, following - timedelta(microseconds=1)
+
+
+def monthly_kpi_rows(scope: str, ref_ids: np.ndarray, columns: TradeColumns) -> list[dict]:
+    """Group trades by (ref id, calendar month) and build ``kpis`` rows for ``scope``."""
+
+    table = grouped_trade_kpis(
+        columns, {"ref_id": ref_ids, "month": columns.trade_day.astype("datetime64[M]")}
+    )
+    rows = []
+    for (ref_id, month), metrics in kpi_records(table):
+        period_start, period_end = month_bounds(month)
+        rows.append(
+            dict(
+                scope=scope,
+                scope_ref_id=int(ref_id),
+                period_start=period_start,
+                period_end=period_end,
+                **metrics,
+            )
+        )
+    return rows
+
+
+def _replace_rollup(db: Session, scope: str, ref_ids: Sequence[int], rows: list[dict]) -> None:
+    db.execute(delete(KPI).where(KPI.scope == scope, KPI.scope_ref_id.in_(ref_ids)))
+    if rows:
+        db.execute(insert(KPI), rows)
+
+
+def rollup_monthly_kpis(
+    db: Session,
+    account_ids: Sequence[int] | None = None,
+    strategy_ids: Sequence[int] | None = None,
+) -> dict[str, int]:
+    """Recompute monthly KPIs for the given accounts and strategies.
+
+    ``None`` means every account, and every strategy tagging a trade of the
+    selected accounts. Each scope is loaded once and aggregated in one grouped
+    pass; existing rows for the selected refs are replaced in a single
+    transaction. Returns the number of rows written per scope.
+    """
+
+    if strategy_ids is None:
+        tagged = select(TradeTag.strategy_id).distinct()
+        if account_ids is not None:
+            tagged = tagged.join(Trade, Trade.id == TradeTag.trade_id).where(Trade.account_id.in_(account_ids))
+        strategy_ids = db.scalars(tagged).all()
+    if account_ids is None:
+        account_ids = db.scalars(select(Account.id)).all()
+
+    written = {scope: 0 for scope in MONTHLY_SCOPES.values()}
+    if account_ids:
+        keys, columns = load_keyed_trade_columns(db, Trade.account_id, Trade.account_id.in_(account_ids))
+        rows = monthly_kpi_rows("account_month", keys, columns)
+        _replace_rollup(db, "account_month", account_ids, rows)
+        written["account_month"] = len(rows)
+    if strategy_ids:
+        keys, columns = load_keyed_trade_columns(
+            db, TradeTag.strategy_id, TradeTag.strategy_id.in_(strategy_ids), join_tag=True
+        )
+        rows = monthly_kpi_rows("strategy_month", keys, columns)
+        _replace_rollup(db, "strategy_month", strategy_ids, rows)
+        written["strategy_month"] = len(rows)
+    db.commit()
+    logger.info(
+        "monthly_rollup_finished",
+        accounts=len(account_ids),
+        strategies=len(strategy_ids),
+        **written,
+    )
+    return written
@@ -0,0 +1,192 @@
+"""Bootstrap (Monte Carlo) simulation of strategy and account outcomes.
+
+A path resamples the per-trade net PnL used by the KPI engine with replacement
+and accumulates it into an equity curve starting at zero. Paths are simulated
+as ``(paths, horizon)`` matrices in blocks of ``BLOCK_PATHS``; every block has
+its own child of the run's ``SeedSequence``, so a seed reproduces the same
+paths whether blocks run in-process or on the process pool that large runs are
+split across.
+"""
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from typing import Literal
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.models.models import TradeTag
+from app.services.trade_loader import load_keyed_trade_columns, load_trade_columns, trade_window
+
+logger = get_logger(__name__)
+
+BLOCK_PATHS = 1_000
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = Lock()
+
+
+@dataclass
+class Distribution:
+    """Summary of one simulated quantity across paths."""
+
+    mean: float
+    std: float
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+
+    @classmethod
+    def of(cls, values: np.ndarray) -> "Distribution":
+        p5, p25, p50, p75, p95 = np.percentile(values, PERCENTILES).tolist()
+        return cls(float(values.mean()), float(values.std()), p5, p25, p50, p75, p95)
+
+
+@dataclass
+class BootstrapResult:
+    """Outcome distribution of a bootstrap run; ``risk_of_ruin`` needs ``capital``."""
+
+    trades: int
+    paths: int
+    horizon: int
+    seed: int
+    final_equity: Distribution
+    max_drawdown: Distribution
+    prob_loss: float
+    risk_of_ruin: float | None
+
+
+def simulate_block(
+    pnl: np.ndarray, paths: int, horizon: int, seed: np.random.SeedSequence
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Simulate ``paths`` resampled equity curves; returns final equity, max drawdown and lowest equity per path.
+
+    Drawdowns are measured from the running peak including the zero start and
+    are zero or negative, as in the KPI engine.
+    """
+
+    rng = np.random.default_rng(seed)
+    equity = pnl[rng.integers(0, len(pnl), size=(paths, horizon))]
+    np.cumsum(equity, axis=1, out=equity)
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 0.0, out=peak)
+    np.subtract(equity, peak, out=peak)
+    return equity[:, -1].copy(), peak.min(axis=1), equity.min(axis=1)
+
+
+def _simulate_blocks(
+    pnl: np.ndarray, blocks: list[tuple[int, np.random.SeedSequence]], horizon: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    results = [simulate_block(pnl, paths, horizon, seed) for paths, seed in blocks]
+    return tuple(np.concatenate(column) for column in zip(*results))
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    """Shared pool, started on first use with ``spawn`` so workers never inherit server threads."""
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.simulation.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _simulate_on_pool(
+    pnl: np.ndarray, blocks: list[tuple[int, np.random.SeedSequence]], horizon: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split blocks evenly over the pool; a broken pool is discarded and the run finishes in-process."""
+
+    global _pool
+    size = -(-len(blocks) // settings.simulation.max_workers)
+    chunks = [blocks[start : start + size] for start in range(0, len(blocks), size)]
+    pool = _process_pool()
+    try:
+        parts = list(pool.map(_simulate_blocks, [pnl] * len(chunks), chunks, [horizon] * len(chunks)))
+    except BrokenProcessPool:
+        logger.warning("simulation_pool_broken", blocks=len(blocks))
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return _simulate_blocks(pnl, blocks, horizon)
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def bootstrap_pnl(
+    pnl: np.ndarray,
+    paths: int,
+    horizon: int | None = None,
+    seed: int | None = None,
+    capital: float | None = None,
+    ruin_fraction: float = 1.0,
+) -> BootstrapResult:
+    """Resample ``pnl`` into ``paths`` curves of ``horizon`` trades (default: one per trade).
+
+    A path is ruined once its equity falls to ``-capital * ruin_fraction``.
+    Runs of at least ``simulation.parallel_min_steps`` path steps are spread
+    over the process pool. Without ``seed`` a fresh one is drawn and returned.
+    """
+
+    pnl = np.ascontiguousarray(pnl, dtype=float)
+    if not len(pnl):
+        raise ValueError("No trades to resample")
+    horizon = horizon or len(pnl)
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    sequence = np.random.SeedSequence(seed)
+    counts = [min(BLOCK_PATHS, paths - start) for start in range(0, paths, BLOCK_PATHS)]
+    blocks = list(zip(counts, sequence.spawn(len(counts))))
+
+    parallel = settings.simulation.max_workers > 1 and len(blocks) > 1
+    if parallel and paths * horizon >= settings.simulation.parallel_min_steps:
+        final, drawdown, lowest = _simulate_on_pool(pnl, blocks, horizon)
+    else:
+        final, drawdown, lowest = _simulate_blocks(pnl, blocks, horizon)
+
+    ruin = None
+    if capital is not None:
+        ruin = float(np.count_nonzero(lowest <= -capital * ruin_fraction) / paths)
+    return BootstrapResult(
+        trades=len(pnl),
+        paths=paths,
+        horizon=horizon,
+        seed=seed,
+        final_equity=Distribution.of(final),
+        max_drawdown=Distribution.of(drawdown),
+        prob_loss=float(np.count_nonzero(final < 0) / paths),
+        risk_of_ruin=ruin,
+    )
+
+
+def load_trade_pnl(
+    db: Session,
+    scope: Literal["account", "strategy"],
+    scope_ref_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> np.ndarray:
+    """Per-trade net PnL of an account, or of the trades tagged with a strategy."""
+
+    if scope == "account":
+        columns = load_trade_columns(db, scope_ref_id, start, end)
+    else:
+        _, columns = load_keyed_trade_columns(
+            db,
+            TradeTag.strategy_id,
+            TradeTag.strategy_id == scope_ref_id,
+            *trade_window(None, start, end),
+            join_tag=True,
+        )
+    return columns.net_pnl() if len(columns) else np.empty(0)
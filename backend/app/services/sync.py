@@ -0,0 +1,257 @@
+"""Broker trade synchronisation shared by the API and the worker."""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.core.settings import settings
+from app.ingestors import ibkr_ingestor, shioaji_ingestor
+from app.ingestors.base import BrokerConnector, TradePage
+from app.models.models import Account, SyncWatermark
+from app.services.trades import UpsertResult, finish_import, upsert_trades
+
+logger = get_logger(__name__)
+
+PageCallback = Callable[[TradePage, float], None]
+Window = Tuple[datetime, datetime]
+
+# Connector windows are inclusive, so adjacent windows are separated by one tick.
+TICK = timedelta(microseconds=1)
+
+BROKER_CONNECTORS: Dict[str, BrokerConnector] = {
+    "shioaji": shioaji_ingestor,
+    "ibkr": ibkr_ingestor,
+}
+
+
+def broker_pools(brokers: Iterable[str], max_workers: int, prefix: str) -> Dict[str, ThreadPoolExecutor]:
+    """One thread pool per broker, sized by ``sync.broker_concurrency`` and capped at ``max_workers``.
+
+    Work for a broker queues on its own pool, so a slow or rate-limited broker
+    never holds threads that other brokers could use.
+    """
+
+    return {
+        broker: ThreadPoolExecutor(
+            max_workers=min(settings.sync.broker_concurrency.get(broker, 1), max_workers),
+            thread_name_prefix=f"{prefix}-{broker}",
+        )
+        for broker in sorted(set(brokers))
+    }
+
+
+def _window_progress(page: TradePage, start: datetime, end: datetime) -> float:
+    """Approximate progress through the window from the last fill in a page."""
+
+    if page.cursor is None:
+        return 1.0
+    if not page.trades or end <= start:
+        return 0.0
+    done = (page.trades[-1].trade_ts - start) / (end - start)
+    return min(max(done, 0.0), 1.0)
+
+
+def iter_synced_pages(
+    db: Session,
+    account: Account,
+    broker: str,
+    start: datetime,
+    end: datetime,
+    cursor: str | None = None,
+) -> Iterator[tuple[TradePage, UpsertResult]]:
+    """Fetch broker pages for a window and write each one, yielding it with what it wrote.
+
+    Every page is committed as soon as it is fetched, so persistence overlaps with
+    the remaining fetch and callers can account for written pages even if a later
+    one fails.
+    """
+
+    connector = BROKER_CONNECTORS.get(broker)
+    if connector is None:
+        raise ValueError(f"Unsupported broker: {broker}")
+    pages = connector.iter_trades(
+        account, start, end, cursor=cursor, page_size=settings.ingest.broker_page_size
+    )
+    for page in pages:
+        yield page, upsert_trades(db, page.trades, match_lots=False)
+
+
+def sync_account_trades(
+    db: Session,
+    account: Account,
+    broker: str,
+    start: datetime,
+    end: datetime,
+    cursor: str | None = None,
+    on_page: PageCallback | None = None,
+    rebuild_equity: bool = True,
+) -> UpsertResult:
+    """Stream broker trades for a window into the journal, then match lots and refresh the equity curve.
+
+    ``on_page`` receives every written page with the estimated progress, letting
+    callers record the page cursor for resumption. ``rebuild_equity=False``
+    leaves lot matching and the equity rebuild to the caller.
+    """
+
+    result = UpsertResult()
+    for page, written in iter_synced_pages(db, account, broker, start, end, cursor=cursor):
+        result = result.merge(written)
+        if on_page:
+            on_page(page, _window_progress(page, start, end))
+    if rebuild_equity:
+        finish_import(db, account.id, result)
+    return result
+
+
+def _aware(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC so they compare with stored watermarks."""
+
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def uncovered_windows(start: datetime, end: datetime, covered: Window | None) -> tuple[List[Window], bool]:
+    """Split ``[start, end]`` into the parts not already inside ``covered``.
+
+    Returns the windows still to fetch and whether fetching them keeps the covered
+    range contiguous, i.e. whether the watermark may be extended afterwards.
+    """
+
+    if covered is None:
+        return [(start, end)], True
+    covered_from, covered_to = covered
+    if end < covered_from - TICK or start > covered_to + TICK:
+        return [(start, end)], False
+    windows: List[Window] = []
+    if start < covered_from:
+        windows.append((start, covered_from - TICK))
+    if end > covered_to:
+        windows.append((covered_to + TICK, end))
+    return windows, True
+
+
+def chunk_window(start: datetime, end: datetime, size: timedelta | None) -> List[Window]:
+    """Split an inclusive window into consecutive chunks of at most ``size``."""
+
+    if size is None:
+        return [(start, end)]
+    chunks: List[Window] = []
+    while start <= end:
+        chunk_end = min(start + size - TICK, end)
+        chunks.append((start, chunk_end))
+        start = chunk_end + TICK
+    return chunks
+
+
+def get_watermark(db: Session, account_id: int, broker: str) -> SyncWatermark | None:
+    """Return the stored sync watermark for an account and broker."""
+
+    return db.scalar(
+        select(SyncWatermark).where(SyncWatermark.account_id == account_id, SyncWatermark.broker == broker)
+    )
+
+
+def extend_watermark(
+    db: Session,
+    account_id: int,
+    broker: str,
+    start: datetime,
+    end: datetime,
+    last_trade_ts: datetime | None,
+) -> None:
+    """Widen the covered range to include ``[start, end]`` and commit."""
+
+    stmt = insert(SyncWatermark).values(
+        account_id=account_id,
+        broker=broker,
+        synced_from=start,
+        synced_through=end,
+        last_trade_ts=last_trade_ts,
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_sync_watermark",
+        set_=dict(
+            synced_from=func.least(SyncWatermark.synced_from, stmt.excluded.synced_from),
+            synced_through=func.greatest(SyncWatermark.synced_through, stmt.excluded.synced_through),
+            last_trade_ts=func.greatest(SyncWatermark.last_trade_ts, stmt.excluded.last_trade_ts),
+            updated_at=func.now(),
+        ),
+    )
+    db.execute(stmt)
+    db.commit()
+
+
+def sync_account_window(
+    db: Session,
+    account: Account,
+    broker: str,
+    start: datetime,
+    end: datetime,
+    chunk: timedelta | None = None,
+    cursor: str | None = None,
+    on_page: PageCallback | None = None,
+) -> UpsertResult:
+    """Sync only the part of ``[start, end]`` the watermark does not cover yet.
+
+    Missing ranges are fetched in chunks of at most ``chunk``, walking away from the
+    covered range so it stays contiguous, and the watermark is advanced after each
+    chunk; an interrupted catch-up therefore resumes at the first unsynced chunk,
+    where ``cursor`` (the last recorded page cursor) applies. Without a contiguous
+    watermark there is no record of which chunk the cursor came from, so the
+    window is refetched from its start instead. Lots are matched and
+    the equity curve rebuilt once at the end, including after a failure part-way
+    through.
+    """
+
+    start, end = _aware(start), _aware(end)
+    watermark = get_watermark(db, account.id, broker)
+    covered = (watermark.synced_from, watermark.synced_through) if watermark else None
+    windows, contiguous = uncovered_windows(start, end, covered)
+    if not contiguous:
+        cursor = None
+    result = UpsertResult()
+    try:
+        for window_start, window_end in windows:
+            chunks = chunk_window(window_start, window_end, chunk)
+            if covered is not None and window_end < covered[0]:
+                chunks.reverse()
+            for chunk_start, chunk_end in chunks:
+                chunk_result = UpsertResult()
+                pages = iter_synced_pages(db, account, broker, chunk_start, chunk_end, cursor=cursor)
+                for page, written in pages:
+                    # Merged page by page so a failure still finishes the pages already committed.
+                    chunk_result = chunk_result.merge(written)
+                    result = result.merge(written)
+                    if on_page:
+                        on_page(page, _window_progress(page, chunk_start, chunk_end))
+                cursor = None
+                if contiguous:
+                    extend_watermark(
+                        db, account.id, broker, chunk_start, chunk_end, chunk_result.latest_trade_ts
+                    )
+    except Exception:
+        # The failed chunk's transaction is unusable; finish what earlier chunks
+        # committed on a clean one without masking the original error.
+        db.rollback()
+        try:
+            finish_import(db, account.id, result)
+        except Exception:
+            db.rollback()
+            logger.exception("sync_finish_after_failure_failed", account_id=account.id, broker=broker)
+        raise
+    finish_import(db, account.id, result)
+    return result
+
+
+def next_sync_window(db: Session, account_id: int, broker: str, now: datetime) -> Window:
+    """Return the window from just after the watermark (or the initial lookback) up to ``now``."""
+
+    watermark = get_watermark(db, account_id, broker)
+    if watermark is None:
+        return now - timedelta(days=settings.sync.initial_lookback_days), now
+    return watermark.synced_through + TICK, now
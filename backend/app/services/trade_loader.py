@@ -0,0 +1,116 @@
+"""Column-projected trade loading for analytics.
+
+Analytics only need a handful of numeric columns, so these loaders select them
+directly instead of hydrating ``Trade`` objects (with ``raw_json``, timestamps,
+identity-map entries and eager-loaded strategies). Large results are streamed
+through a server-side cursor in ``settings.analytics.trade_fetch_size`` batches.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import ColumnElement, Date, Float, Row, Select, String, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.models import Symbol, Trade, TradeTag
+from app.services.kpi_engine import TradeColumns
+
+TRADE_COLUMNS = (
+    cast(Trade.side, String).label("side"),
+    cast(Trade.qty, Float).label("qty"),
+    cast(Trade.price, Float).label("price"),
+    cast(func.coalesce(Trade.fee, 0), Float).label("fee"),
+    cast(func.coalesce(Trade.tax, 0), Float).label("tax"),
+    func.date(Trade.trade_ts, type_=Date).label("trade_day"),
+)
+
+
+def trade_window(account_id: int | None, start: datetime | None = None, end: datetime | None = None) -> list:
+    """Filter clauses selecting trades in ``[start, end]``, for one account unless ``None``."""
+
+    clauses = [] if account_id is None else [Trade.account_id == account_id]
+    if start is not None:
+        clauses.append(Trade.trade_ts >= start)
+    if end is not None:
+        clauses.append(Trade.trade_ts <= end)
+    return clauses
+
+
+def iter_row_batches(db: Session, stmt: Select) -> Iterator[Sequence[Row]]:
+    """Execute ``stmt`` and yield its rows in batches, streaming when enabled.
+
+    Runs on the session's Core connection, bypassing ORM result processing.
+    """
+
+    connection = db.connection()
+    if not settings.analytics.stream_trades:
+        yield connection.execute(stmt).all()
+        return
+    result = connection.execute(stmt.execution_options(yield_per=settings.analytics.trade_fetch_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def load_trade_columns(
+    db: Session,
+    account_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    ordered: bool = False,
+) -> TradeColumns:
+    """Load the KPI input columns for an account's trades, in execution order if ``ordered``."""
+
+    stmt = select(*TRADE_COLUMNS).where(*trade_window(account_id, start, end))
+    if ordered:
+        stmt = stmt.order_by(Trade.trade_ts, Trade.id)
+    return TradeColumns.concat(TradeColumns.from_rows(rows) for rows in iter_row_batches(db, stmt))
+
+
+def load_keyed_trade_columns(
+    db: Session,
+    key: ColumnElement[int],
+    *clauses: ColumnElement[bool],
+    join_tag: bool = False,
+) -> tuple[np.ndarray, TradeColumns]:
+    """Load KPI input columns together with a group key (e.g. account or strategy id).
+
+    With ``join_tag`` each trade appears once per strategy tag.
+    """
+
+    stmt = select(*TRADE_COLUMNS, key).select_from(Trade)
+    if join_tag:
+        stmt = stmt.join(TradeTag, TradeTag.trade_id == Trade.id)
+    keys: list[np.ndarray] = []
+    parts: list[TradeColumns] = []
+    for rows in iter_row_batches(db, stmt.where(*clauses)):
+        keys.append(np.fromiter((row[-1] for row in rows), dtype=np.int64, count=len(rows)))
+        parts.append(TradeColumns.from_rows(rows))
+    if not keys:
+        return np.empty(0, dtype=np.int64), TradeColumns.empty()
+    return np.concatenate(keys), TradeColumns.concat(parts)
+
+
+def load_trade_frame(
+    db: Session,
+    account_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> pd.DataFrame:
+    """Load trades with their ticker as a frame, for exports."""
+
+    stmt = (
+        select(Symbol.ticker, *TRADE_COLUMNS)
+        .join(Symbol, Symbol.id == Trade.symbol_id)
+        .where(*trade_window(account_id, start, end))
+    )
+    names = ["ticker", *(column.name for column in TRADE_COLUMNS)]
+    frames = [pd.DataFrame.from_records(rows, columns=names) for rows in iter_row_batches(db, stmt)]
+    if not frames:
+        return pd.DataFrame(columns=names)
+    return pd.concat(frames, ignore_index=True)
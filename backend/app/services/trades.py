@@ -1,20 +1,43 @@
 """Trade service logic including KPI calculations."""
 from __future__ import annotations
 
+import csv
 from dataclasses import dataclass
-from datetime import date, datetime
-from typing import Iterable, Sequence
+from datetime import date, datetime, time
+from io import StringIO
+import json
+from typing import Iterable, Literal, Sequence
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, select, text, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from app.core.logging import get_logger
+from app.core.settings import settings
 from app.models.models import Account, EquityDaily, KPI, Strategy, Trade, TradeTag
+from app.services.drawdown_index import apply_equity_write
+from app.services.kpi_cache import cached_kpis, invalidate_kpis, store_kpis
+from app.services.kpi_engine import (
+    EMPTY_KPIS,
+    TradeColumns,
+    compute_trade_kpis,
+    daily_equity,
+    grouped_trade_kpis,
+    kpi_records,
+    profit_factor,
+)
+from app.services.kpi_sql import compute_kpis_sql
+from app.services.lots import match_account_lots
+from app.services.rollups import rollup_monthly_kpis
+from app.services.trade_loader import load_keyed_trade_columns, load_trade_columns, trade_window
 
 logger = get_logger(__name__)
 
+ACCOUNT_KPI_SCOPES = ("account", "account_month")
+STRATEGY_KPI_SCOPES = ("strategy", "strategy_month")
+
 
 @dataclass
 class TradeDTO:
@@ -33,14 +56,187 @@ class TradeDTO:
     raw: dict | None = None
 
 
-def upsert_trades(db: Session, trades: Sequence[TradeDTO]) -> int:
-    """Insert trades if they do not already exist."""
+@dataclass
+class TradeBatch:
+    """Columnar batch of normalized trades for a single account.
+
+    String columns are object arrays, numeric columns ``float64`` and
+    ``trade_ts`` is ``datetime64[us]`` so ``tolist()`` yields ``datetime`` objects.
+    """
+
+    account_id: int
+    symbol: np.ndarray
+    side: np.ndarray
+    qty: np.ndarray
+    price: np.ndarray
+    trade_ts: np.ndarray
+    order_id: np.ndarray
+    fee: np.ndarray
+    tax: np.ndarray
+    venue: np.ndarray
+    raw: list[dict] | None = None
+
+    def __len__(self) -> int:
+        return len(self.qty)
+
+    def records(self) -> Iterable[tuple]:
+        """Yield ``(symbol, side, qty, price, trade_ts, order_id, fee, tax, venue, raw)`` tuples."""
+
+        raw = self.raw if self.raw is not None else [None] * len(self)
+        return zip(
+            self.symbol.tolist(),
+            self.side.tolist(),
+            self.qty.tolist(),
+            self.price.tolist(),
+            self.trade_ts.tolist(),
+            self.order_id.tolist(),
+            self.fee.tolist(),
+            self.tax.tolist(),
+            self.venue.tolist(),
+            raw,
+        )
+
+    def to_dtos(self) -> list[TradeDTO]:
+        """Materialize the batch as ``TradeDTO`` objects."""
+
+        return [
+            TradeDTO(self.account_id, symbol, side, qty, price, ts, order_id, fee, tax, venue, raw)
+            for symbol, side, qty, price, ts, order_id, fee, tax, venue, raw in self.records()
+        ]
+
+
+BULK_INSERT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class UpsertResult:
+    """Outcome of writing a batch of trades."""
+
+    imported: int = 0
+    duplicates: int = 0
+    earliest_trade_ts: datetime | None = None
+    latest_trade_ts: datetime | None = None
+
+    def merge(self, other: "UpsertResult") -> "UpsertResult":
+        """Combine counts and the imported timestamp range of two results."""
+
+        earliest = [ts for ts in (self.earliest_trade_ts, other.earliest_trade_ts) if ts is not None]
+        latest = [ts for ts in (self.latest_trade_ts, other.latest_trade_ts) if ts is not None]
+        return UpsertResult(
+            imported=self.imported + other.imported,
+            duplicates=self.duplicates + other.duplicates,
+            earliest_trade_ts=min(earliest) if earliest else None,
+            latest_trade_ts=max(latest) if latest else None,
+        )
+
+
+def _chunks(rows: Sequence[dict], size: int) -> Iterable[Sequence[dict]]:
+    """Yield successive fixed-size slices of ``rows``."""
+
+    for offset in range(0, len(rows), size):
+        yield rows[offset : offset + size]
+
+
+def resolve_symbol_ids(db: Session, tickers: Iterable[str]) -> dict[str, int]:
+    """Map tickers to symbol ids, creating missing symbols in one statement."""
 
-    if not trades:
-        return 0
     from app.models.models import Symbol  # local import to avoid circular
 
-    imported = 0
+    wanted = set(tickers)
+    if not wanted:
+        return {}
+    lookup = select(Symbol.ticker, Symbol.id).order_by(Symbol.id.desc())
+    ids: dict[str, int] = dict(db.execute(lookup.where(Symbol.ticker.in_(wanted))).tuples().all())
+    missing = sorted(wanted - ids.keys())
+    if missing:
+        stmt = (
+            insert(Symbol)
+            .values(
+                [
+                    dict(ticker=ticker, exchange="TWSE", asset_class="stock", lot_size=1000)
+                    for ticker in missing
+                ]
+            )
+            .on_conflict_do_nothing(constraint="uq_symbol")
+            .returning(Symbol.ticker, Symbol.id)
+        )
+        ids.update(db.execute(stmt).tuples().all())
+        raced = [ticker for ticker in missing if ticker not in ids]
+        if raced:
+            ids.update(db.execute(lookup.where(Symbol.ticker.in_(raced))).tuples().all())
+    return ids
+
+
+def _trade_rows(trades: Sequence[TradeDTO] | TradeBatch, symbol_ids: dict[str, int]) -> list[dict]:
+    """Build insert parameter sets for DTOs or a columnar batch."""
+
+    if isinstance(trades, TradeBatch):
+        return [
+            dict(
+                account_id=trades.account_id,
+                symbol_id=symbol_ids[symbol],
+                side=side,
+                qty=qty,
+                price=price,
+                trade_ts=trade_ts,
+                order_id=order_id,
+                fee=fee,
+                tax=tax,
+                venue=venue,
+                raw_json=raw,
+            )
+            for symbol, side, qty, price, trade_ts, order_id, fee, tax, venue, raw in trades.records()
+        ]
+    return [
+        dict(
+            account_id=dto.account_id,
+            symbol_id=symbol_ids[dto.symbol],
+            side=dto.side,
+            qty=dto.qty,
+            price=dto.price,
+            trade_ts=dto.trade_ts,
+            order_id=dto.order_id,
+            fee=dto.fee,
+            tax=dto.tax,
+            venue=dto.venue,
+            raw_json=dto.raw,
+        )
+        for dto in trades
+    ]
+
+
+def _upsert_trades_bulk(db: Session, trades: Sequence[TradeDTO] | TradeBatch) -> UpsertResult:
+    """Insert trades with set-based statements, skipping natural-key duplicates."""
+
+    if isinstance(trades, TradeBatch):
+        tickers: Iterable[str] = pd.unique(trades.symbol)
+    else:
+        tickers = (dto.symbol for dto in trades)
+    rows = _trade_rows(trades, resolve_symbol_ids(db, tickers))
+    # Executed as "insertmanyvalues": one multi-row INSERT per chunk of parameter sets.
+    stmt = (
+        insert(Trade)
+        .on_conflict_do_nothing(constraint="uq_trade_natural_key")
+        .returning(Trade.trade_ts)
+        .execution_options(insertmanyvalues_page_size=BULK_INSERT_CHUNK_SIZE)
+    )
+    result = UpsertResult()
+    for chunk in _chunks(rows, BULK_INSERT_CHUNK_SIZE):
+        stamps = db.scalars(stmt, list(chunk)).all()
+        if stamps:
+            result = result.merge(
+                UpsertResult(imported=len(stamps), earliest_trade_ts=min(stamps), latest_trade_ts=max(stamps))
+            )
+    result.duplicates = len(rows) - result.imported
+    return result
+
+
+def _upsert_trades_rowwise(db: Session, trades: Sequence[TradeDTO]) -> UpsertResult:
+    """Insert trades one at a time, checking for an existing row before each insert."""
+
+    from app.models.models import Symbol  # local import to avoid circular
+
+    result = UpsertResult()
     for dto in trades:
         symbol = db.scalar(select(Symbol).where(Symbol.ticker == dto.symbol))
         if symbol is None:
@@ -57,6 +253,7 @@ def upsert_trades(db: Session, trades: Sequence[TradeDTO]) -> int:
             )
         )
         if existing:
+            result.duplicates += 1
             continue
         trade = Trade(
             account_id=dto.account_id,
@@ -72,26 +269,182 @@ def upsert_trades(db: Session, trades: Sequence[TradeDTO]) -> int:
             raw_json=dto.raw,
         )
         db.add(trade)
-        imported += 1
+        result.imported += 1
+        if result.earliest_trade_ts is None or dto.trade_ts < result.earliest_trade_ts:
+            result.earliest_trade_ts = dto.trade_ts
+        if result.latest_trade_ts is None or dto.trade_ts > result.latest_trade_ts:
+            result.latest_trade_ts = dto.trade_ts
+    return result
+
+
+def upsert_trades(
+    db: Session, trades: Sequence[TradeDTO] | TradeBatch, bulk: bool = True, match_lots: bool = True
+) -> UpsertResult:
+    """Insert trades if they do not already exist.
+
+    The bulk path resolves symbols and inserts trades with set-based statements
+    relying on the ``uq_trade_natural_key`` constraint; ``bulk=False`` keeps the
+    original per-row lookup loop. Cached account KPIs overlapping the new trades
+    are invalidated, and lot matching is brought up to date, in the same
+    transaction. Callers writing many pages pass ``match_lots=False`` and call
+    ``finish_import`` once, so out-of-order pages do not each force a replay.
+    """
+
+    if not len(trades):
+        return UpsertResult()
+    if isinstance(trades, TradeBatch):
+        account_ids = {trades.account_id}
+    else:
+        account_ids = {trade.account_id for trade in trades}
+    if bulk:
+        result = _upsert_trades_bulk(db, trades)
+    else:
+        if isinstance(trades, TradeBatch):
+            trades = trades.to_dtos()
+        result = _upsert_trades_rowwise(db, trades)
+    if result.imported:
+        db.flush()
+        invalidate_account_kpis(db, account_ids, result)
+        if match_lots:
+            match_account_lots(db, account_ids)
+    db.commit()
+    return result
+
+
+def finish_import(db: Session, account_id: int, result: UpsertResult) -> None:
+    """Match lots and rebuild the equity curve once after a multi-page import."""
+
+    if result.imported:
+        match_account_lots(db, [account_id])
+        db.commit()
+    if result.earliest_trade_ts is not None:
+        rebuild_equity_curve(db, account_id, since=result.earliest_trade_ts.date())
+
+
+def invalidate_account_kpis(db: Session, account_ids: Iterable[int], result: UpsertResult) -> int:
+    """Drop cached account KPIs whose period overlaps newly imported trades."""
+
+    return invalidate_kpis(
+        db, ACCOUNT_KPI_SCOPES, account_ids, result.earliest_trade_ts, result.latest_trade_ts
+    )
+
+
+_STAGING_COLUMNS = "symbol, side, qty, price, trade_ts, order_id, fee, tax, venue, raw_json"
+
+
+def _stage_batch(cursor, batch: TradeBatch) -> int:
+    """COPY one columnar batch into the ``trade_staging`` temp table."""
+
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    for symbol, side, qty, price, trade_ts, order_id, fee, tax, venue, raw in batch.records():
+        writer.writerow(
+            (
+                symbol,
+                side,
+                qty,
+                price,
+                trade_ts.isoformat(),
+                order_id,
+                fee,
+                tax,
+                venue,
+                json.dumps(raw) if raw is not None else None,
+            )
+        )
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY trade_staging ({_STAGING_COLUMNS}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return len(batch)
+
+
+def copy_import_trades(db: Session, account_id: int, batches: Iterable[TradeBatch]) -> UpsertResult:
+    """Bulk-load historical trades through PostgreSQL ``COPY``.
+
+    Batches are streamed into a transaction-scoped staging table, then symbols are
+    created and trades merged into ``trades`` with set-based statements that skip
+    duplicates within the load and against existing rows. The equity curve is
+    rebuilt once at the end from the earliest imported day and the monthly KPIs
+    dropped by the invalidation are rolled up again.
+    """
+
+    db.execute(
+        text(
+            """
+            CREATE TEMP TABLE trade_staging (
+                symbol varchar(64) NOT NULL,
+                side varchar(4) NOT NULL,
+                qty numeric(18, 4) NOT NULL,
+                price numeric(18, 4) NOT NULL,
+                trade_ts timestamptz NOT NULL,
+                order_id varchar(128),
+                fee numeric(18, 4),
+                tax numeric(18, 4),
+                venue varchar(64),
+                raw_json json
+            ) ON COMMIT DROP
+            """
+        )
+    )
+    staged = 0
+    with db.connection().connection.cursor() as cursor:
+        for batch in batches:
+            if batch.account_id != account_id:
+                raise ValueError("Batch belongs to a different account")
+            staged += _stage_batch(cursor, batch)
+    db.execute(
+        text(
+            """
+            INSERT INTO symbols (ticker, exchange, asset_class, lot_size)
+            SELECT DISTINCT s.symbol, 'TWSE', CAST('stock' AS asset_class_enum), 1000
+            FROM trade_staging AS s
+            WHERE NOT EXISTS (SELECT 1 FROM symbols AS y WHERE y.ticker = s.symbol)
+            ON CONFLICT ON CONSTRAINT uq_symbol DO NOTHING
+            """
+        )
+    )
+    imported, earliest, latest = db.execute(
+        text(
+            """
+            WITH merged AS (
+                INSERT INTO trades (
+                    account_id, symbol_id, side, qty, price, trade_ts, order_id, fee, tax, venue, raw_json
+                )
+                SELECT DISTINCT ON (s.order_id, s.trade_ts, s.price, s.qty)
+                    :account_id, sym.id, CAST(s.side AS trade_side_enum), s.qty, s.price,
+                    s.trade_ts, s.order_id, COALESCE(s.fee, 0), COALESCE(s.tax, 0), s.venue, s.raw_json
+                FROM trade_staging AS s
+                CROSS JOIN LATERAL (
+                    SELECT y.id FROM symbols AS y WHERE y.ticker = s.symbol ORDER BY y.id LIMIT 1
+                ) AS sym
+                ON CONFLICT ON CONSTRAINT uq_trade_natural_key DO NOTHING
+                RETURNING trade_ts
+            )
+            SELECT count(*), min(trade_ts), max(trade_ts) FROM merged
+            """
+        ),
+        {"account_id": account_id},
+    ).one()
+    result = UpsertResult(
+        imported=imported, duplicates=staged - imported, earliest_trade_ts=earliest, latest_trade_ts=latest
+    )
+    if imported:
+        invalidate_account_kpis(db, [account_id], result)
+        match_account_lots(db, [account_id])
     db.commit()
-    return imported
+    if earliest is not None:
+        rebuild_equity_curve(db, account_id, since=earliest.date())
+        rollup_monthly_kpis(db, account_ids=[account_id])
+    return result
 
 
-def equity_curve(trades: Iterable[Trade]) -> pd.Series:
+def equity_curve(trades: Iterable[Trade] | TradeColumns) -> pd.Series:
     """Return equity curve cumulative net PnL per day."""
 
-    rows: list[tuple[date, float]] = []
-    for trade in trades:
-        pnl = float(trade.price) * float(trade.qty)
-        pnl = pnl if trade.side == "SELL" else -pnl
-        pnl -= float(trade.fee or 0) + float(trade.tax or 0)
-        rows.append((trade.trade_ts.date(), pnl))
-    if not rows:
+    columns = trades if isinstance(trades, TradeColumns) else TradeColumns.from_trades(trades)
+    if not len(columns):
         return pd.Series(dtype=float)
-    df = pd.DataFrame(rows, columns=["date", "pnl"])
-    daily = df.groupby("date")["pnl"].sum().cumsum()
-    daily.index = pd.to_datetime(daily.index)
-    return daily
+    days, equity = daily_equity(columns.trade_day, columns.net_pnl())
+    return pd.Series(equity, index=pd.DatetimeIndex(days.astype("datetime64[ns]"), name="date"), name="pnl")
 
 
 def max_drawdown(series: pd.Series) -> tuple[float, date | None, date | None]:
@@ -115,57 +468,99 @@ def max_drawdown(series: pd.Series) -> tuple[float, date | None, date | None]:
     return float(mdd), peak_date, trough_date
 
 
-def profit_factor(win_sum: float, loss_sum: float) -> float | None:
-    """Compute profit factor safely."""
+def compute_kpis(trades: Sequence[Trade] | TradeColumns) -> dict[str, float | None]:
+    """Compute KPI metrics for a set of trades."""
 
-    if loss_sum >= 0:
-        return None
-    if win_sum == 0:
-        return 0.0
-    return win_sum / abs(loss_sum)
+    columns = trades if isinstance(trades, TradeColumns) else TradeColumns.from_trades(trades)
+    return compute_trade_kpis(columns)
 
 
-def compute_kpis(trades: Sequence[Trade]) -> dict[str, float | None]:
-    """Compute KPI metrics for a set of trades."""
+def compute_account_kpis(
+    db: Session,
+    account_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    engine: Literal["numpy", "sql"] | None = None,
+) -> dict[str, float | None]:
+    """Compute KPIs for an account window, defaulting to ``settings.analytics.kpi_engine``.
+
+    ``numpy`` loads the trade columns and aggregates in-process; ``sql`` aggregates
+    in the database and only fetches the daily equity series.
+    """
+
+    engine = engine or settings.analytics.kpi_engine
+    if engine == "sql":
+        return compute_kpis_sql(db, account_id, start, end)
+    return compute_kpis(load_trade_columns(db, account_id, start, end))
+
 
-    if not trades:
-        return {
-            "win_rate": None,
-            "avg_win": None,
-            "avg_loss": None,
-            "profit_factor": None,
-            "expectancy": None,
-            "mdd": None,
-            "total_trades": 0,
-        }
-    wins: list[float] = []
-    losses: list[float] = []
-    total_net = 0.0
-    for trade in trades:
-        pnl = float(trade.price) * float(trade.qty)
-        pnl = pnl if trade.side == "SELL" else -pnl
-        pnl -= float(trade.fee or 0) + float(trade.tax or 0)
-        total_net += pnl
-        if pnl > 0:
-            wins.append(pnl)
-        else:
-            losses.append(pnl)
-    win_rate = len(wins) / len(trades) if trades else None
-    avg_win = sum(wins) / len(wins) if wins else None
-    avg_loss = sum(losses) / len(losses) if losses else None
-    pf = profit_factor(sum(wins), sum(losses) if losses else 0)
-    expectancy = total_net / len(trades)
-    equity = equity_curve(trades)
-    mdd, _, _ = max_drawdown(equity)
-    return {
-        "win_rate": win_rate,
-        "avg_win": avg_win,
-        "avg_loss": avg_loss,
-        "profit_factor": pf,
-        "expectancy": expectancy,
-        "mdd": mdd,
-        "total_trades": len(trades),
-    }
+def get_account_kpis(
+    db: Session,
+    account_id: int,
+    start: datetime,
+    end: datetime,
+    engine: Literal["numpy", "sql"] | None = None,
+) -> dict[str, float | None]:
+    """Return account KPIs for ``[start, end]`` through the ``kpis`` table cache.
+
+    Both engines compute the same metrics (``test_kpi_sql`` checks they agree), so
+    a cached row serves either; ``engine`` only chooses how a miss is computed.
+    """
+
+    return cached_kpis(
+        db,
+        "account",
+        account_id,
+        start,
+        end,
+        lambda: compute_account_kpis(db, account_id, start, end, engine),
+        version=select(Account.equity_version).where(Account.id == account_id),
+    )
+
+
+def get_strategy_kpis(
+    db: Session,
+    strategy_id: int,
+    start: datetime,
+    end: datetime,
+) -> dict[str, float | None]:
+    """Return KPIs of the trades tagged with a strategy, through the ``kpis`` table cache."""
+
+    def compute() -> dict[str, float | None]:
+        _, columns = load_keyed_trade_columns(
+            db,
+            TradeTag.strategy_id,
+            TradeTag.strategy_id == strategy_id,
+            *trade_window(None, start, end),
+            join_tag=True,
+        )
+        return compute_trade_kpis(columns)
+
+    return cached_kpis(db, "strategy", strategy_id, start, end, compute)
+
+
+def strategy_kpi_table(
+    db: Session,
+    strategy_ids: Sequence[int],
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> dict[int, dict[str, float | None]]:
+    """Compute KPIs for many strategies from one trade/tag load and a grouped pass.
+
+    Strategies without tagged trades in the window get empty KPIs.
+    """
+
+    if not strategy_ids:
+        return {}
+    keys, columns = load_keyed_trade_columns(
+        db,
+        TradeTag.strategy_id,
+        TradeTag.strategy_id.in_(strategy_ids),
+        *trade_window(None, start, end),
+        join_tag=True,
+    )
+    table = dict(kpi_records(grouped_trade_kpis(columns, {"strategy_id": keys})))
+    return {strategy_id: table.get(strategy_id, dict(EMPTY_KPIS)) for strategy_id in strategy_ids}
 
 
 def upsert_kpi(
@@ -174,39 +569,11 @@ def upsert_kpi(
     scope_ref_id: int,
     period_start: datetime,
     period_end: datetime,
-    trades: Sequence[Trade],
+    trades: Sequence[Trade] | TradeColumns,
 ) -> KPI:
     """Upsert KPI entries for a given scope and period."""
 
-    metrics = compute_kpis(trades)
-    stmt = insert(KPI).values(
-        scope=scope,
-        scope_ref_id=scope_ref_id,
-        period_start=period_start,
-        period_end=period_end,
-        win_rate=metrics["win_rate"],
-        avg_win=metrics["avg_win"],
-        avg_loss=metrics["avg_loss"],
-        profit_factor=metrics["profit_factor"],
-        expectancy=metrics["expectancy"],
-        mdd=metrics["mdd"],
-        total_trades=metrics["total_trades"],
-    )
-    stmt = stmt.on_conflict_do_update(
-        index_elements=[KPI.scope, KPI.scope_ref_id, KPI.period_start, KPI.period_end],
-        set_=dict(
-            win_rate=stmt.excluded.win_rate,
-            avg_win=stmt.excluded.avg_win,
-            avg_loss=stmt.excluded.avg_loss,
-            profit_factor=stmt.excluded.profit_factor,
-            expectancy=stmt.excluded.expectancy,
-            mdd=stmt.excluded.mdd,
-            total_trades=stmt.excluded.total_trades,
-            updated_at=func.now(),
-        ),
-    )
-    db.execute(stmt)
-    db.commit()
+    store_kpis(db, scope, scope_ref_id, period_start, period_end, compute_kpis(trades))
     kpi = db.scalar(
         select(KPI).where(
             KPI.scope == scope,
@@ -219,31 +586,97 @@ def upsert_kpi(
     return kpi
 
 
+def _write_equity_rows(db: Session, account_id: int, series: pd.Series, seed: float = 0.0) -> None:
+    """Upsert equity points in one batched statement.
+
+    ``seed`` is the equity carried in from before the series and is used for the
+    first day's net PnL.
+    """
+
+    if series.empty:
+        return
+    equity = series.to_numpy(dtype=float)
+    net_pnl = np.diff(equity, prepend=seed)
+    rows = [
+        dict(account_id=account_id, date=curve_date, equity=value, net_pnl_day=pnl)
+        for curve_date, value, pnl in zip(series.index.date, equity.tolist(), net_pnl.tolist())
+    ]
+    stmt = insert(EquityDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EquityDaily.account_id, EquityDaily.date],
+        set_=dict(equity=stmt.excluded.equity, net_pnl_day=stmt.excluded.net_pnl_day),
+    ).execution_options(insertmanyvalues_page_size=BULK_INSERT_CHUNK_SIZE)
+    db.execute(stmt, rows)
+
+
+def _bump_equity_version(db: Session, account_id: int) -> int:
+    """Mark the account's stored equity as changed; returns the new version."""
+
+    return db.scalar(
+        update(Account)
+        .where(Account.id == account_id)
+        .values(equity_version=Account.equity_version + 1)
+        .returning(Account.equity_version)
+    )
+
+
 def record_equity_curve(db: Session, account: Account, trades: Sequence[Trade]) -> None:
     """Persist daily equity curve values."""
 
     series = equity_curve(trades)
-    for curve_date, equity in series.items():
-        stmt = insert(EquityDaily).values(
-            account_id=account.id,
-            date=curve_date.date(),
-            equity=float(equity),
-            net_pnl_day=float(series.diff().fillna(series).loc[curve_date]),
-        )
-        stmt = stmt.on_conflict_do_update(
-            index_elements=[EquityDaily.account_id, EquityDaily.date],
-            set_=dict(equity=stmt.excluded.equity, net_pnl_day=stmt.excluded.net_pnl_day),
+    if series.empty:
+        db.commit()
+        return
+    _write_equity_rows(db, account.id, series)
+    version = _bump_equity_version(db, account.id)
+    db.commit()
+    apply_equity_write(account.id, version, series.index[0].date(), list(series.index.date), series.tolist())
+
+
+def rebuild_equity_curve(db: Session, account_id: int, since: date | None = None) -> None:
+    """Recompute stored equity from ``since`` onwards, seeded by the prior stored day.
+
+    Only the PnL columns of trades on or after ``since`` are loaded, so the cost
+    follows the amount of new data rather than the length of the account history.
+    ``since=None`` rebuilds the whole curve. Bumps ``Account.equity_version`` and
+    drops cached account KPIs from ``since`` on in the same transaction.
+    """
+
+    seed = 0.0
+    start = None
+    stale = delete(EquityDaily).where(EquityDaily.account_id == account_id)
+    if since is not None:
+        prior = db.scalar(
+            select(EquityDaily.equity)
+            .where(EquityDaily.account_id == account_id, EquityDaily.date < since)
+            .order_by(EquityDaily.date.desc())
+            .limit(1)
         )
-        db.execute(stmt)
+        seed = float(prior) if prior is not None else 0.0
+        start = datetime.combine(since, time.min)
+        stale = stale.where(EquityDaily.date >= since)
+    # The column loader reads on the Core connection, which does not autoflush.
+    db.flush()
+    series = equity_curve(load_trade_columns(db, account_id, start=start)) + seed
+    db.execute(stale)
+    _write_equity_rows(db, account_id, series, seed)
+    version = _bump_equity_version(db, account_id)
+    # After the bump: a KPI row stored since the import's own invalidation is dropped here,
+    # and readers that have not stored yet see the new version and skip storing.
+    invalidate_kpis(db, ["account"], [account_id], earliest=start)
     db.commit()
+    apply_equity_write(account_id, version, since, list(series.index.date), series.tolist())
 
 
 def assign_strategy(db: Session, trade_id: int, strategy_id: int) -> None:
-    """Assign a strategy tag to a trade."""
+    """Assign a strategy tag to a trade and refresh the strategy's monthly KPIs."""
 
     strategy = db.get(Strategy, strategy_id)
     trade = db.get(Trade, trade_id)
     if not strategy or not trade:
         raise ValueError("Invalid trade or strategy")
     db.merge(TradeTag(trade_id=trade_id, strategy_id=strategy_id))
-    db.commit()
+    db.flush()
+    invalidate_kpis(db, STRATEGY_KPI_SCOPES, [strategy_id], trade.trade_ts, trade.trade_ts)
+    # Nothing else recomputes the dropped strategy_month row; the rollup commits the tag with it.
+    rollup_monthly_kpis(db, account_ids=[], strategy_ids=[strategy_id])
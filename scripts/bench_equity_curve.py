@@ -0,0 +1,70 @@
+"""Benchmark writing equity curves of growing length against the configured database."""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.session import session_scope
+from app.models.models import Account, EquityDaily, User
+from app.services.trades import _write_equity_rows
+
+
+def write_per_day(session, account_id: int, series: pd.Series) -> None:
+    """Previous implementation: one upsert per day, recomputing the diff each time."""
+
+    for curve_date, equity in series.items():
+        stmt = insert(EquityDaily).values(
+            account_id=account_id,
+            date=curve_date.date(),
+            equity=float(equity),
+            net_pnl_day=float(series.diff().fillna(series).loc[curve_date]),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EquityDaily.account_id, EquityDaily.date],
+            set_=dict(equity=stmt.excluded.equity, net_pnl_day=stmt.excluded.net_pnl_day),
+        )
+        session.execute(stmt)
+
+
+def run(sizes: list[int], per_day_max: int) -> None:
+    rng = np.random.default_rng(0)
+    with session_scope() as session:
+        user = User(email=f"bench-equity-{time.time_ns()}@example.com", password_hash="x")
+        session.add(user)
+        session.flush()
+        account = Account(user_id=user.id, account_code="BENCH-EQUITY", currency="TWD")
+        session.add(account)
+        session.flush()
+        try:
+            for days in sizes:
+                index = pd.date_range("1750-01-01", periods=days, freq="D")
+                series = pd.Series(rng.normal(0, 100, days).cumsum(), index=index)
+                writers = [("batched", _write_equity_rows)]
+                if days <= per_day_max:
+                    writers.insert(0, ("per-day", write_per_day))
+                for label, writer in writers:
+                    session.execute(delete(EquityDaily).where(EquityDaily.account_id == account.id))
+                    started = time.perf_counter()
+                    writer(session, account.id, series)
+                    session.flush()
+                    print(f"{label:>8} days={days:>6} seconds={time.perf_counter() - started:.2f}")
+        finally:
+            session.execute(delete(User).where(User.id == user.id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument(
+        "--per-day-max",
+        type=int,
+        default=10_000,
+        help="largest size to run the quadratic per-day writer for",
+    )
+    args = parser.parse_args()
+    run(args.sizes, args.per_day_max)
@@ -0,0 +1,63 @@
+"""Benchmark the row-wise and bulk trade upsert paths against the configured database."""
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import random
+import time
+
+from sqlalchemy import delete
+
+from app.db.session import session_scope
+from app.models.models import Account, User
+from app.services.trades import TradeDTO, upsert_trades
+
+
+def make_trades(account_id: int, count: int) -> list[TradeDTO]:
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    tickers = [f"BENCH{n:02d}" for n in range(20)]
+    return [
+        TradeDTO(
+            account_id=account_id,
+            symbol=random.choice(tickers),
+            side=random.choice(["BUY", "SELL"]),
+            qty=random.randint(1, 10),
+            price=round(random.uniform(50, 150), 2),
+            trade_ts=start + timedelta(minutes=n),
+            order_id=f"BENCH-{n}",
+            fee=1,
+            tax=0,
+        )
+        for n in range(count)
+    ]
+
+
+def run(count: int, bulk: bool) -> None:
+    label = "bulk" if bulk else "row"
+    with session_scope() as session:
+        user = User(email=f"bench-{label}-{time.time_ns()}@example.com", password_hash="x")
+        session.add(user)
+        session.flush()
+        account = Account(user_id=user.id, account_code=f"BENCH-{label}", currency="TWD")
+        session.add(account)
+        session.flush()
+        trades = make_trades(account.id, count)
+        try:
+            for attempt in ("insert", "dedupe"):
+                started = time.perf_counter()
+                result = upsert_trades(session, trades, bulk=bulk)
+                elapsed = time.perf_counter() - started
+                print(
+                    f"{label:>4} {attempt:<6} rows={count} imported={result.imported} "
+                    f"duplicates={result.duplicates} seconds={elapsed:.2f}"
+                )
+        finally:
+            session.execute(delete(User).where(User.id == user.id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+    run(args.rows, bulk=False)
+    run(args.rows, bulk=True)
@@ -0,0 +1,45 @@
+"""Bulk-import a historical CSV statement into one account using PostgreSQL COPY."""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Iterator
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.ingestors.email_csv_ingestor import CSVBatch, DIALECTS, iter_csv_batches
+from app.models.models import Account
+from app.services.trades import TradeBatch, copy_import_trades
+
+
+def accepted(batches: Iterator[CSVBatch], rejected: list[int]) -> Iterator[TradeBatch]:
+    """Yield parsed trades while tallying rejected rows."""
+
+    for batch in batches:
+        rejected[0] += batch.ignored_rows
+        yield batch.trades
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="CSV statement to import")
+    parser.add_argument("--account-id", type=int, required=True)
+    parser.add_argument("--dialect", choices=sorted(DIALECTS), default="generic_tw")
+    parser.add_argument("--batch-size", type=int, default=settings.ingest.csv_batch_size)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rejected = [0]
+    with SessionLocal() as session, open(args.path, encoding="utf-8", newline="") as stream:
+        if session.get(Account, args.account_id) is None:
+            parser.error(f"account {args.account_id} does not exist")
+        batches = iter_csv_batches(args.account_id, stream, args.batch_size, args.dialect)
+        result = copy_import_trades(session, args.account_id, accepted(batches, rejected))
+    print(
+        f"imported={result.imported} duplicates={result.duplicates} rejected={rejected[0]} "
+        f"seconds={time.perf_counter() - started:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
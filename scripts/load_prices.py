@@ -0,0 +1,31 @@
+"""Bulk-load OHLCV bars from CSV files into the local price store."""
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.core.settings import settings
+from app.services.price_store import PriceStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="+", help="CSV files with symbol, date, open, high, low, close[, volume]")
+    parser.add_argument("--timeframe", default="1d", choices=settings.prices.timeframes, help="bar size")
+    parser.add_argument("--root", default=settings.prices.root, help="price store directory")
+    args = parser.parse_args()
+
+    store = PriceStore(args.root)
+    started = time.perf_counter()
+    appended: dict[str, int] = {}
+    for path in args.paths:
+        for symbol, count in store.load_csv(path, args.timeframe).items():
+            appended[symbol] = appended.get(symbol, 0) + count
+    print(
+        f"symbols={len(appended)} bars={sum(appended.values())} "
+        f"seconds={time.perf_counter() - started:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
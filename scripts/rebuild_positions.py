@@ -0,0 +1,37 @@
+"""Rebuild open lots, closed trades and positions from the trade history."""
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import select
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.models.models import Account, Position
+from app.services.lots import rebuild_lots
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--account-id", type=int, action="append", help="account to rebuild (default: all)")
+    parser.add_argument("--method", choices=["fifo", "lifo", "average"], default=settings.lots.method)
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        account_ids = args.account_id or session.scalars(select(Account.id).order_by(Account.id)).all()
+        for account_id in account_ids:
+            if session.get(Account, account_id) is None:
+                parser.error(f"account {account_id} does not exist")
+            started = time.perf_counter()
+            closed = rebuild_lots(session, account_id, args.method)
+            session.commit()
+            positions = len(session.scalars(select(Position.id).where(Position.account_id == account_id)).all())
+            print(
+                f"account={account_id} closed={closed} positions={positions} "
+                f"seconds={time.perf_counter() - started:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Shared fixtures for the backend tests."""
+from __future__ import annotations
+
+from typing import Iterator
+
+import pytest
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture()
+def tables() -> tuple:
+    """Models whose tables the in-memory database needs; override per module."""
+
+    return ()
+
+
+@pytest.fixture()
+def engine(tables: tuple) -> Iterator[Engine]:
+    """In-memory SQLite with only the requested tables.
+
+    A single shared connection keeps the database visible to every session and
+    thread. BIGINT keys do not autoincrement on SQLite, so seed rows need ids.
+    """
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for model in tables:
+        model.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def db(engine: Engine) -> Iterator[Session]:
+    with Session(engine) as session:
+        yield session
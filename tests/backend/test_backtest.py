@@ -0,0 +1,127 @@
+"""Tests for the rules backtester."""
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.backtest import StrategyRules
+from app.services.backtest import backtest_symbol, indicator, next_true, run_backtest
+from app.services.kpi_engine import TradeColumns, compute_trade_kpis
+from app.services.price_store import Bars, bars_from_frame
+
+
+def make_bars(close, open_=None, high=None, low=None, symbol: str = "X") -> Bars:
+    close = np.asarray(close, dtype=float)
+    open_ = close if open_ is None else np.asarray(open_, dtype=float)
+    return Bars(
+        symbol=symbol,
+        ts=np.datetime64("2024-01-01") + np.arange(len(close)),
+        open=open_,
+        high=np.maximum(open_, close) if high is None else np.asarray(high, dtype=float),
+        low=np.minimum(open_, close) if low is None else np.asarray(low, dtype=float),
+        close=close,
+        volume=np.zeros(len(close)),
+    )
+
+
+def rules(**values) -> StrategyRules:
+    return StrategyRules.model_validate(values)
+
+
+def test_next_true() -> None:
+    mask = np.array([False, True, False, False, True, False])
+    assert next_true(mask).tolist() == [1, 1, 4, 4, 4, 6]
+
+
+def test_indicators_match_pandas() -> None:
+    close = pd.Series(100 + np.cumsum(np.random.default_rng(3).normal(0, 1, 300)))
+    bars = make_bars(close)
+    sma = close.rolling(20).mean()
+    np.testing.assert_allclose(indicator(bars, "sma_ratio", 20), close / sma - 1)
+    np.testing.assert_allclose(indicator(bars, "zscore", 20), (close - sma) / close.rolling(20).std(ddof=0))
+    np.testing.assert_allclose(indicator(bars, "momentum", 5), close / close.shift(5) - 1)
+    change = close.diff()
+    gain, loss = change.clip(lower=0).rolling(14).mean(), (-change).clip(lower=0).rolling(14).mean()
+    np.testing.assert_allclose(indicator(bars, "rsi", 14), 100 - 100 / (1 + gain / loss))
+
+
+def test_signal_exit_fills_at_next_open_with_sell_tax() -> None:
+    bars = make_bars([10, 8, 9, 11, 12, 13], open_=[10, 9, 8.5, 10, 11.5, 12.5])
+    strategy = rules(
+        entry={"indicator": "close", "below": 9},
+        exit={"indicator": "close", "above": 10.5},
+        sizing={"notional": 100, "lot_size": 5},
+        fee_rate=0.01,
+        tax_rate=0.1,
+    )
+    fills = backtest_symbol(bars, strategy)
+    assert [(side, qty, price, reason) for side, qty, price, _, _, _, reason in fills] == [
+        ("BUY", 10.0, 8.5, "entry"),
+        ("SELL", 10.0, 11.5, "signal"),
+    ]
+    assert fills[0][3:5] == pytest.approx((0.85, 0.0))
+    assert fills[1][3:5] == pytest.approx((1.15, 11.5))
+    assert fills[1][5] == date(2024, 1, 5)
+
+
+def test_stops_targets_time_and_end_exits() -> None:
+    entry = {"indicator": "close", "below": 10}
+    # Entry at 10 on bar 1; bar 3 gaps below the 5% stop and fills at its open.
+    bars = make_bars([9, 10, 9.8, 9.0, 9.0], open_=[9, 10, 9.9, 9.2, 9.0], low=[9, 10, 9.7, 9.0, 9.0])
+    fills = backtest_symbol(bars, rules(entry=entry, stop_loss=0.05))
+    assert [(fill[2], fill[6]) for fill in fills] == [(10.0, "entry"), (9.2, "stop_loss"), (9.0, "entry"), (9.0, "end")]
+
+    bars = make_bars([9, 10, 10.5, 11.5, 12], open_=[9, 10, 10.4, 10.6, 11.8], high=[9, 10, 10.6, 11.6, 12])
+    fills = backtest_symbol(bars, rules(entry=entry, take_profit=0.1))
+    assert [(fill[2], fill[6]) for fill in fills] == [(10.0, "entry"), (11.0, "take_profit")]
+
+    fills = backtest_symbol(bars, rules(entry=entry, max_holding_bars=2))
+    assert [(fill[2], fill[6]) for fill in fills] == [(10.0, "entry"), (10.6, "time")]
+
+
+def test_short_side_stop() -> None:
+    bars = make_bars([11, 10, 10.2, 10.4, 10.4], open_=[11, 10, 10.2, 10.3, 10.4], high=[11, 10, 10.3, 10.7, 10.4])
+    fills = backtest_symbol(bars, rules(side="short", entry={"indicator": "close", "above": 10.5}, stop_loss=0.05))
+    assert [(fill[0], fill[2], fill[6]) for fill in fills] == [("SELL", 10.0, "entry"), ("BUY", 10.5, "stop_loss")]
+
+
+def test_fills_feed_the_kpi_engine() -> None:
+    rng = np.random.default_rng(5)
+    frame = pd.concat(
+        pd.DataFrame(
+            {
+                "symbol": symbol,
+                "date": pd.bdate_range("2020-01-01", periods=500),
+                "open": close,
+                "high": close * 1.01,
+                "low": close * 0.99,
+                "close": close,
+            }
+        )
+        for symbol, close in (("A", 50 + np.cumsum(rng.normal(0, 1, 500))), ("B", 80 + np.cumsum(rng.normal(0, 1, 500))))
+    )
+    strategy = rules(
+        entry={"indicator": "zscore", "window": 10, "below": -1},
+        exit={"indicator": "zscore", "window": 10, "above": 0},
+        stop_loss=0.03,
+    )
+    result = run_backtest(bars_from_frame(frame.sample(frac=1, random_state=1)), strategy)
+    assert result.bars == {"A": 500, "B": 500}
+    rows = backtest_symbol(bars_from_frame(frame)[0], strategy) + backtest_symbol(bars_from_frame(frame)[1], strategy)
+    assert result.kpis() == compute_trade_kpis(TradeColumns.from_rows(row[:6] for row in rows))
+    per_symbol = result.symbol_kpis()
+    assert per_symbol["A"]["total_trades"] + per_symbol["B"]["total_trades"] == len(rows)
+
+
+def test_rules_validation() -> None:
+    assert len(rules(entry={"indicator": "rsi", "below": 30}).entry) == 1
+    with pytest.raises(ValidationError):
+        rules(entry={"indicator": "rsi"})
+    with pytest.raises(ValidationError):
+        rules(entry={"indicator": "rsi", "below": 30}, sizing={"qty": 1, "notional": 100})
+    with pytest.raises(ValidationError):
+        rules()
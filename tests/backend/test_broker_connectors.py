@@ -0,0 +1,25 @@
+"""Tests for the paged broker connector contract."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from app.ingestors import ibkr_ingestor
+
+ACCOUNT = SimpleNamespace(id=1)
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 1, 10, tzinfo=timezone.utc)
+
+
+def test_iter_trades_pages_cover_window() -> None:
+    pages = list(ibkr_ingestor.iter_trades(ACCOUNT, START, END, page_size=4))
+    assert [len(page.trades) for page in pages] == [4, 4, 2]
+    assert pages[-1].cursor is None
+    assert ibkr_ingestor.fetch_trades(ACCOUNT, START, END) == [t for page in pages for t in page.trades]
+
+
+def test_iter_trades_resumes_from_cursor() -> None:
+    first = next(ibkr_ingestor.iter_trades(ACCOUNT, START, END, page_size=4))
+    resumed = list(ibkr_ingestor.iter_trades(ACCOUNT, START, END, cursor=first.cursor, page_size=4))
+    fetched = first.trades + [trade for page in resumed for trade in page.trades]
+    assert [trade.trade_ts.day for trade in fetched] == list(range(1, 11))
@@ -0,0 +1,80 @@
+"""Tests for CSV statement parsing."""
+from __future__ import annotations
+
+from datetime import datetime
+from io import StringIO
+
+from app.ingestors.email_csv_ingestor import iter_csv_batches, parse_generic_tw_csv
+
+HEADER = "date,symbol,side,qty,price,fee,tax,order_id\n"
+
+
+def test_iter_csv_batches_bounds_batch_size() -> None:
+    body = "".join(f"2024-01-{day:02d},2330.TW,buy,1,600,5,2,SJ-{day}\n" for day in range(1, 8))
+    batches = list(iter_csv_batches(1, StringIO(HEADER + body), batch_size=3))
+    assert [len(batch.trades) for batch in batches] == [3, 3, 1]
+    assert batches[0].trades.side[0] == "BUY"
+
+
+def test_iter_csv_batches_counts_ignored_rows() -> None:
+    body = "2024-01-02,2330.TW,SELL,1,600,5,2,SJ-1\nnot-a-date,2330.TW,SELL,1,600,5,2,SJ-2\n"
+    batches = list(iter_csv_batches(1, StringIO(HEADER + body), batch_size=10))
+    assert len(batches) == 1
+    assert len(batches[0].trades) == 1
+    assert batches[0].ignored_rows == 1
+
+
+def test_iter_csv_batches_reports_rejection_reasons() -> None:
+    body = (
+        "2024-01-02,2330.TW,SELL,1,600,5,2,SJ-1\n"
+        "2024-01-02,2330.TW,HOLD,1,600,5,2,SJ-2\n"
+        "2024-01-02,2330.TW,BUY,abc,600,5,2,SJ-3\n"
+        "2024-01-02,2330.TW,BUY,1,600,,,\n"
+    )
+    (batch,) = iter_csv_batches(1, StringIO(HEADER + body), batch_size=10)
+    assert [(row.row, row.reason) for row in batch.rejected] == [(2, "invalid side"), (3, "invalid qty")]
+    assert batch.trades.fee.tolist() == [5.0, 0.0]
+    assert batch.trades.order_id.tolist() == ["SJ-1", None]
+
+
+def test_iter_csv_batches_missing_column_rejects_all_rows() -> None:
+    content = "date,symbol,side,qty\n2024-01-02,2330.TW,SELL,1\n"
+    (batch,) = iter_csv_batches(1, StringIO(content), batch_size=10)
+    assert len(batch.trades) == 0
+    assert batch.rejected[0].reason == "missing column: price"
+
+
+def test_iter_csv_batches_accepts_trailing_delimiters() -> None:
+    body = "2024-01-02,2330.TW,SELL,1,600,5,2,SJ-1,\n2024-01-03,2330.TW,BUY,2,601,5,2,SJ-2,\n"
+    (batch,) = iter_csv_batches(1, StringIO(HEADER.replace("\n", ",\n") + body), batch_size=10)
+    assert batch.rejected == []
+    assert batch.trades.qty.tolist() == [1.0, 2.0]
+    assert batch.trades.order_id.tolist() == ["SJ-1", "SJ-2"]
+
+
+def test_iter_csv_batches_rejects_over_long_rows() -> None:
+    body = (
+        "2024-01-02,2330.TW,SELL,1,600,5,2,SJ-1\n"
+        "2024-01-02,2330.TW,SELL,1,600,5,2,SJ-2,extra\n"
+        "2024-01-02,2330.TW,HOLD,1,600,5,2,SJ-3\n"
+        "2024-01-02,2330.TW,BUY,1,600,5,2,SJ-4,,\n"
+        "2024-01-02,2330.TW,BUY,1,600,5,2,SJ-5,x,\n"
+    )
+    batches = list(iter_csv_batches(1, StringIO(HEADER + body), batch_size=3))
+    rejected = [(row.row, row.reason) for batch in batches for row in batch.rejected]
+    assert rejected == [(2, "too many fields"), (3, "invalid side"), (5, "too many fields")]
+    assert sum(batch.ignored_rows for batch in batches) == 3
+    assert [order for batch in batches for order in batch.trades.order_id.tolist()] == ["SJ-1", "SJ-4"]
+
+
+def test_iter_csv_batches_empty_stream() -> None:
+    assert list(iter_csv_batches(1, StringIO(""), batch_size=10)) == []
+
+
+def test_parse_generic_tw_csv_matches_sample() -> None:
+    trades = parse_generic_tw_csv(7, HEADER + "2024-01-02,2330.TW,sell,2,600.5,5,2,SJ-1\n")
+    assert len(trades) == 1
+    trade = trades[0]
+    assert (trade.account_id, trade.symbol, trade.side, trade.qty, trade.price) == (7, "2330.TW", "SELL", 2.0, 600.5)
+    assert trade.trade_ts == datetime(2024, 1, 2)
+    assert trade.raw["order_id"] == "SJ-1"
@@ -0,0 +1,135 @@
+"""Tests for the equity drawdown segment tree."""
+from __future__ import annotations
+
+import random
+from collections import OrderedDict
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.models import Account, EquityDaily
+from app.services import drawdown_index
+from app.services.drawdown_index import DrawdownIndex
+from app.services.trades import max_drawdown
+
+
+def random_curve(seed: int, days: int) -> tuple[list[date], list[float]]:
+    rng = random.Random(seed)
+    dates = [date(2020, 1, 1) + timedelta(days=offset) for offset in range(days)]
+    values = pd.Series([round(rng.gauss(0, 100), 4) for _ in range(days)]).cumsum().round(4).tolist()
+    return dates, values
+
+
+def expected(dates: list[date], values: list[float], lo: int, hi: int) -> tuple[float, date, date]:
+    return max_drawdown(pd.Series(values[lo:hi], index=pd.to_datetime(dates[lo:hi])))
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_range_queries_match_max_drawdown(seed: int) -> None:
+    dates, values = random_curve(seed, 700)
+    index = DrawdownIndex(dates, values)
+    rng = random.Random(seed)
+    for _ in range(300):
+        lo, hi = sorted(rng.sample(range(len(dates) + 1), 2))
+        result = index.query(dates[lo], dates[hi - 1])
+        mdd, peak, trough = expected(dates, values, lo, hi)
+        assert result.mdd == pytest.approx(mdd)
+        assert (result.peak_date, result.trough_date) == (peak, trough)
+
+
+def test_incremental_updates_match_fresh_index() -> None:
+    dates, values = random_curve(3, 300)
+    index = DrawdownIndex(dates[:5], values[:5])
+    index.extend(dates[5:130], values[5:130])
+    index.extend(dates[130:], values[130:])
+    shifted = values[:200] + [value - 5000 for value in values[200:]]
+    index.replace_from(dates[200], dates[200:], shifted[200:])
+
+    fresh = DrawdownIndex(dates, shifted)
+    assert (index.dates, index.values) == (fresh.dates, fresh.values)
+    copied = index.copy()
+    copied.truncate(dates[100])
+    assert len(copied) == 100 and len(index) == 300
+    assert index.query() == fresh.query()
+    for lo, hi in [(0, 300), (150, 250), (199, 201), (250, 300)]:
+        assert index.query(dates[lo], dates[hi - 1]) == fresh.query(dates[lo], dates[hi - 1])
+
+
+def test_truncate_and_empty_window() -> None:
+    dates, values = random_curve(4, 50)
+    index = DrawdownIndex(dates, values)
+    index.truncate(dates[20])
+    assert len(index) == 20
+    assert index.query().mdd == pytest.approx(expected(dates, values, 0, 20)[0])
+    assert index.query(dates[30], dates[40]).peak_date is None
+    assert DrawdownIndex().query().mdd == 0.0
+
+
+def test_extend_rejects_out_of_order_days() -> None:
+    index = DrawdownIndex([date(2024, 1, 2)], [1.0])
+    with pytest.raises(ValueError):
+        index.extend([date(2024, 1, 1)], [2.0])
+
+
+def test_values_use_stored_precision() -> None:
+    dates = [date(2024, 1, 1), date(2024, 1, 2)]
+    assert DrawdownIndex(dates, [1.00005, 2.0]).values == DrawdownIndex(
+        dates, [Decimal("1.0001"), Decimal("2.0000")]
+    ).values == [1.0001, 2.0]
+
+
+@pytest.fixture()
+def tables() -> tuple:
+    return (Account, EquityDaily)
+
+
+@pytest.fixture()
+def db(db: Session, monkeypatch: pytest.MonkeyPatch) -> Session:
+    monkeypatch.setattr(drawdown_index, "_indexes", OrderedDict())
+    monkeypatch.setattr(settings.analytics, "drawdown_cache_size", 2)
+    db.execute(insert(Account), [dict(id=ref, user_id=1, account_code=f"A{ref}") for ref in (1, 2, 3)])
+    db.execute(
+        insert(EquityDaily),
+        [
+            dict(id=ref * 10 + day, account_id=ref, date=date(2024, 1, day), equity=ref * day, net_pnl_day=0)
+            for ref in (1, 2, 3)
+            for day in (1, 2)
+        ],
+    )
+    db.commit()
+    return db
+
+
+def test_cached_index_reloads_only_after_a_version_bump(db: Session) -> None:
+    index = drawdown_index.account_drawdown_index(db, 1)
+    assert drawdown_index.account_drawdown_index(db, 1) is index
+
+    db.execute(update(EquityDaily).where(EquityDaily.id == 12).values(equity=-5))
+    db.execute(update(Account).where(Account.id == 1).values(equity_version=1))
+    reloaded = drawdown_index.account_drawdown_index(db, 1)
+
+    assert reloaded is not index
+    assert reloaded.values == [1.0, -5.0]
+
+
+def test_equity_writes_mirror_only_consecutive_versions(db: Session) -> None:
+    index = drawdown_index.account_drawdown_index(db, 1)
+    drawdown_index.apply_equity_write(1, 1, date(2024, 1, 2), [date(2024, 1, 2)], [7.0])
+    version, updated = drawdown_index._indexes[1]
+    assert (version, updated.values) == (1, [1.0, 7.0])
+    # The index handed out before the write is left untouched for its readers.
+    assert updated is not index and index.values == [1.0, 2.0]
+
+    drawdown_index.apply_equity_write(1, 3, date(2024, 1, 2), [date(2024, 1, 2)], [8.0])
+    assert 1 not in drawdown_index._indexes
+
+
+def test_index_cache_evicts_least_recently_used(db: Session) -> None:
+    for account_id in (1, 2, 1, 3):
+        drawdown_index.account_drawdown_index(db, account_id)
+    assert list(drawdown_index._indexes) == [1, 3]
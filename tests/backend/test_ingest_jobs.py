@@ -0,0 +1,162 @@
+"""Tests for the ingest job lifecycle and stale-job recovery."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.ingestors.base import TradePage
+from app.models.models import Account, IngestJob
+from app.services import ingest_jobs
+from app.services.trades import UpsertResult
+
+START, END = datetime(2024, 1, 1), datetime(2024, 1, 31)
+
+
+class InlineExecutor:
+    """Runs submitted jobs immediately so the lifecycle is observable in-test."""
+
+    def __init__(self) -> None:
+        self.submitted: list[int] = []
+
+    def submit(self, fn, job_id: int) -> None:
+        self.submitted.append(job_id)
+        fn(job_id)
+
+
+@pytest.fixture()
+def tables() -> tuple:
+    return (Account, IngestJob)
+
+
+@pytest.fixture()
+def sessions(engine: Engine, monkeypatch: pytest.MonkeyPatch) -> sessionmaker:
+    factory = sessionmaker(engine)
+    with factory() as session:
+        session.execute(insert(Account).values(id=1, user_id=1, account_code="A1"))
+        session.commit()
+    monkeypatch.setattr(ingest_jobs, "SessionLocal", factory)
+    monkeypatch.setattr(ingest_jobs, "_executor", InlineExecutor())
+    return factory
+
+
+def seed_job(
+    session: Session, job_id: int, status: str, updated_at: datetime | None = None, attempts: int = 0
+) -> None:
+    values = dict(
+        id=job_id, user_id=1, account_id=1, broker="ibkr", status=status, start=START, end=END, attempts=attempts
+    )
+    if updated_at is not None:
+        values["updated_at"] = updated_at
+    session.execute(insert(IngestJob).values(**values))
+    session.commit()
+
+
+def test_enqueued_job_is_claimed_and_succeeds(sessions: sessionmaker, monkeypatch: pytest.MonkeyPatch) -> None:
+    seen = []
+
+    def sync(session, account, broker, start, end, **kwargs):
+        seen.append(session.get(IngestJob, 1).status)
+        return UpsertResult(imported=0, duplicates=3)
+
+    monkeypatch.setattr(ingest_jobs, "sync_account_window", sync)
+    with sessions() as session:
+        job = IngestJob(id=1, user_id=1, account_id=1, broker="ibkr", status="queued", start=START, end=END)
+        session.add(job)
+        session.commit()
+        ingest_jobs._executor.submit(ingest_jobs.run_ingest_job, job.id)
+
+    with sessions() as session:
+        job = session.get(IngestJob, 1)
+        assert seen == ["running"]
+        assert (job.status, job.progress, job.duplicates) == ("succeeded", 1.0, 3)
+        assert job.started_at is not None and job.finished_at is not None
+
+
+def test_failed_job_is_retried_until_attempts_run_out(
+    sessions: sessionmaker, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def sync(*args, **kwargs):
+        raise RuntimeError("broker unavailable")
+
+    monkeypatch.setattr(ingest_jobs, "sync_account_window", sync)
+    with sessions() as session:
+        seed_job(session, 1, "queued")
+    ingest_jobs.run_ingest_job(1)
+
+    with sessions() as session:
+        job = session.get(IngestJob, 1)
+        assert (job.status, job.error, job.attempts) == ("failed", "broker unavailable", 3)
+        assert job.finished_at is not None
+    assert ingest_jobs._executor.submitted == [1, 1]
+
+
+def test_invalid_job_is_not_retried(sessions: sessionmaker, monkeypatch: pytest.MonkeyPatch) -> None:
+    def sync(*args, **kwargs):
+        raise ValueError("Unsupported broker: ibkr")
+
+    monkeypatch.setattr(ingest_jobs, "sync_account_window", sync)
+    with sessions() as session:
+        seed_job(session, 1, "queued")
+    ingest_jobs.run_ingest_job(1)
+
+    with sessions() as session:
+        assert (session.get(IngestJob, 1).status, session.get(IngestJob, 1).attempts) == ("failed", 1)
+    assert ingest_jobs._executor.submitted == []
+
+
+def test_retry_resumes_from_the_recorded_cursor(sessions: sessionmaker, monkeypatch: pytest.MonkeyPatch) -> None:
+    cursors = []
+
+    def sync(session, account, broker, start, end, cursor=None, on_page=None, **kwargs):
+        cursors.append(cursor)
+        if len(cursors) == 1:
+            on_page(TradePage(trades=[], cursor="page-2"), 0.5)
+            raise RuntimeError("connection reset")
+        on_page(TradePage(trades=[], cursor=None), 1.0)
+        return UpsertResult(imported=0)
+
+    monkeypatch.setattr(ingest_jobs, "sync_account_window", sync)
+    with sessions() as session:
+        seed_job(session, 1, "queued")
+    ingest_jobs.run_ingest_job(1)
+
+    assert cursors == [None, "page-2"]
+    with sessions() as session:
+        job = session.get(IngestJob, 1)
+        assert (job.status, job.attempts, job.cursor, job.error) == ("succeeded", 2, None, None)
+
+
+def test_claim_is_exclusive(sessions: sessionmaker) -> None:
+    with sessions() as session:
+        seed_job(session, 1, "queued")
+        assert ingest_jobs._claim(session, 1)
+        assert not ingest_jobs._claim(session, 1)
+
+
+def test_only_silent_running_jobs_are_requeued(sessions: sessionmaker) -> None:
+    now = datetime(2024, 2, 1, 12, 0)
+    with sessions() as session:
+        seed_job(session, 1, "running", updated_at=now - timedelta(hours=2))
+        seed_job(session, 2, "running", updated_at=now - timedelta(minutes=5))
+        seed_job(session, 3, "succeeded", updated_at=now - timedelta(days=1))
+        seed_job(session, 4, "running", updated_at=now - timedelta(hours=2), attempts=3)
+
+        assert ingest_jobs.requeue_stale_jobs(session, now=now) == 1
+        statuses = [session.get(IngestJob, job_id).status for job_id in (1, 2, 3, 4)]
+        assert statuses == ["queued", "running", "succeeded", "failed"]
+
+
+def test_resume_runs_queued_and_stale_jobs(sessions: sessionmaker, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ingest_jobs, "sync_account_window", lambda *args, **kwargs: UpsertResult())
+    with sessions() as session:
+        seed_job(session, 1, "queued")
+        seed_job(session, 2, "running", updated_at=datetime(2024, 1, 1))
+        seed_job(session, 3, "failed", updated_at=datetime(2024, 1, 1))
+
+    assert ingest_jobs.resume_queued_jobs() == 2
+    assert sorted(ingest_jobs._executor.submitted) == [1, 2]
+    with sessions() as session:
+        assert [session.get(IngestJob, job_id).status for job_id in (1, 2, 3)] == ["succeeded", "succeeded", "failed"]
@@ -0,0 +1,123 @@
+"""Tests for the KPI cache lookup and invalidation rules."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.models import Account, KPI
+from app.services import kpi_cache
+
+
+@pytest.fixture()
+def tables() -> tuple:
+    return (KPI, Account)
+
+
+@pytest.fixture(autouse=True)
+def reset_stats() -> None:
+    kpi_cache.reset_cache_stats()
+
+
+def seed(db: Session, row_id: int, scope: str, ref: int, start: datetime, end: datetime) -> None:
+    db.execute(
+        insert(KPI).values(
+            id=row_id, scope=scope, scope_ref_id=ref, period_start=start, period_end=end, total_trades=row_id
+        )
+    )
+
+
+def periods(db: Session) -> list[tuple]:
+    return db.execute(select(KPI.scope, KPI.scope_ref_id, KPI.period_start).order_by(KPI.id)).all()
+
+
+def test_invalidate_only_overlapping_periods(db: Session) -> None:
+    seed(db, 1, "account", 1, datetime(2024, 1, 1), datetime(2024, 1, 31))
+    seed(db, 2, "account", 1, datetime(2024, 3, 1), datetime(2024, 3, 31))
+    seed(db, 3, "account_month", 1, datetime(2024, 2, 1), datetime(2024, 2, 29))
+    seed(db, 4, "account", 2, datetime(2024, 1, 1), datetime(2024, 12, 31))
+    seed(db, 5, "strategy", 1, datetime(2024, 1, 1), datetime(2024, 12, 31))
+
+    removed = kpi_cache.invalidate_kpis(
+        db, ["account", "account_month"], [1], datetime(2024, 1, 20), datetime(2024, 2, 3)
+    )
+
+    assert removed == 2
+    assert periods(db) == [
+        ("account", 1, datetime(2024, 3, 1)),
+        ("account", 2, datetime(2024, 1, 1)),
+        ("strategy", 1, datetime(2024, 1, 1)),
+    ]
+    assert kpi_cache.cache_stats()["invalidated"] == 2
+
+
+def test_cached_row_is_returned_without_computing(db: Session) -> None:
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 31)
+    seed(db, 7, "account", 1, start, end)
+
+    def compute() -> dict:
+        raise AssertionError("cache hit should not recompute")
+
+    metrics = kpi_cache.cached_kpis(db, "account", 1, start, end, compute)
+
+    assert metrics["total_trades"] == 7
+    assert set(metrics) == set(kpi_cache.KPI_COLUMNS)
+    assert kpi_cache.cache_stats() == {"hits": 1, "misses": 0, "bypassed": 0, "invalidated": 0, "evicted": 0}
+
+
+def test_only_whole_day_windows_are_cacheable() -> None:
+    assert kpi_cache.cacheable_window(datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert kpi_cache.cacheable_window(datetime(2024, 1, 1), datetime(2024, 1, 31, 23, 59, 59, 999999))
+    taipei = timezone(timedelta(hours=8))
+    assert kpi_cache.cacheable_window(datetime(2024, 1, 1, 8, tzinfo=taipei), datetime(2024, 1, 2, 8, tzinfo=taipei))
+    assert not kpi_cache.cacheable_window(datetime(2024, 1, 1), datetime(2024, 1, 31, 14, 3, 7))
+    assert not kpi_cache.cacheable_window(datetime(2024, 1, 1, tzinfo=taipei), datetime(2024, 1, 2))
+
+
+def test_partial_day_window_bypasses_the_table(db: Session) -> None:
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 31, 9, 30)
+    seed(db, 7, "account", 1, start, end)
+
+    metrics = kpi_cache.cached_kpis(db, "account", 1, start, end, lambda: {"total_trades": 0})
+
+    assert metrics == {"total_trades": 0}
+    assert kpi_cache.cache_stats()["bypassed"] == 1
+
+
+def test_evict_keeps_latest_rows_per_ref(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings.analytics, "kpi_cache_rows_per_ref", 2)
+    for row_id in range(1, 5):
+        seed(db, row_id, "account", 1, datetime(2024, row_id, 1), datetime(2024, row_id, 28))
+    seed(db, 5, "account", 2, datetime(2024, 1, 1), datetime(2024, 1, 28))
+
+    kpi_cache._evict(db, "account", 1)
+
+    assert [row[1:] for row in periods(db)] == [
+        (1, datetime(2024, 3, 1)),
+        (1, datetime(2024, 4, 1)),
+        (2, datetime(2024, 1, 1)),
+    ]
+    assert kpi_cache.cache_stats()["evicted"] == 2
+
+
+def test_miss_is_not_stored_when_the_version_moves(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    db.execute(insert(Account).values(id=1, user_id=1, account_code="A", currency="TWD"))
+    stored: list[int] = []
+    monkeypatch.setattr(kpi_cache, "store_kpis", lambda db, scope, ref, start, end, metrics: stored.append(ref))
+    monkeypatch.setattr(kpi_cache, "_evict", lambda db, scope, ref: None)
+    version = select(Account.equity_version).where(Account.id == 1)
+    start, end = datetime(2024, 1, 1), datetime(2024, 2, 1)
+
+    def racing_import() -> dict:
+        # An import commits and bumps the version while the reader is computing.
+        db.execute(update(Account).where(Account.id == 1).values(equity_version=Account.equity_version + 1))
+        return {"total_trades": 1}
+
+    assert kpi_cache.cached_kpis(db, "account", 1, start, end, racing_import, version=version) == {"total_trades": 1}
+    assert stored == []
+    kpi_cache.cached_kpis(db, "account", 1, start, end, lambda: {"total_trades": 2}, version=version)
+    assert stored == [1]
+    assert kpi_cache.cache_stats()["misses"] == 2
@@ -0,0 +1,122 @@
+"""Parity tests between the vectorized KPI engine and the per-trade reference."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from app.services.kpi_engine import TradeColumns, compute_trade_kpis
+from app.services.trades import compute_kpis, equity_curve, max_drawdown, profit_factor
+
+from test_kpi_math import DummyTrade, make_trade
+
+
+def reference_kpis(trades: list[DummyTrade]) -> dict[str, float | None]:
+    """The original loop-based ``compute_kpis``, kept as the parity oracle."""
+
+    if not trades:
+        return {
+            "win_rate": None,
+            "avg_win": None,
+            "avg_loss": None,
+            "profit_factor": None,
+            "expectancy": None,
+            "mdd": None,
+            "total_trades": 0,
+        }
+    wins: list[float] = []
+    losses: list[float] = []
+    rows = []
+    for trade in trades:
+        pnl = float(trade.price) * float(trade.qty)
+        pnl = pnl if trade.side == "SELL" else -pnl
+        pnl -= float(trade.fee or 0) + float(trade.tax or 0)
+        rows.append((trade.trade_ts.date(), pnl))
+        (wins if pnl > 0 else losses).append(pnl)
+    daily = pd.DataFrame(rows, columns=["date", "pnl"]).groupby("date")["pnl"].sum().cumsum()
+    daily.index = pd.to_datetime(daily.index)
+    mdd, _, _ = max_drawdown(daily)
+    return {
+        "win_rate": len(wins) / len(trades),
+        "avg_win": sum(wins) / len(wins) if wins else None,
+        "avg_loss": sum(losses) / len(losses) if losses else None,
+        "profit_factor": profit_factor(sum(wins), sum(losses) if losses else 0),
+        "expectancy": sum(p for _, p in rows) / len(trades),
+        "mdd": mdd,
+        "total_trades": len(trades),
+    }
+
+
+def assert_parity(trades: list[DummyTrade]) -> None:
+    expected = reference_kpis(trades)
+    actual = compute_kpis(trades)
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if value is None:
+            assert actual[key] is None, key
+        else:
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-6), key
+
+
+KPI_MATH_CASES = [
+    [],
+    [make_trade("SELL", 1, 100)],
+    [make_trade("BUY", 1, 100)],
+    [make_trade("SELL", 1, 120), make_trade("BUY", 1, 80)],
+    [make_trade("SELL", 1, 10), make_trade("BUY", 1, 9)],
+    [make_trade("SELL", 2, 50, fee=1.5, tax=0.3), make_trade("BUY", 1, 0, fee=0, tax=0)],
+]
+
+
+@pytest.mark.parametrize("trades", KPI_MATH_CASES)
+def test_parity_with_kpi_math_cases(trades: list[DummyTrade]) -> None:
+    assert_parity(trades)
+
+
+def test_parity_on_random_unsorted_trades() -> None:
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    trades = [
+        DummyTrade(
+            side=rng.choice(["BUY", "SELL"]),
+            qty=rng.randint(1, 500),
+            price=round(rng.uniform(5, 900), 2),
+            fee=round(rng.uniform(0, 20), 2),
+            tax=rng.choice([0, round(rng.uniform(0, 10), 2)]),
+            trade_ts=start + timedelta(days=rng.randint(0, 90), minutes=rng.randint(0, 600)),
+        )
+        for _ in range(2000)
+    ]
+    assert_parity(trades)
+
+
+def test_equity_curve_matches_groupby() -> None:
+    trades = [
+        DummyTrade("SELL", 1, 10, trade_ts=datetime(2024, 1, 3, tzinfo=timezone.utc)),
+        DummyTrade("BUY", 1, 4, trade_ts=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+        DummyTrade("SELL", 2, 3, trade_ts=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+    ]
+    series = equity_curve(trades)
+    assert list(series.index.date) == [datetime(2024, 1, 1).date(), datetime(2024, 1, 3).date()]
+    assert series.tolist() == pytest.approx([2.0, 12.0])
+
+
+def test_engine_accepts_columns_directly() -> None:
+    trades = [make_trade("SELL", 1, 120), make_trade("BUY", 1, 80)]
+    columns = TradeColumns.from_trades(trades)
+    assert compute_trade_kpis(columns) == compute_kpis(columns)
+    assert compute_kpis(TradeColumns.empty())["total_trades"] == 0
+
+
+def test_concat_matches_single_batch() -> None:
+    rows = [
+        ("SELL", 1.0, 10.0, None, 0.5, datetime(2024, 1, 2).date()),
+        ("BUY", 2.0, 4.0, 1.0, None, datetime(2024, 1, 1).date()),
+        ("SELL", 3.0, 5.0, 0.0, 0.0, datetime(2024, 1, 3).date()),
+    ]
+    whole = TradeColumns.from_rows(rows)
+    parts = TradeColumns.concat([TradeColumns.from_rows(rows[:1]), TradeColumns.empty(), TradeColumns.from_rows(rows[1:])])
+    assert compute_trade_kpis(parts) == compute_trade_kpis(whole)
+    assert parts.trade_day.tolist() == whole.trade_day.tolist()
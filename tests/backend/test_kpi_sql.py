@@ -0,0 +1,122 @@
+"""Parity tests between the SQL push-down KPI engine and the NumPy engine."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Trade
+from app.services.kpi_engine import TradeColumns, compute_trade_kpis
+from app.services.kpi_sql import compute_kpis_sql
+
+from test_kpi_math import DummyTrade
+
+
+@pytest.fixture()
+def tables() -> tuple:
+    return (Trade,)
+
+
+def store(db: Session, trades: list[DummyTrade], account_id: int = 1) -> None:
+    first_id = account_id * 1_000_000  # BIGINT keys do not autoincrement on SQLite
+    rows = [
+        dict(
+            id=first_id + index,
+            account_id=account_id,
+            symbol_id=1,
+            side=trade.side,
+            qty=trade.qty,
+            price=trade.price,
+            fee=trade.fee,
+            tax=trade.tax,
+            trade_ts=trade.trade_ts,
+        )
+        for index, trade in enumerate(trades)
+    ]
+    if rows:
+        db.execute(insert(Trade), rows)
+
+
+def assert_parity(actual: dict, expected: dict) -> None:
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if value is None:
+            assert actual[key] is None, key
+        else:
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-6), key
+
+
+def random_trades(seed: int, count: int) -> list[DummyTrade]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [
+        DummyTrade(
+            side=rng.choice(["BUY", "SELL"]),
+            qty=rng.randint(1, 500),
+            price=round(rng.uniform(5, 900), 2),
+            fee=round(rng.uniform(0, 20), 2),
+            tax=rng.choice([0, round(rng.uniform(0, 10), 2)]),
+            trade_ts=start + timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 600)),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_sql_engine_empty_account(db: Session) -> None:
+    assert compute_kpis_sql(db, 1) == compute_trade_kpis(TradeColumns.empty())
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_sql_engine_matches_numpy(db: Session, seed: int) -> None:
+    trades = random_trades(seed, 500)
+    store(db, trades)
+    store(db, random_trades(seed + 100, 50), account_id=2)
+    assert_parity(compute_kpis_sql(db, 1), compute_trade_kpis(TradeColumns.from_trades(trades)))
+
+
+def test_sql_engine_respects_window(db: Session) -> None:
+    trades = random_trades(5, 300)
+    store(db, trades)
+    start, end = datetime(2024, 1, 10), datetime(2024, 2, 1)
+    selected = [trade for trade in trades if start <= trade.trade_ts <= end]
+    assert_parity(compute_kpis_sql(db, 1, start, end), compute_trade_kpis(TradeColumns.from_trades(selected)))
+
+
+def test_sql_engine_counts_zero_pnl_trades_as_losses(db: Session) -> None:
+    day = datetime(2024, 1, 2)
+    trades = [
+        DummyTrade(side="BUY", qty=10, price=0, trade_ts=day),
+        DummyTrade(side="SELL", qty=10, price=0, trade_ts=day),
+        DummyTrade(side="BUY", qty=1, price=100, fee=1, trade_ts=day + timedelta(days=1)),
+        DummyTrade(side="SELL", qty=1, price=102, fee=1, trade_ts=day + timedelta(days=1)),
+    ]
+    store(db, trades)
+    assert_parity(compute_kpis_sql(db, 1), compute_trade_kpis(TradeColumns.from_trades(trades)))
+
+
+def test_sql_engine_flat_account(db: Session) -> None:
+    trades = [DummyTrade(side=side, qty=5, price=0, trade_ts=datetime(2024, 1, 3)) for side in ("BUY", "SELL")]
+    store(db, trades)
+    expected = compute_trade_kpis(TradeColumns.from_trades(trades))
+    assert expected["profit_factor"] is None and expected["mdd"] == 0.0
+    assert_parity(compute_kpis_sql(db, 1), expected)
+
+
+def test_sql_engine_matches_numpy_on_decimal_inputs(db: Session) -> None:
+    trades = [
+        DummyTrade(
+            side=trade.side,
+            qty=Decimal(trade.qty),
+            price=Decimal(str(trade.price)),
+            fee=Decimal(str(trade.fee)),
+            tax=Decimal(str(trade.tax)),
+            trade_ts=trade.trade_ts,
+        )
+        for trade in random_trades(9, 200)
+    ]
+    store(db, trades)
+    assert_parity(compute_kpis_sql(db, 1), compute_trade_kpis(TradeColumns.from_trades(trades)))
@@ -0,0 +1,60 @@
+"""Tests for FIFO/LIFO/average-cost lot matching."""
+from __future__ import annotations
+
+import copy
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.lots import Fill, match_fills
+
+START = datetime(2024, 1, 1, 9)
+
+
+def fill(trade_id: int, side: str, qty: float, price: float, cost: float = 0.0, symbol_id: int = 1) -> Fill:
+    return Fill(trade_id, symbol_id, side, qty, price, cost, START + timedelta(days=trade_id))
+
+
+LADDER = [fill(1, "BUY", 100, 10), fill(2, "BUY", 100, 12), fill(3, "SELL", 150, 15)]
+
+
+@pytest.mark.parametrize(
+    "method, pairs, remaining",
+    [
+        ("fifo", [(1, 100, 500.0), (2, 50, 150.0)], [(2, 50, 12.0)]),
+        ("lifo", [(2, 100, 300.0), (1, 50, 250.0)], [(1, 50, 10.0)]),
+        ("average", [(1, 150, 600.0)], [(1, 50, 11.0)]),
+    ],
+)
+def test_methods_pick_lots_in_order(method: str, pairs: list, remaining: list) -> None:
+    book, closed = match_fills(LADDER, method)
+    assert [(pair.open_trade_id, pair.qty, pair.realized_pnl) for pair in closed] == pytest.approx(pairs)
+    assert all(pair.close_trade_id == 3 and pair.direction == "LONG" for pair in closed)
+    assert [(lot.trade_id, lot.qty, lot.price) for lot in book.open_lots([1])] == pytest.approx(remaining)
+
+
+def test_reversal_opens_short_and_costs_are_prorated() -> None:
+    fills = [fill(1, "BUY", 100, 10, cost=10), fill(2, "SELL", 150, 12, cost=15), fill(3, "BUY", 50, 11, cost=5)]
+    book, closed = match_fills(fills)
+    long_close, short_close = closed
+    assert long_close.realized_pnl == pytest.approx(200 - 10 - 10)
+    assert long_close.closed_at - long_close.opened_at == timedelta(days=1)
+    assert short_close.direction == "SHORT"
+    assert (short_close.open_trade_id, short_close.qty) == (2, 50)
+    assert short_close.realized_pnl == pytest.approx(50 - 5 - 5)
+    assert book.open_lots([1]) == []
+
+
+@pytest.mark.parametrize("method", ["fifo", "lifo", "average"])
+def test_resuming_from_saved_book_matches_single_pass(method: str) -> None:
+    rng = random.Random(4)
+    fills = [
+        fill(index, rng.choice(["BUY", "SELL"]), rng.randint(1, 9) * 10, rng.uniform(5, 50), rng.uniform(0, 3), rng.randint(1, 3))
+        for index in range(1, 400)
+    ]
+    _, full = match_fills(fills, method)
+    book, head = match_fills(fills[:170], method)
+    _, tail = match_fills(fills[170:], method, copy.deepcopy(book))
+    assert len(head) + len(tail) == len(full)
+    assert [pair.realized_pnl for pair in head + tail] == pytest.approx([pair.realized_pnl for pair in full])
@@ -0,0 +1,84 @@
+"""Tests for the cross-account portfolio equity curve."""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.models.models import Account, EquityDaily
+from app.services import portfolio
+from app.services.portfolio import merge_equity_curves, portfolio_equity, portfolio_kpis
+
+
+def test_merge_forward_fills_and_starts_late_accounts_at_zero() -> None:
+    frame = pd.DataFrame(
+        {
+            "account_id": [1, 1, 1, 2, 2],
+            "date": [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 4), date(2024, 1, 2), date(2024, 1, 3)],
+            "equity": [100.0, 110.0, 90.0, 50.0, 70.0],
+        }
+    )
+    curve = merge_equity_curves(frame)
+    assert curve.index.tolist() == [date(2024, 1, d) for d in (1, 2, 3, 4)]
+    assert curve["equity"].tolist() == [100.0, 160.0, 180.0, 160.0]
+    assert curve["net_pnl_day"].tolist() == [100.0, 60.0, 20.0, -20.0]
+    kpis = portfolio_kpis(curve)
+    assert kpis["mdd"] == -20.0
+    assert (kpis["peak_date"], kpis["trough_date"]) == (date(2024, 1, 3), date(2024, 1, 4))
+    assert kpis["net_pnl"] == 160.0
+
+
+def test_empty_portfolio() -> None:
+    curve = merge_equity_curves(pd.DataFrame(columns=["account_id", "date", "equity"]))
+    assert curve.empty
+    assert portfolio_kpis(curve)["start_equity"] is None
+
+
+@pytest.fixture()
+def tables() -> tuple:
+    return (Account, EquityDaily)
+
+
+@pytest.fixture()
+def db(db: Session) -> Session:
+    portfolio._cache.clear()
+    db.execute(
+        insert(Account),
+        [
+            dict(id=1, user_id=7, account_code="A", currency="TWD"),
+            dict(id=2, user_id=7, account_code="B", currency="USD"),
+            dict(id=3, user_id=8, account_code="C", currency="TWD"),
+        ],
+    )
+    db.execute(
+        insert(EquityDaily),
+        [
+            dict(id=1, account_id=1, date=date(2024, 1, 1), equity=10, net_pnl_day=10),
+            dict(id=2, account_id=2, date=date(2024, 1, 2), equity=5, net_pnl_day=5),
+            dict(id=3, account_id=3, date=date(2024, 1, 1), equity=99, net_pnl_day=99),
+        ],
+    )
+    db.commit()
+    return db
+
+
+def test_cache_is_reused_until_equity_changes(db: Session) -> None:
+    first = portfolio_equity(db, 7)
+    assert first.account_ids == [1, 2]
+    assert first.currencies == ["TWD", "USD"]
+    assert first.curve["equity"].tolist() == [10.0, 15.0]
+    assert portfolio_equity(db, 7) is first
+    assert portfolio_equity(db, 7, currency="TWD").curve["equity"].tolist() == [10.0]
+
+    db.execute(update(EquityDaily).where(EquityDaily.id == 1).values(equity=20))
+    db.commit()
+    assert portfolio_equity(db, 7) is first
+
+    db.execute(update(Account).where(Account.id == 1).values(equity_version=Account.equity_version + 1))
+    db.commit()
+    second = portfolio_equity(db, 7)
+    assert second is not first
+    assert second.curve["equity"].tolist() == [20.0, 25.0]
@@ -0,0 +1,28 @@
+"""Tests for positions derived from open lots."""
+from __future__ import annotations
+
+import pytest
+
+from app.services.lots import match_fills
+from app.services.positions import aggregate_lots
+
+from test_lots import fill
+
+
+def test_positions_follow_the_lot_book() -> None:
+    fills = [
+        fill(1, "BUY", 100, 10),
+        fill(2, "BUY", 100, 12),
+        fill(3, "SELL", 150, 15),
+        fill(4, "SELL", 30, 20, symbol_id=2),
+        fill(5, "BUY", 40, 5, symbol_id=3),
+        fill(6, "SELL", 40, 6, symbol_id=3),
+    ]
+    book, _ = match_fills(fills, "fifo")
+    positions = aggregate_lots(book.open_lots([1, 2, 3]))
+    assert positions == {1: pytest.approx((50, 12.0)), 2: pytest.approx((-30, 20.0))}
+
+
+def test_average_method_reports_average_cost() -> None:
+    book, _ = match_fills([fill(1, "BUY", 100, 10), fill(2, "BUY", 300, 14), fill(3, "SELL", 200, 20)], "average")
+    assert aggregate_lots(book.open_lots([1])) == {1: pytest.approx((200, 13.0))}
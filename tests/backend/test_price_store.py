@@ -0,0 +1,114 @@
+"""Tests for the memory-mapped price store."""
+from __future__ import annotations
+
+from datetime import date, datetime
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.price_store import Bars, PriceStore
+
+
+def daily(symbol: str, start: str, count: int, base: float = 100.0) -> pd.DataFrame:
+    close = base + np.arange(count, dtype=float)
+    return pd.DataFrame(
+        {
+            "symbol": symbol,
+            "date": pd.date_range(start, periods=count, freq="D"),
+            "open": close - 0.5,
+            "high": close + 1,
+            "low": close - 1,
+            "close": close,
+            "volume": 1000.0,
+        }
+    )
+
+
+def test_round_trip_and_range_reads_are_zero_copy(tmp_path) -> None:
+    store = PriceStore(tmp_path)
+    assert store.load_frame(pd.concat([daily("2330.TW", "2024-01-01", 30), daily("AAPL", "2024-01-10", 5)]), "1d") == {
+        "2330.TW": 30,
+        "AAPL": 5,
+    }
+    assert store.symbols("1d") == ["2330.TW", "AAPL"]
+
+    bars = store.read("2330.TW", "1d", date(2024, 1, 5), datetime(2024, 1, 9, 15, 30))
+    assert bars.ts.tolist() == [date(2024, 1, day) for day in range(5, 10)]
+    assert bars.close.tolist() == [104.0, 105.0, 106.0, 107.0, 108.0]
+    assert isinstance(bars.close, np.memmap)
+    assert not bars.close.flags.writeable
+    assert len(store.read("2330.TW", "1d", date(2025, 1, 1))) == 0
+    with pytest.raises(KeyError):
+        store.read("MSFT", "1d")
+
+
+def test_appends_skip_stored_bars_and_reject_unordered_input(tmp_path) -> None:
+    store = PriceStore(tmp_path)
+    store.load_frame(daily("X", "2024-01-01", 10), "1d")
+    # Overlapping reload: only the five new days are written.
+    assert store.load_frame(daily("X", "2024-01-06", 10, base=105.0), "1d") == {"X": 5}
+    bars = store.read("X", "1d")
+    assert len(bars) == 15 and np.all(np.diff(bars.ts.astype(np.int64)) == 1)
+    assert bars.close[-1] == 114.0
+
+    reversed_bars = Bars("Y", np.array(["2024-01-02", "2024-01-01"], dtype="datetime64[D]"), *np.ones((5, 2)))
+    with pytest.raises(ValueError):
+        store.append(reversed_bars, "1d")
+    with pytest.raises(ValueError):
+        store.read("X", "daily")
+
+
+def test_interrupted_append_is_discarded(tmp_path) -> None:
+    store = PriceStore(tmp_path)
+    store.load_frame(daily("X", "2024-01-01", 3), "1d")
+    with open(tmp_path / "1d" / "X" / "close.bin", "ab") as handle:
+        handle.write(np.array([999.0]).tobytes())
+    assert store.read("X", "1d").close.tolist() == [100.0, 101.0, 102.0]
+    store.load_frame(daily("X", "2024-01-04", 1, base=103.0), "1d")
+    assert store.read("X", "1d").close.tolist() == [100.0, 101.0, 102.0, 103.0]
+
+
+def test_intraday_csv_with_timezones(tmp_path) -> None:
+    store = PriceStore(tmp_path)
+    csv = StringIO(
+        "symbol,date,open,high,low,close\n"
+        "X,2024-03-01T09:05:00+08:00,2,2,2,2\n"
+        "X,2024-03-01T09:00:00+08:00,1,1,1,1\n"
+        "X,2024-03-01T09:10:00+08:00,3,3,3,3\n"
+    )
+    assert store.load_csv(csv, "5m") == {"X": 3}
+    bars = store.read("X", "5m", start=datetime(2024, 3, 1, 1, 5))
+    assert bars.ts.tolist() == [datetime(2024, 3, 1, 1, 5), datetime(2024, 3, 1, 1, 10)]
+    assert bars.close.tolist() == [2.0, 3.0] and bars.volume.tolist() == [0.0, 0.0]
+
+
+def test_only_configured_timeframes_are_stored(tmp_path) -> None:
+    store = PriceStore(tmp_path, timeframes=["1d"])
+    with pytest.raises(ValueError, match="not configured"):
+        store.load_frame(daily("X", "2024-01-01", 3), "2d")
+    with pytest.raises(ValueError, match="not configured"):
+        store.read("X", "5m")
+    with pytest.raises(ValueError, match="not configured"):
+        store.symbols("60m")
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("symbol", ["", ".", ".."])
+def test_symbols_cannot_escape_the_timeframe_directory(tmp_path, symbol: str) -> None:
+    store = PriceStore(tmp_path / "prices")
+    with pytest.raises(ValueError, match="Invalid symbol"):
+        store.load_frame(daily(symbol, "2024-01-01", 3), "1d")
+    with pytest.raises(ValueError, match="Invalid symbol"):
+        store.read(symbol, "1d")
+    assert [path.name for path in tmp_path.iterdir()] == []
+    with pytest.raises(ValueError):
+        store.symbols("..")
+
+
+def test_dotted_and_slashed_symbols_stay_inside_the_store(tmp_path) -> None:
+    store = PriceStore(tmp_path)
+    store.load_frame(pd.concat([daily("../X", "2024-01-01", 3), daily("...", "2024-01-01", 3)]), "1d")
+    assert sorted(path.name for path in (tmp_path / "1d").iterdir()) == ["..%2FX", "..."]
+    assert store.symbols("1d") == ["...", "../X"]
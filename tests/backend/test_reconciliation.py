@@ -0,0 +1,77 @@
+"""Tests for broker position reconciliation."""
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from app.core.settings import Settings
+from app.services import reconciliation
+from app.services.reconciliation import (
+    PositionFetch,
+    account_statuses,
+    broker_position_frame,
+    compare_positions,
+    fetch_broker_positions,
+)
+
+
+def test_compare_flags_quantity_differences_on_both_sides() -> None:
+    broker = broker_position_frame(
+        [
+            PositionFetch(1, "ibkr", [{"symbol": "AAPL", "qty": 20, "avg_price": 150.0}, {"symbol": "MSFT", "qty": 5}]),
+            PositionFetch(2, "ibkr", [{"symbol": "AAPL", "qty": 10, "avg_price": 100.0}]),
+            PositionFetch(3, "ibkr", status="failed", error="boom"),
+        ]
+    )
+    journal = pd.DataFrame(
+        {
+            "account_id": [1, 1, 2],
+            "symbol": ["AAPL", "TSLA", "AAPL"],
+            "qty": [20.0, 3.0, 10.0],
+            "avg_price": [149.0, 200.0, 100.0],
+        }
+    )
+    breaks = compare_positions(broker, journal, tolerance=1e-6)
+    assert breaks[["account_id", "symbol", "qty_diff"]].values.tolist() == [[1, "MSFT", 5.0], [1, "TSLA", -3.0]]
+
+    statuses = account_statuses(
+        [PositionFetch(1, "ibkr"), PositionFetch(2, "ibkr"), PositionFetch(3, "ibkr", status="failed", error="boom")],
+        breaks,
+    )
+    assert [(row["status"], row["breaks"]) for row in statuses] == [("out_of_sync", 2), ("in_sync", 0), ("failed", 0)]
+
+
+def test_repeated_symbols_are_summed_with_weighted_price() -> None:
+    frame = broker_position_frame(
+        [PositionFetch(1, "ibkr", [{"symbol": "X", "qty": 10, "avg_price": 10.0}, {"symbol": "X", "qty": 30, "avg_price": 20.0}])]
+    )
+    assert frame[["qty", "avg_price"]].values.tolist() == [[40.0, 17.5]]
+    assert broker_position_frame([]).empty
+
+
+def test_fetch_respects_deadline_and_captures_failures(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fetch_positions(account):
+        if account.id == 2:
+            raise RuntimeError("token expired")
+        if account.id == 3:
+            time.sleep(2)
+        return [{"symbol": "AAPL", "qty": account.id}]
+
+    monkeypatch.setitem(reconciliation.BROKER_CONNECTORS, "ibkr", SimpleNamespace(fetch_positions=fetch_positions))
+    targets = [(SimpleNamespace(id=account_id), "ibkr") for account_id in (1, 2, 3)]
+    started = time.perf_counter()
+    fetches = {fetch.account_id: fetch for fetch in fetch_broker_positions(targets, deadline=0.3)}
+    assert time.perf_counter() - started < 1.5
+    assert fetches[1].status == "ok" and fetches[1].positions == [{"symbol": "AAPL", "qty": 1}]
+    assert (fetches[2].status, fetches[2].error) == ("failed", "token expired")
+    assert fetches[3].status == "timed_out"
+
+
+def test_reconciliation_requires_maintained_positions() -> None:
+    with pytest.raises(ValidationError, match="match_on_ingest"):
+        Settings(lots={"match_on_ingest": False})
+    assert not Settings(lots={"match_on_ingest": False}, reconcile={"enabled": False}).reconcile.enabled
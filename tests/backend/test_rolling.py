@@ -0,0 +1,73 @@
+"""Tests for rolling-window KPI series."""
+from __future__ import annotations
+
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.kpi_engine import TradeColumns, compute_trade_kpis
+from app.services.rolling import rolling_day_kpis, rolling_kpis, rolling_max, rolling_trade_kpis
+
+
+def random_rows(seed: int, count: int) -> list[tuple]:
+    rng = random.Random(seed)
+    rows = [
+        (
+            rng.choice(["BUY", "SELL"]),
+            rng.randint(1, 10),
+            rng.uniform(10, 100),
+            rng.uniform(0, 2),
+            0.0,
+            date(2024, 1, 1) + timedelta(days=rng.randint(0, 120)),
+        )
+        for _ in range(count)
+    ]
+    return sorted(rows, key=lambda row: row[5])
+
+
+def test_rolling_max_matches_brute_force() -> None:
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=400).cumsum()
+    starts = np.maximum(np.arange(400) - rng.integers(0, 30, size=400), 0)
+    starts = np.maximum.accumulate(starts)
+    expected = [values[lo : hi + 1].max() for hi, lo in enumerate(starts)]
+    assert np.allclose(rolling_max(values, starts), expected)
+
+
+@pytest.mark.parametrize("window", [1, 20, 60])
+def test_trade_windows_match_full_recompute(window: int) -> None:
+    rows = random_rows(window, 300)
+    series = rolling_trade_kpis(TradeColumns.from_rows(rows), window)
+    assert len(series.dates) == len(rows) - window + 1
+    pnl = TradeColumns.from_rows(rows).net_pnl()
+    equity = np.cumsum(pnl)
+    for point in (0, len(series.dates) // 2, len(series.dates) - 1):
+        chunk = rows[point : point + window]
+        metrics = compute_trade_kpis(TradeColumns.from_rows(chunk))
+        assert series.trades[point] == window
+        assert series.win_rate[point] == pytest.approx(metrics["win_rate"])
+        assert series.expectancy[point] == pytest.approx(metrics["expectancy"])
+        end = point + window - 1
+        assert series.drawdown[point] == pytest.approx(equity[end] - equity[point : end + 1].max())
+        assert series.dates[point] == np.datetime64(chunk[-1][5])
+
+
+def test_day_windows_match_full_recompute() -> None:
+    rows = random_rows(7, 500)
+    series = rolling_day_kpis(TradeColumns.from_rows(rows), 30)
+    assert series.dates[0] >= np.datetime64(rows[0][5]) + np.timedelta64(29, "D")
+    for point in (0, len(series.dates) - 1):
+        last = series.dates[point].item()
+        chunk = [row for row in rows if last - timedelta(days=29) <= row[5] <= last]
+        metrics = compute_trade_kpis(TradeColumns.from_rows(chunk))
+        assert series.trades[point] == metrics["total_trades"]
+        assert series.win_rate[point] == pytest.approx(metrics["win_rate"])
+        assert series.expectancy[point] == pytest.approx(metrics["expectancy"])
+
+
+def test_short_history_yields_empty_series() -> None:
+    columns = TradeColumns.from_rows(random_rows(1, 5))
+    assert [len(series.dates) for series in rolling_kpis(columns, [10, 20])] == [0, 0]
+    assert len(rolling_kpis(TradeColumns.empty(), [5], mode="days")[0].dates) == 0
@@ -0,0 +1,69 @@
+"""Tests for grouped KPIs and monthly rollup rows."""
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.services.kpi_engine import TradeColumns, compute_trade_kpis, grouped_trade_kpis, kpi_records
+from app.services.rollups import month_bounds, monthly_kpi_rows
+
+
+def random_rows(seed: int, count: int) -> list[tuple]:
+    rng = random.Random(seed)
+    return [
+        (
+            rng.choice(["BUY", "SELL"]),
+            float(rng.randint(1, 50)),
+            round(rng.uniform(5, 300), 2),
+            round(rng.uniform(0, 5), 2),
+            0.0,
+            date(2024, rng.randint(1, 4), rng.randint(1, 28)),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_month_bounds_cover_whole_month() -> None:
+    assert month_bounds(date(2024, 2, 10)) == (
+        datetime(2024, 2, 1, tzinfo=timezone.utc),
+        datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=timezone.utc),
+    )
+    assert month_bounds(date(2024, 12, 31))[1] == datetime(2024, 12, 31, 23, 59, 59, 999999, tzinfo=timezone.utc)
+
+
+def test_grouped_kpis_match_per_group_engine() -> None:
+    rows = random_rows(3, 1500)
+    # A group whose only trade is a buy has no wins and no profit factor.
+    rows.append(("BUY", 1.0, 10.0, 0.0, 0.0, date(2024, 1, 1)))
+    keys = np.array([index % 5 for index in range(len(rows) - 1)] + [9])
+    table = grouped_trade_kpis(TradeColumns.from_rows(rows), {"ref_id": keys})
+
+    results = dict(kpi_records(table))
+    assert sorted(results) == [0, 1, 2, 3, 4, 9]
+    for ref_id, metrics in results.items():
+        expected = compute_trade_kpis(TradeColumns.from_rows([row for row, key in zip(rows, keys) if key == ref_id]))
+        for name, value in expected.items():
+            if value is None:
+                assert metrics[name] is None, (ref_id, name)
+            else:
+                assert metrics[name] == pytest.approx(value, rel=1e-9, abs=1e-6), (ref_id, name)
+
+
+def test_monthly_rows_split_by_ref_and_month() -> None:
+    rows = random_rows(4, 400)
+    keys = np.array([1 if index % 2 else 2 for index in range(len(rows))])
+    result = monthly_kpi_rows("account_month", keys, TradeColumns.from_rows(rows))
+
+    assert [(row["scope_ref_id"], row["period_start"].month) for row in result] == [
+        (ref_id, month) for ref_id in (1, 2) for month in (1, 2, 3, 4)
+    ]
+    assert sum(row["total_trades"] for row in result) == len(rows)
+    assert all(row["scope"] == "account_month" for row in result)
+
+
+def test_grouped_kpis_empty() -> None:
+    table = grouped_trade_kpis(TradeColumns.empty(), {"ref_id": np.empty(0, dtype=np.int64)})
+    assert list(kpi_records(table)) == []
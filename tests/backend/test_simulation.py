@@ -0,0 +1,49 @@
+"""Tests for the bootstrap simulation."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services.simulation import BLOCK_PATHS, bootstrap_pnl, simulate_block
+
+
+def test_block_matches_per_path_loop() -> None:
+    pnl = np.random.default_rng(0).normal(0, 10, 50)
+    seed = np.random.SeedSequence(11)
+    final, drawdown, lowest = simulate_block(pnl, 40, 30, seed)
+
+    draws = np.random.default_rng(seed).integers(0, len(pnl), size=(40, 30))
+    for path, indices in enumerate(draws):
+        equity, peak, worst = 0.0, 0.0, 0.0
+        for index in indices:
+            equity += pnl[index]
+            peak = max(peak, equity)
+            worst = min(worst, equity - peak)
+        assert final[path] == pytest.approx(equity)
+        assert drawdown[path] == pytest.approx(worst)
+        assert lowest[path] == pytest.approx(np.cumsum(pnl[indices]).min())
+
+
+def test_seed_reproduces_and_blocks_do_not_depend_on_path_count() -> None:
+    pnl = np.random.default_rng(1).normal(1, 20, 200)
+    first = bootstrap_pnl(pnl, 2 * BLOCK_PATHS, seed=5)
+    assert bootstrap_pnl(pnl, 2 * BLOCK_PATHS, seed=5) == first
+    assert first.seed == 5 and first.horizon == 200
+
+    child = np.random.SeedSequence(5).spawn(1)[0]
+    final, _, _ = simulate_block(pnl, BLOCK_PATHS, 200, child)
+    assert bootstrap_pnl(pnl, BLOCK_PATHS, seed=5).final_equity.p50 == pytest.approx(np.percentile(final, 50))
+
+
+def test_constant_outcomes_and_risk_of_ruin() -> None:
+    winning = bootstrap_pnl(np.array([10.0]), 100, horizon=5, seed=1, capital=100)
+    assert winning.final_equity.p5 == winning.final_equity.p95 == pytest.approx(50.0)
+    assert winning.max_drawdown.mean == 0.0
+    assert (winning.prob_loss, winning.risk_of_ruin) == (0.0, 0.0)
+
+    losing = bootstrap_pnl(np.array([-10.0]), 100, horizon=5, seed=1, capital=100, ruin_fraction=0.5)
+    assert losing.max_drawdown.p50 == pytest.approx(-50.0)
+    assert (losing.prob_loss, losing.risk_of_ruin) == (1.0, 1.0)
+    assert bootstrap_pnl(np.array([-10.0]), 10, horizon=4, capital=100, ruin_fraction=0.5).risk_of_ruin == 0.0
+    with pytest.raises(ValueError):
+        bootstrap_pnl(np.empty(0), 10)
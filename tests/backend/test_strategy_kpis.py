@@ -0,0 +1,102 @@
+"""Tests for grouped strategy KPIs over the trade/tag join."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.models import KPI, Strategy, Trade, TradeTag
+from app.services.kpi_engine import TradeColumns, compute_trade_kpis
+from app.services.trades import assign_strategy, strategy_kpi_table
+
+from test_kpi_math import DummyTrade
+
+
+@pytest.fixture()
+def tables() -> tuple:
+    return (Trade, TradeTag, Strategy, KPI)
+
+
+def test_strategy_table_matches_per_strategy_engine(db: Session) -> None:
+    rng = random.Random(11)
+    trades = [
+        DummyTrade(
+            side=rng.choice(["BUY", "SELL"]),
+            qty=rng.randint(1, 100),
+            price=round(rng.uniform(5, 200), 2),
+            fee=1,
+            tax=0,
+            trade_ts=datetime(2024, 1, 1) + timedelta(hours=rng.randint(0, 24 * 90)),
+        )
+        for _ in range(600)
+    ]
+    db.execute(
+        insert(Trade),
+        [
+            dict(
+                id=index,
+                account_id=1,
+                symbol_id=1,
+                side=trade.side,
+                qty=trade.qty,
+                price=trade.price,
+                fee=trade.fee,
+                tax=trade.tax,
+                trade_ts=trade.trade_ts,
+            )
+            for index, trade in enumerate(trades)
+        ],
+    )
+    # Trade i is tagged with strategy i % 3, and every tenth trade also with strategy 7.
+    tags = {sid: [i for i in range(len(trades)) if i % 3 == sid] for sid in range(3)}
+    tags[7] = list(range(0, len(trades), 10))
+    db.execute(insert(TradeTag), [dict(trade_id=i, strategy_id=sid) for sid, ids in tags.items() for i in ids])
+
+    start, end = datetime(2024, 1, 15), datetime(2024, 3, 1)
+    table = strategy_kpi_table(db, [0, 1, 2, 7, 99], start, end)
+
+    assert list(table) == [0, 1, 2, 7, 99]
+    assert table[99]["total_trades"] == 0
+    for sid, ids in tags.items():
+        selected = [trades[i] for i in ids if start <= trades[i].trade_ts <= end]
+        expected = compute_trade_kpis(TradeColumns.from_trades(selected))
+        for name, value in expected.items():
+            if value is None:
+                assert table[sid][name] is None
+            else:
+                assert table[sid][name] == pytest.approx(value, rel=1e-9, abs=1e-6), (sid, name)
+
+
+def test_tagging_a_trade_refreshes_the_strategy_month(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    db.execute(insert(Strategy).values(id=4, user_id=1, name="Breakout"))
+    db.execute(
+        insert(Trade).values(
+            id=1, account_id=1, symbol_id=1, side="SELL", qty=10, price=110, fee=0, tax=0,
+            trade_ts=datetime(2024, 3, 8),
+        )
+    )
+    db.execute(
+        insert(KPI).values(
+            id=1, scope="strategy_month", scope_ref_id=4, period_start=datetime(2024, 3, 1),
+            period_end=datetime(2024, 3, 31), total_trades=1,
+        )
+    )
+    db.commit()
+    rollups = []
+
+    def rollup(session, account_ids=None, strategy_ids=None):
+        # The rollup reads trades on the Core connection, which does not autoflush.
+        tags = session.connection().execute(select(TradeTag.strategy_id)).scalars().all()
+        rollups.append((account_ids, strategy_ids, tags, session.scalars(select(KPI.id)).all()))
+        session.commit()
+
+    monkeypatch.setattr("app.services.trades.rollup_monthly_kpis", rollup)
+
+    assign_strategy(db, 1, 4)
+
+    # The stale month is dropped and the strategy's rollup rebuilt in the same transaction as the tag.
+    assert rollups == [([], [4], [4], [])]
+    assert db.scalars(select(TradeTag.strategy_id).where(TradeTag.trade_id == 1)).all() == [4]
@@ -0,0 +1,128 @@
+"""Tests for watermark window arithmetic."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from threading import Event
+from types import SimpleNamespace
+
+import pytest
+
+from app.ingestors.base import TradePage
+from app.services import sync
+from app.services.sync import TICK, chunk_window, uncovered_windows
+from app.services.trades import UpsertResult
+
+
+def day(n: int) -> datetime:
+    return datetime(2024, 1, n, tzinfo=timezone.utc)
+
+
+def test_uncovered_without_watermark_is_whole_window() -> None:
+    assert uncovered_windows(day(1), day(5), None) == ([(day(1), day(5))], True)
+
+
+def test_uncovered_inside_coverage_is_empty() -> None:
+    assert uncovered_windows(day(2), day(4), (day(1), day(5))) == ([], True)
+
+
+def test_uncovered_trims_both_sides() -> None:
+    windows, contiguous = uncovered_windows(day(1), day(9), (day(3), day(5)))
+    assert windows == [(day(1), day(3) - TICK), (day(5) + TICK, day(9))]
+    assert contiguous
+
+
+def test_uncovered_disjoint_window_does_not_extend() -> None:
+    assert uncovered_windows(day(10), day(12), (day(1), day(5))) == ([(day(10), day(12))], False)
+
+
+def test_chunk_window_is_contiguous_and_bounded() -> None:
+    chunks = chunk_window(day(1), day(10), timedelta(days=4))
+    assert chunks[0] == (day(1), day(5) - TICK)
+    assert chunks[-1][1] == day(10)
+    assert all(b[0] == a[1] + TICK for a, b in zip(chunks, chunks[1:]))
+    assert all(end - start < timedelta(days=4) for start, end in chunks)
+
+
+@pytest.mark.parametrize(
+    ("covered", "expected"),
+    [
+        ((day(1), day(3)), ["page-2", None]),
+        ((day(20), day(25)), [None, None, None]),
+    ],
+)
+def test_cursor_resumes_only_the_first_contiguous_chunk(
+    monkeypatch: pytest.MonkeyPatch, covered: tuple, expected: list
+) -> None:
+    cursors = []
+
+    def fetch(db, account, broker, start, end, cursor=None):
+        cursors.append(cursor)
+        return iter(())
+
+    watermark = SimpleNamespace(synced_from=covered[0], synced_through=covered[1])
+    monkeypatch.setattr(sync, "get_watermark", lambda *args: watermark)
+    monkeypatch.setattr(sync, "iter_synced_pages", fetch)
+    monkeypatch.setattr(sync, "extend_watermark", lambda *args: None)
+    monkeypatch.setattr(sync, "finish_import", lambda *args: None)
+
+    sync.sync_account_window(
+        None, SimpleNamespace(id=1), "ibkr", day(3), day(9), chunk=timedelta(days=3), cursor="page-2"
+    )
+
+    assert cursors == expected
+
+
+class FailingSession:
+    """Stands in for a session whose transaction breaks until it is rolled back."""
+
+    def __init__(self) -> None:
+        self.failed = False
+        self.rollbacks = 0
+
+    def rollback(self) -> None:
+        self.failed = False
+        self.rollbacks += 1
+
+
+def test_failed_chunk_rolls_back_before_finishing(monkeypatch: pytest.MonkeyPatch) -> None:
+    db = FailingSession()
+    finished = []
+
+    def fetch(db, account, broker, start, end, cursor=None):
+        yield TradePage([], "next"), UpsertResult(imported=2, earliest_trade_ts=start, latest_trade_ts=start)
+        if start > day(4):
+            # The first page of this chunk is already committed when the second one fails.
+            db.failed = True
+            raise RuntimeError("connection lost")
+
+    def finish(db, account_id, result):
+        if db.failed:
+            raise AssertionError("finish_import ran on a failed transaction")
+        finished.append((result.imported, result.earliest_trade_ts, result.latest_trade_ts))
+
+    monkeypatch.setattr(sync, "get_watermark", lambda *args: None)
+    monkeypatch.setattr(sync, "iter_synced_pages", fetch)
+    monkeypatch.setattr(sync, "extend_watermark", lambda *args: None)
+    monkeypatch.setattr(sync, "finish_import", finish)
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        sync.sync_account_window(db, SimpleNamespace(id=1), "ibkr", day(1), day(9), chunk=timedelta(days=4))
+
+    assert db.rollbacks == 1
+    assert finished == [(4, day(1), day(5))]
+
+
+def test_blocked_broker_does_not_hold_other_brokers_threads(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sync.settings.sync, "broker_concurrency", {"shioaji": 2, "ibkr": 1})
+    pools = sync.broker_pools(["shioaji", "ibkr", "shioaji"], max_workers=1, prefix="test")
+    release = Event()
+    try:
+        assert sorted(pools) == ["ibkr", "shioaji"]
+        assert pools["shioaji"]._max_workers == 1
+        blocked = [pools["shioaji"].submit(release.wait) for _ in range(3)]
+        assert pools["ibkr"].submit(lambda: "done").result(timeout=5) == "done"
+        assert not any(future.done() for future in blocked)
+    finally:
+        release.set()
+        for pool in pools.values():
+            pool.shutdown()
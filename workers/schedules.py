@@ -1,44 +1,141 @@
 """APScheduler worker to run daily ingestion tasks."""
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import time
 
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy import select
 
+from app.core.logging import configure_logging, get_logger
 from app.core.settings import settings
-from app.db.session import SessionLocal
-from app.models.models import Account
-from app.services.trades import record_equity_curve, upsert_trades
-from app.ingestors import shioaji_ingestor, ibkr_ingestor
+from app.db.session import SessionLocal, session_scope
+from app.models.models import Account, BrokerConnection
+from app.services.reconciliation import ReconciliationSummary, reconcile_positions
+from app.services.rollups import rollup_monthly_kpis
+from app.services.sync import BROKER_CONNECTORS, broker_pools, next_sync_window, sync_account_window
 
 
 scheduler = BlockingScheduler(timezone=settings.timezone)
+logger = get_logger(__name__)
 
 
-def daily_sync_job() -> None:
-    """Fetch trades from brokers and recompute KPIs."""
+@dataclass
+class AccountSyncOutcome:
+    """Result of syncing a single account."""
+
+    account_id: int
+    broker: str
+    imported: int = 0
+    duplicates: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+
+def sync_one_account(account_id: int, broker: str, now: datetime) -> AccountSyncOutcome:
+    """Catch one account up from its watermark in its own session, capturing any failure."""
+
+    outcome = AccountSyncOutcome(account_id=account_id, broker=broker)
+    started = time.perf_counter()
+    try:
+        with session_scope() as session:
+            account = session.get(Account, account_id)
+            if account is None:
+                raise ValueError("Account not found")
+            start, end = next_sync_window(session, account_id, broker, now)
+            result = sync_account_window(
+                session,
+                account,
+                broker,
+                start,
+                end,
+                chunk=timedelta(days=settings.sync.catchup_chunk_days),
+            )
+        outcome.imported = result.imported
+        outcome.duplicates = result.duplicates
+    except Exception as exc:
+        outcome.error = str(exc)
+        logger.exception("account_sync_failed", account_id=account_id, broker=broker)
+    outcome.seconds = time.perf_counter() - started
+    logger.info(
+        "account_sync_finished",
+        account_id=account_id,
+        broker=broker,
+        imported=outcome.imported,
+        seconds=round(outcome.seconds, 3),
+        error=outcome.error,
+    )
+    return outcome
+
+
+def daily_sync_job() -> list[AccountSyncOutcome]:
+    """Fetch trades from brokers, then roll up monthly KPIs for accounts that changed."""
+
+    run_started = time.perf_counter()
+    with SessionLocal() as session:
+        targets = session.execute(
+            select(Account.id, BrokerConnection.broker)
+            .join(Account.broker_connection)
+            .where(BrokerConnection.broker.in_(BROKER_CONNECTORS))
+        ).all()
+    now = datetime.now(timezone.utc)
+    pools = broker_pools((broker for _, broker in targets), settings.sync.max_workers, "daily-sync")
+    try:
+        futures = [
+            pools[broker].submit(sync_one_account, account_id, broker, now) for account_id, broker in targets
+        ]
+        outcomes = [future.result() for future in futures]
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+    changed = [outcome.account_id for outcome in outcomes if outcome.imported]
+    if changed:
+        try:
+            with SessionLocal() as session:
+                rollup_monthly_kpis(session, account_ids=changed)
+        except Exception:
+            logger.exception("monthly_rollup_failed", accounts=changed)
+    failed = [outcome for outcome in outcomes if outcome.error]
+    slowest = sorted(outcomes, key=lambda outcome: outcome.seconds, reverse=True)[:5]
+    logger.info(
+        "daily_sync_summary",
+        accounts=len(outcomes),
+        succeeded=len(outcomes) - len(failed),
+        failed=len(failed),
+        failed_accounts=[outcome.account_id for outcome in failed],
+        imported=sum(outcome.imported for outcome in outcomes),
+        duplicates=sum(outcome.duplicates for outcome in outcomes),
+        slowest=[(outcome.account_id, round(outcome.seconds, 3)) for outcome in slowest],
+        seconds=round(time.perf_counter() - run_started, 3),
+    )
+    return outcomes
+
+
+def reconcile_positions_job() -> ReconciliationSummary:
+    """Compare broker positions with the journal for every connected account."""
 
     with SessionLocal() as session:
-        accounts = session.scalars(select(Account)).all()
-        start = datetime.now().date() - timedelta(days=1)
-        start_dt = datetime.combine(start, datetime.min.time())
-        end_dt = datetime.combine(start, datetime.max.time())
-        for account in accounts:
-            trades = []
-            if account.broker_connection and account.broker_connection.broker == "shioaji":
-                trades.extend(shioaji_ingestor.fetch_trades(account, start_dt, end_dt))
-            elif account.broker_connection and account.broker_connection.broker == "ibkr":
-                trades.extend(ibkr_ingestor.fetch_trades(account, start_dt, end_dt))
-            imported = upsert_trades(session, trades)
-            if imported:
-                session.refresh(account)
-                record_equity_curve(session, account, account.trades)
+        summary = reconcile_positions(session)
+    logger.info(
+        "position_reconciliation_summary",
+        accounts=summary.accounts,
+        in_sync=summary.in_sync,
+        out_of_sync=summary.out_of_sync,
+        failed=summary.failed,
+        timed_out=summary.timed_out,
+        breaks=summary.breaks,
+        seconds=round(summary.seconds, 3),
+    )
+    return summary
 
 
 scheduler.add_job(daily_sync_job, CronTrigger(hour=16, minute=30))
+if settings.reconcile.enabled:
+    scheduler.add_job(reconcile_positions_job, CronTrigger(hour=17, minute=30))
 
 
 if __name__ == "__main__":  # pragma: no cover
+    configure_logging()
     scheduler.start()